@@ -0,0 +1,111 @@
+"""Loader Benchmark
+
+Measures the throughput, in rows per second, of the streaming TestSuite
+loaders on generated CSV, JSON Lines and XML files of a given size, along
+with the peak memory used while reading each one in chunks.
+
+    $ python benchmarks/bench_loaders.py --size-mb 1024 --dir /tmp/bench
+
+Files are generated once and reused on later runs.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import time
+
+from sentinelpricing import TestSuite
+
+TYPES = {"age": int, "lic": int, "vehicle_value": float, "ncd": "bool"}
+
+
+def random_row(i):
+    return {
+        "policy": f"P{i:09d}",
+        "age": random.randint(17, 90),
+        "lic": random.randint(0, 9),
+        "vehicle_value": round(random.uniform(500, 80_000), 2),
+        "region": random.choice("ABCDEFGH"),
+        "ncd": random.choice(("true", "false")),
+    }
+
+
+def write_csv(f, row):
+    f.write(",".join(map(str, row.values())) + "\n")
+
+
+def write_jsonl(f, row):
+    f.write(json.dumps(row) + "\n")
+
+
+def write_xml(f, row):
+    fields = "".join(f"<{k}>{v}</{k}>" for k, v in row.items())
+    f.write(f"<testcase>{fields}</testcase>\n")
+
+
+def generate(path, size, writer, header="", footer=""):
+    if os.path.exists(path) and os.path.getsize(path) >= size:
+        return
+    with open(path, "w") as f:
+        f.write(header)
+        i = 0
+        while f.tell() < size:
+            writer(f, random_row(i))
+            i += 1
+        f.write(footer)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(label, chunks):
+    start = time.perf_counter()
+    rows = sum(len(chunk) for chunk in chunks)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<8} {rows:>12,} rows {elapsed:>9.1f}s "
+        f"{rows / elapsed:>12,.0f} rows/s  peak RSS {peak_rss_mb():,.0f} MB"
+    )
+
+
+def main(size_mb, directory, chunk_size):
+    size = size_mb * 1024 * 1024
+    os.makedirs(directory, exist_ok=True)
+    csv_path = os.path.join(directory, "tests.csv")
+    jsonl_path = os.path.join(directory, "tests.jsonl")
+    xml_path = os.path.join(directory, "tests.xml")
+
+    header = ",".join(random_row(0)) + "\n"
+    generate(csv_path, size, write_csv, header=header)
+    generate(jsonl_path, size, write_jsonl)
+    generate(xml_path, size, write_xml, "<testcases>\n", "</testcases>\n")
+
+    print(f"{size_mb:,} MB files, chunks of {chunk_size:,} rows")
+    measure(
+        "csv",
+        TestSuite.iter_csv(csv_path, chunk_size, TYPES, id_column="policy"),
+    )
+    measure(
+        "jsonl",
+        TestSuite.iter_jsonl(
+            jsonl_path, chunk_size, {"ncd": "bool"}, id_column="policy"
+        ),
+    )
+    measure(
+        "xml",
+        TestSuite.iter_xml(
+            xml_path, chunk_size, types=TYPES, id_column="policy"
+        ),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--dir", default="bench_data")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+    main(args.size_mb, args.dir, args.chunk_size)
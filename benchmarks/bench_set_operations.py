@@ -0,0 +1,66 @@
+"""Set Operations Benchmark
+
+Times membership, intersection, difference and union on QuoteSets and
+TestSuites, using the identifier and quote data hash indexes.
+
+    $ python benchmarks/bench_set_operations.py --rows 1000000
+"""
+
+import argparse
+import random
+import time
+
+from sentinelpricing import Quote, QuoteSet, TestCase, TestSuite
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<40} {time.perf_counter() - start:>8.3f}s")
+    return result
+
+
+def random_data(i):
+    return {
+        "policy": i,
+        "age": random.randint(17, 90),
+        "lic": random.randint(0, 9),
+        "region": random.choice("ABCDEFGH"),
+    }
+
+
+def main(rows):
+    overlap = rows // 2
+    data = [random_data(i) for i in range(rows + overlap)]
+
+    print(f"TestSuite, {rows:,} rows each, {overlap:,} shared")
+    testcases = [TestCase(d) for d in data]
+    a = TestSuite(testcases[:rows])
+    b = TestSuite(testcases[overlap:])
+
+    timed("build identifier index", a._identifier_index)
+    timed("build data index", a._fingerprint_index)
+    timed(
+        "10k membership tests (data)",
+        lambda: sum(d in a for d in data[-10_000:]),
+    )
+    timed("intersection (identifier)", lambda: a & b)
+    timed("difference (identifier)", lambda: a - b)
+    timed("union (identifier)", lambda: a | b)
+    timed("intersection (data)", lambda: a.intersection(b, on="data"))
+
+    print(f"\nQuoteSet, {rows:,} rows each, {overlap:,} shared")
+    quotes = [Quote(d, final_price=100) for d in data]
+    qa = QuoteSet(quotes[:rows])
+    qb = QuoteSet(quotes[overlap:])
+
+    timed("intersection (identifier)", lambda: qa & qb)
+    timed("difference (identifier)", lambda: qa - qb)
+    timed("union (identifier)", lambda: qa | qb)
+    timed("difference (quotedata)", lambda: qa.subtract(qb, on="quotedata"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    main(parser.parse_args().rows)
@@ -75,8 +75,10 @@ class MotorV2(MotorV1):
 		self.lic = LookupTable(lic_rates)
 
 
-current = MotorV1.quote_many(testcases)
-proposed = MotorV2.quote_many(testcases)
+# Rates both versions in a single pass over the test cases. Versions that
+# only change lookup tables reuse the current results for every test case
+# that does not hit a changed row.
+current, proposed = Framework.compare_many([MotorV1, MotorV2], testcases)
 
 avg_final_price_by_age = current.avg(
 	by="age", bins=lambda x: m.floor(x / 10) * 10
@@ -1,28 +1,52 @@
+from .models import Accumulator
+from .models import Alignment
 from .models import Breakdown
+from .models import ColumnarTestSuite
 from .models import Framework
+from .models import FrameworkRouter
+from .models import LiveFramework
 from .models import LookupTable
+from .models import memoize
 from .models import Note
 from .models import PriceTest
 from .models import Quote
+from .models import QuoteCoalescer
 from .models import QuoteSet
+from .models import QuoteSetView
 from .models import Rate
+from .models import ResultStore
 from .models import ModuleTextFile, ModuleBinaryFile
 from .models import Step
+from .models import TableCache
+from .models import TableLoadError
 from .models import TestCase
 from .models import TestSuite
+from .utils.binning import Bins
 
 __all__ = [
+    "Accumulator",
+    "Alignment",
+    "Bins",
     "Breakdown",
+    "ColumnarTestSuite",
     "Framework",
+    "FrameworkRouter",
+    "LiveFramework",
     "LookupTable",
+    "memoize",
     "Note",
     "PriceTest",
     "Quote",
+    "QuoteCoalescer",
     "QuoteSet",
+    "QuoteSetView",
     "Rate",
+    "ResultStore",
     "ModuleTextFile",
     "ModuleBinaryFile",
     "Step",
+    "TableCache",
+    "TableLoadError",
     "TestCase",
     "TestSuite",
 ]
@@ -1,28 +1,49 @@
+from .accumulator import Accumulator
+from .alignment import Alignment
 from .breakdown import Breakdown
+from .coalesce import QuoteCoalescer
+from .columnar import ColumnarTestSuite
 from .framework import Framework
+from .live import LiveFramework
 from .lookuptable import LookupTable
+from .memoize import memoize
 from .note import Note
 from .pricetest import PriceTest
 from .quote import Quote
-from .quoteset import QuoteSet
+from .quoteset import QuoteSet, QuoteSetView
 from .rate import Rate
+from .resultstore import ResultStore
 from .modulefile import ModuleTextFile, ModuleBinaryFile
+from .router import FrameworkRouter
 from .step import Step
+from .tablecache import TableCache
+from .tableloader import TableLoadError
 from .testcase import TestCase
 from .testsuite import TestSuite
 
 __all__ = [
+    "Accumulator",
+    "Alignment",
     "Breakdown",
+    "ColumnarTestSuite",
     "Framework",
+    "FrameworkRouter",
+    "LiveFramework",
     "LookupTable",
+    "memoize",
     "Note",
     "PriceTest",
     "Quote",
+    "QuoteCoalescer",
     "QuoteSet",
+    "QuoteSetView",
     "Rate",
+    "ResultStore",
     "ModuleTextFile",
     "ModuleBinaryFile",
     "Step",
+    "TableCache",
+    "TableLoadError",
     "TestCase",
     "TestSuite",
 ]
@@ -0,0 +1,357 @@
+"""Accumulator
+
+Streaming, mergeable statistics over quotes.
+
+A QuoteSet needs every quote in memory before it can aggregate anything. An
+Accumulator instead consumes quotes one at a time (for example straight
+from `Framework.quote_iter`) and keeps only a handful of running values per
+group, so memory use depends on the number of groups rather than the number
+of quotes.
+
+Partial accumulators built on different chunks, threads or worker
+processes can be combined with `merge`, giving the same answer as if all
+quotes had been consumed by a single accumulator.
+"""
+
+from math import inf, sqrt
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from .quote import Quote
+from sentinelpricing.utils.calculations import percentage
+from sentinelpricing.utils.indexing import key_getter, normalise_by
+from sentinelpricing.utils.sketch import QuantileSketch
+
+
+class _All:
+    """Group key used when an Accumulator has no `by` spec."""
+
+    def __repr__(self) -> str:
+        return "<all>"
+
+    def __reduce__(self):
+        return "_ALL"
+
+
+_ALL = _All()
+
+
+class RunningStats:
+    """
+    Running count, sum, mean, variance, min and max of a stream of numbers.
+
+    The mean and variance use Welford's algorithm, and two instances are
+    combined with the parallel form of the same update (Chan et al.), so
+    merging partial results is numerically stable.
+    """
+
+    __slots__ = ("count", "total", "mean", "m2", "minimum", "maximum")
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.total: float = 0.0
+        self.mean: float = 0.0
+        self.m2: float = 0.0
+        self.minimum: float = inf
+        self.maximum: float = -inf
+
+    def __getstate__(self):
+        return tuple(getattr(self, s) for s in self.__slots__)
+
+    def __setstate__(self, state) -> None:
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+    def update(self, value: float) -> None:
+        """Add a single value."""
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other: "RunningStats") -> None:
+        """Fold the values seen by `other` into this instance."""
+        if not other.count:
+            return
+        if not self.count:
+            self.__setstate__(other.__getstate__())
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def variance(self, sample: bool = True) -> float:
+        """
+        Return the variance of the values seen.
+
+        Args:
+            sample (bool): Return the sample variance (as
+                `statistics.variance`) rather than the population variance.
+
+        Raises:
+            ValueError: If too few values have been seen.
+        """
+        dof = self.count - 1 if sample else self.count
+        if dof < 1:
+            raise ValueError("Variance requires at least two values.")
+        return self.m2 / dof
+
+
+class Accumulator:
+    """
+    A mergeable, streaming aggregator of quotes.
+
+    Example:
+        >>> acc = Accumulator(by="age")
+        >>> for chunk in chunks:
+        ...     acc.consume(Motor.quote_iter(chunk))
+        >>> acc.avg()
+        {17: 912.5, 18: 870.0, ...}
+
+    Results have the same shape as the equivalent QuoteSet methods: a single
+    value if no `by` spec was given, otherwise a dictionary mapping group
+    keys to values.
+
+    When accumulators are sent between processes, `by` must be picklable
+    (a key, a tuple of keys or a module level function).
+    """
+
+    def __init__(
+        self,
+        by: Optional[Union[Any, Iterable[Any]]] = None,
+        on: Optional[str] = None,
+        where: Optional[Callable[["Quote"], bool]] = None,
+        sketch_k: Optional[int] = None,
+    ) -> None:
+        """
+        Initialise an empty Accumulator.
+
+        Args:
+            by (Any or Iterable[Any], optional): Key(s) or Callable to group
+                quotes by.
+            on (str, optional): The attribute name to extract from each Quote
+                (defaults to "final_price").
+            where (Callable, optional): A function to filter quotes before
+                they are accumulated.
+            sketch_k (int, optional): If given, a QuantileSketch of this
+                size is kept per group so `quantiles` can be answered.
+        """
+        self.by: Hashable = normalise_by(by)
+        self.on: str = on or "final_price"
+        self.where = where
+        self.sketch_k = sketch_k
+        self.groups: Dict[Any, RunningStats] = {}
+        self.sketches: Dict[Any, QuantileSketch] = {}
+        self._key: Optional[Callable[[Any], Any]] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_key"] = None
+        return state
+
+    def __len__(self) -> int:
+        """Return the number of quotes accumulated."""
+        return sum(stats.count for stats in self.groups.values())
+
+    def __iadd__(self, other: "Accumulator") -> "Accumulator":
+        return self.merge(other)
+
+    def _group_key(self, quote: "Quote") -> Any:
+        if self.by is None:
+            return _ALL
+        if self._key is None:
+            self._key = key_getter(self.by)
+        return self._key(quote)
+
+    def update(self, quote: "Quote") -> None:
+        """
+        Accumulate a single quote.
+
+        Args:
+            quote (Quote): The quote to add.
+        """
+        if self.where is not None and not self.where(quote):
+            return
+        key = self._group_key(quote)
+        stats = self.groups.get(key)
+        if stats is None:
+            stats = self.groups[key] = RunningStats()
+        value = getattr(quote, self.on)
+        stats.update(value)
+        if self.sketch_k is not None:
+            sketch = self.sketches.get(key)
+            if sketch is None:
+                sketch = self.sketches[key] = QuantileSketch(self.sketch_k)
+            sketch.update(value)
+
+    def consume(self, quotes: Iterable["Quote"]) -> "Accumulator":
+        """
+        Accumulate every quote in an iterable.
+
+        Args:
+            quotes (Iterable[Quote]): Quotes, a QuoteSet or a generator of
+                quotes.
+
+        Returns:
+            Accumulator: This accumulator, to allow chaining.
+        """
+        for quote in quotes:
+            self.update(quote)
+        return self
+
+    def merge(self, other: "Accumulator") -> "Accumulator":
+        """
+        Fold another accumulator's state into this one.
+
+        Args:
+            other (Accumulator): An accumulator with the same `by` and `on`.
+
+        Returns:
+            Accumulator: This accumulator, to allow chaining.
+
+        Raises:
+            ValueError: If the accumulators group or aggregate differently.
+        """
+        if not isinstance(other, Accumulator):
+            raise NotImplementedError("Merge only implemented for Accumulator")
+        if (self.by, self.on) != (other.by, other.on):
+            raise ValueError(
+                "Cannot merge accumulators with different by/on arguments."
+            )
+        for key, stats in other.groups.items():
+            mine = self.groups.get(key)
+            if mine is None:
+                mine = self.groups[key] = RunningStats()
+            mine.merge(stats)
+        for key, sketch in other.sketches.items():
+            if key in self.sketches:
+                self.sketches[key].merge(sketch)
+            else:
+                self.sketches[key] = QuantileSketch(sketch.k).merge(sketch)
+        return self
+
+    def _result(
+        self,
+        func: Callable[[Any], Any],
+        sort_keys: bool = True,
+        by_key: bool = False,
+    ) -> Union[Dict[Any, Any], Any]:
+        def get(key):
+            return func(key if by_key else self.groups[key])
+
+        if self.by is None:
+            if _ALL not in self.groups:
+                raise ValueError("No quotes have been accumulated.")
+            return get(_ALL)
+
+        keys: Iterable[Any] = self.groups.keys()
+        if sort_keys:
+            keys = sorted(keys)
+        return {key: get(key) for key in keys}
+
+    def count(self, sort_keys: bool = True) -> Union[Dict[Any, int], int]:
+        """Return the number of quotes accumulated (per group)."""
+        return self._result(lambda s: s.count, sort_keys)
+
+    def sum(self, sort_keys: bool = True) -> Union[Dict[Any, float], float]:
+        """Return the sum of the accumulated values (per group)."""
+        return self._result(lambda s: s.total, sort_keys)
+
+    def avg(self, sort_keys: bool = True) -> Union[Dict[Any, float], float]:
+        """Return the mean of the accumulated values (per group)."""
+        return self._result(lambda s: s.mean, sort_keys)
+
+    def min(self, sort_keys: bool = True) -> Union[Dict[Any, float], float]:
+        """Return the minimum accumulated value (per group)."""
+        return self._result(lambda s: s.minimum, sort_keys)
+
+    def max(self, sort_keys: bool = True) -> Union[Dict[Any, float], float]:
+        """Return the maximum accumulated value (per group)."""
+        return self._result(lambda s: s.maximum, sort_keys)
+
+    def variance(
+        self, sample: bool = True, sort_keys: bool = True
+    ) -> Union[Dict[Any, float], float]:
+        """
+        Return the variance of the accumulated values (per group).
+
+        Args:
+            sample (bool): Return the sample variance rather than the
+                population variance.
+            sort_keys (bool): Whether to sort the grouping keys in the
+                result.
+        """
+        return self._result(lambda s: s.variance(sample), sort_keys)
+
+    def stdev(
+        self, sample: bool = True, sort_keys: bool = True
+    ) -> Union[Dict[Any, float], float]:
+        """Return the standard deviation of the values (per group)."""
+        return self._result(lambda s: sqrt(s.variance(sample)), sort_keys)
+
+    def quantiles(
+        self, q: Sequence[float], sort_keys: bool = True
+    ) -> Union[Dict[Any, List[Any]], List[Any]]:
+        """
+        Return approximate quantiles of the values (per group).
+
+        Args:
+            q (Sequence[float]): Quantiles between 0 and 1.
+            sort_keys (bool): Whether to sort the grouping keys in the
+                result.
+
+        Raises:
+            ValueError: If the accumulator was created without `sketch_k`.
+        """
+        if self.sketch_k is None:
+            raise ValueError("Accumulator was created without sketch_k.")
+        return self._result(
+            lambda s: self.sketches[s].quantiles(q), sort_keys, by_key=True
+        )
+
+    def mix(
+        self, percent: bool = False, sort_keys: bool = True, **kwargs: Any
+    ) -> Dict[Any, Union[int, float]]:
+        """
+        Get a mapping of groups to their frequency, as `QuoteSet.mix`.
+
+        Args:
+            percent (bool): If True, returns the percentage representation of
+                each group.
+            sort_keys (bool): Whether to sort the grouping keys in the
+                result.
+            **kwargs: Additional keyword arguments to pass to the percentage
+                function.
+
+        Returns:
+            Dict[Any, Union[int, float]]: A dictionary mapping each group key
+                to its count or percentage.
+        """
+        counts = self.count(sort_keys=sort_keys)
+        if not isinstance(counts, dict):
+            counts = {None: counts}
+        if percent:
+            total = len(self)
+            return {
+                k: percentage(v, total, **kwargs) for k, v in counts.items()
+            }
+        return counts
@@ -0,0 +1,242 @@
+"""Alignment
+
+Per-quote comparison of two runs, typically the same TestSuite quoted by
+two versions of a framework.
+
+An Alignment hash-joins quotes from a "left" and a "right" run on their
+identifier (or on quote data keys) and keeps the paired prices in compact
+arrays, from which deltas, ratios, dislocation bands and winner/loser
+counts are derived. Quotes can be added in chunks from either side, in any
+order; quotes without a partner yet are held until one arrives.
+"""
+
+from array import array
+from bisect import bisect_right
+from collections import deque
+from math import inf, isnan, nan
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .quote import Quote
+from sentinelpricing.utils.indexing import key_getter, normalise_by
+
+# Default dislocation bands, as fractional price changes.
+DEFAULT_BANDS = (-0.2, -0.1, -0.05, -0.01, 0.01, 0.05, 0.1, 0.2)
+
+
+class Alignment:
+    """
+    Paired prices of matching quotes from two runs.
+
+    Example:
+        >>> alignment = current.align(proposed)
+        >>> alignment.winners(), alignment.losers()
+        (4120, 5311)
+        >>> alignment.dislocation()
+        {(-inf, -0.2): 12, (-0.2, -0.1): 340, ...}
+
+    "Winners" are quotes whose price fell from left to right and "losers"
+    quotes whose price rose, i.e. from the policyholder's point of view.
+    """
+
+    def __init__(
+        self,
+        on: Union[str, Iterable[str]] = "identifier",
+        on_attr: str = "final_price",
+        keep_quotes: bool = False,
+    ) -> None:
+        """
+        Initialise an empty Alignment.
+
+        Args:
+            on (str or Iterable[str]): "identifier" to pair quotes by
+                identifier, otherwise the quote data key(s) to pair on.
+            on_attr (str): The Quote attribute to compare (defaults to
+                "final_price").
+            keep_quotes (bool): Keep references to the paired Quote objects
+                in `pairs`.
+        """
+        self.on = normalise_by(on)
+        self.on_attr = on_attr
+        self._key: Callable[["Quote"], Any] = (
+            (lambda q: q.identifier)
+            if self.on == "identifier"
+            else key_getter(self.on)
+        )
+
+        self.keys: List[Any] = []
+        self.left: array = array("d")
+        self.right: array = array("d")
+        self.pairs: Optional[List[Tuple["Quote", "Quote"]]] = (
+            [] if keep_quotes else None
+        )
+
+        self._pending: Tuple[Dict[Any, Deque], Dict[Any, Deque]] = ({}, {})
+
+    def __len__(self) -> int:
+        """Return the number of paired quotes."""
+        return len(self.keys)
+
+    def _add(self, quotes: Iterable["Quote"], side: int) -> None:
+        mine, theirs = self._pending[side], self._pending[1 - side]
+        key, attr = self._key, self.on_attr
+        for quote in quotes:
+            k = key(quote)
+            waiting = theirs.get(k)
+            if not waiting:
+                mine.setdefault(k, deque()).append(quote)
+                continue
+            other = waiting.popleft()
+            if not waiting:
+                del theirs[k]
+            left, right = (quote, other) if side == 0 else (other, quote)
+            self.keys.append(k)
+            self.left.append(getattr(left, attr))
+            self.right.append(getattr(right, attr))
+            if self.pairs is not None:
+                self.pairs.append((left, right))
+
+    def add(
+        self,
+        left: Iterable["Quote"] = (),
+        right: Iterable["Quote"] = (),
+    ) -> "Alignment":
+        """
+        Add quotes from either run, pairing them where possible.
+
+        Args:
+            left (Iterable[Quote]): Quotes from the first run.
+            right (Iterable[Quote]): Quotes from the second run.
+
+        Returns:
+            Alignment: This alignment, to allow chaining.
+        """
+        self._add(left, 0)
+        self._add(right, 1)
+        return self
+
+    def merge(self, other: "Alignment") -> "Alignment":
+        """
+        Fold another alignment (e.g. of another chunk or worker) into this
+        one, pairing any quotes left unmatched by either.
+
+        Args:
+            other (Alignment): An alignment with the same `on` arguments.
+
+        Returns:
+            Alignment: This alignment, to allow chaining.
+        """
+        if (self.on, self.on_attr) != (other.on, other.on_attr):
+            raise ValueError("Cannot merge alignments on different keys.")
+        self.keys.extend(other.keys)
+        self.left.extend(other.left)
+        self.right.extend(other.right)
+        if self.pairs is not None and other.pairs is not None:
+            self.pairs.extend(other.pairs)
+        for side in (0, 1):
+            for waiting in other._pending[side].values():
+                self._add(waiting, side)
+        return self
+
+    def unmatched(self) -> Tuple[List["Quote"], List["Quote"]]:
+        """
+        Return the quotes that have not (yet) been paired.
+
+        Returns:
+            Tuple[List[Quote], List[Quote]]: Unmatched left and right quotes.
+        """
+        left, right = (
+            [q for waiting in pending.values() for q in waiting]
+            for pending in self._pending
+        )
+        return left, right
+
+    def deltas(self) -> array:
+        """Return the price change (right - left) of each pair."""
+        return array("d", (r - lt for lt, r in zip(self.left, self.right)))
+
+    def ratios(self) -> array:
+        """
+        Return the price ratio (right / left) of each pair.
+
+        Pairs with a left price of zero have a ratio of nan.
+        """
+        return array(
+            "d",
+            (r / lt if lt else nan for lt, r in zip(self.left, self.right)),
+        )
+
+    def dislocation(
+        self, bands: Sequence[float] = DEFAULT_BANDS
+    ) -> Dict[Tuple[float, float], int]:
+        """
+        Count pairs by band of fractional price change.
+
+        Args:
+            bands (Sequence[float]): Band edges, as fractional changes (e.g.
+                0.05 for +5%). Bands are closed below and open above.
+
+        Returns:
+            Dict[Tuple[float, float], int]: Mapping of (lower, upper) band
+                to the number of pairs in it, from -inf to inf. Pairs with a
+                left price of zero are not counted.
+        """
+        edges = sorted(bands)
+        counts = [0] * (len(edges) + 1)
+        for ratio in self.ratios():
+            if not isnan(ratio):
+                counts[bisect_right(edges, ratio - 1)] += 1
+        bounds = [-inf, *edges, inf]
+        return {
+            (bounds[i], bounds[i + 1]): count for i, count in enumerate(counts)
+        }
+
+    def winners(self, tolerance: float = 0.0) -> int:
+        """Count pairs whose price fell by more than `tolerance`."""
+        return sum(
+            1 for lt, r in zip(self.left, self.right) if r < lt - tolerance
+        )
+
+    def losers(self, tolerance: float = 0.0) -> int:
+        """Count pairs whose price rose by more than `tolerance`."""
+        return sum(
+            1 for lt, r in zip(self.left, self.right) if r > lt + tolerance
+        )
+
+    def summary(self, tolerance: float = 0.0) -> Dict[str, Any]:
+        """
+        Summarise the alignment.
+
+        Args:
+            tolerance (float): Absolute price change below which a pair
+                counts as unchanged.
+
+        Returns:
+            Dict[str, Any]: Counts of pairs, winners, losers, unchanged and
+                unmatched quotes, and total left and right prices.
+        """
+        winners = self.winners(tolerance)
+        losers = self.losers(tolerance)
+        unmatched_left, unmatched_right = (
+            sum(map(len, pending.values())) for pending in self._pending
+        )
+        return {
+            "pairs": len(self),
+            "winners": winners,
+            "losers": losers,
+            "unchanged": len(self) - winners - losers,
+            "unmatched_left": unmatched_left,
+            "unmatched_right": unmatched_right,
+            "total_left": sum(self.left),
+            "total_right": sum(self.right),
+        }
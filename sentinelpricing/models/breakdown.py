@@ -19,8 +19,13 @@ class Breakdown:
     Attributes:
         steps (List[Union[Step, Note]]): A list of steps and notes representing
             the calculation process.
+        frozen (bool): Whether the breakdown is shared between quotes and may
+            no longer be appended to. Quotes copy a frozen breakdown before
+            changing it.
     """
 
+    frozen: bool = False
+
     def __init__(self, final_price: Optional[float] = None) -> None:
         """Initialize a Breakdown instance.
 
@@ -33,6 +38,7 @@ class Breakdown:
                 appended. Defaults to None.
         """
         self.steps: List[Union["Step", "Note"]] = []
+        self.frozen = False
         if final_price is not None:
             self.append(
                 Step(
@@ -114,9 +120,37 @@ class Breakdown:
 
         Args:
             step (Step): The step to append.
+
+        Raises:
+            TypeError: If the breakdown is frozen.
         """
+        if self.frozen:
+            raise TypeError("Cannot append to a frozen Breakdown, copy it.")
         self.steps.append(step)
 
+    def freeze(self) -> "Breakdown":
+        """Mark the breakdown as immutable, so it can be shared.
+
+        Returns:
+            Breakdown: This breakdown.
+        """
+        self.frozen = True
+        return self
+
+    def copy(self) -> "Breakdown":
+        """Return an unfrozen copy of the breakdown.
+
+        Steps themselves are never modified, so they are shared with the
+        copy.
+
+        Returns:
+            Breakdown: The copy.
+        """
+        copied = Breakdown.__new__(Breakdown)
+        copied.steps = list(self.steps)
+        copied.frozen = False
+        return copied
+
     @property
     def final_price(self) -> float:
         """Retrieve the final calculated price from the breakdown.
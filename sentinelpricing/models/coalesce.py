@@ -0,0 +1,218 @@
+"""Coalesce
+
+Sharing one calculation between identical concurrent quote requests.
+
+Aggregators often send the same risk several times within milliseconds.
+A QuoteCoalescer sits in front of a framework's `quote` and keys each
+request on a canonical, typed fingerprint of its quote data (see
+`sentinelpricing.utils.fingerprint`) and extra arguments, so 1, 1.0 and
+True make different requests. The first request for a key rates it;
+identical requests arriving while it is being rated wait for that
+result, and those arriving within `ttl` seconds after are answered with
+it straight away:
+
+    >>> coalescer = QuoteCoalescer(Motor, ttl=0.1)
+    >>> quote = coalescer.quote({"age": 34, "region": "N"})  # threads
+    >>> quote = await coalescer.aquote({"age": 34, "region": "N"})  # asyncio
+    >>> coalescer.info().ratio
+    0.62
+
+Every caller gets its own Quote, with its own quote data and identifier,
+sharing the frozen breakdown of the one calculated (see
+`Breakdown.freeze`). Errors are passed to the requests waiting on the
+calculation, but are not kept for later requests.
+"""
+
+import asyncio
+import copy
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import Future
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .quote import Quote
+from .testcase import TestCase
+from sentinelpricing.utils.fingerprint import fingerprint
+
+CoalesceInfo = namedtuple(
+    "CoalesceInfo", ["requests", "computed", "coalesced", "cached", "ratio"]
+)
+
+
+def _data(test: Any) -> Any:
+    if isinstance(test, Quote):
+        return test.quotedata
+    if isinstance(test, TestCase):
+        return test.data
+    return test
+
+
+class QuoteCoalescer:
+    """
+    Singleflight de-duplication of identical quote requests.
+
+    Attributes:
+        framework: The Framework subclass (rated with a warm instance),
+            FrameworkRouter or LiveFramework requests are rated with.
+        ttl (float): Seconds a result keeps answering identical requests
+            after it was calculated. 0 only shares calculations in flight.
+        maxsize (int): The most results kept; expired results are dropped
+            first, then the oldest.
+        requests (int): Requests made.
+        computed (int): Requests that were calculated.
+        coalesced (int): Requests that waited on a calculation in flight.
+        cached (int): Requests answered with a result kept for `ttl`.
+    """
+
+    def __init__(
+        self, framework: Any, ttl: float = 0.05, maxsize: int = 10000
+    ) -> None:
+        self.framework = framework
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.requests = 0
+        self.computed = 0
+        self.coalesced = 0
+        self.cached = 0
+        self._instance = framework() if isinstance(framework, type) else None
+        # Key to the calculation's future, and when its result expires
+        # (None while in flight).
+        self._calls: Dict[Hashable, Tuple["Future[Any]", Optional[float]]]
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"QuoteCoalescer({self.framework!r}, ttl={self.ttl})"
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def info(self) -> CoalesceInfo:
+        """
+        Return the request counts and the coalesced ratio: the share of
+        requests that did not need a calculation of their own.
+        """
+        shared = self.coalesced + self.cached
+        ratio = shared / self.requests if self.requests else 0.0
+        return CoalesceInfo(
+            self.requests, self.computed, self.coalesced, self.cached, ratio
+        )
+
+    def clear(self) -> None:
+        """Drop kept results and reset the statistics. Calculations in
+        flight still complete for the requests waiting on them."""
+        with self._lock:
+            self._calls = {
+                k: v for k, v in self._calls.items() if v[1] is None
+            }
+            self.requests = self.computed = 0
+            self.coalesced = self.cached = 0
+
+    def _key(self, test: Any, args: Tuple, kwargs: Dict) -> Hashable:
+        kwargs = tuple(sorted(kwargs.items()))
+        return fingerprint((_data(test), args, kwargs), typed=True)
+
+    def _join(self, key: Hashable) -> Tuple["Future[Any]", bool]:
+        """Return the future for a key, and whether this request must
+        calculate it."""
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            if call is not None:
+                future, expires = call
+                if expires is None:
+                    self.coalesced += 1
+                    return future, False
+                if time.monotonic() < expires:
+                    self.cached += 1
+                    return future, False
+            self.computed += 1
+            future = Future()
+            self._calls[key] = (future, None)
+            if len(self._calls) > self.maxsize:
+                self._evict()
+            return future, True
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key, (_, expires) in list(self._calls.items()):
+            if expires is not None and expires <= now:
+                del self._calls[key]
+        for key in list(self._calls)[: len(self._calls) - self.maxsize]:
+            if self._calls[key][1] is not None:
+                del self._calls[key]
+
+    def _calculate(
+        self,
+        key: Hashable,
+        future: "Future[Any]",
+        test: Any,
+        args: Tuple,
+        kwargs: Dict,
+    ) -> None:
+        try:
+            if self._instance is not None:
+                kwargs = dict(kwargs, instance=self._instance)
+            result = self.framework.quote(test, *args, **kwargs)
+            if isinstance(result, Quote):
+                # Shared by every request for the key, so copied on write.
+                result.breakdown.freeze()
+        except BaseException as error:
+            with self._lock:
+                if self._calls.get(key, (None,))[0] is future:
+                    del self._calls[key]
+            future.set_exception(error)
+            return
+        with self._lock:
+            if self._calls.get(key, (None,))[0] is future:
+                if self.ttl > 0:
+                    self._calls[key] = (future, time.monotonic() + self.ttl)
+                else:
+                    del self._calls[key]
+        future.set_result(result)
+
+    @staticmethod
+    def _own(result: Any, test: Any) -> Any:
+        """Return the caller's own copy of a shared result."""
+        if not isinstance(result, Quote):
+            return result
+        quote = copy.copy(result)
+        quote.quotedata = _data(test)
+        # As for a new Quote: the test's identifier, or a new UUID.
+        identifier = getattr(test, "identifier", None)
+        quote.identifier = uuid.uuid4() if identifier is None else identifier
+        return quote
+
+    def quote(self, test: Any, *args: Any, **kwargs: Any) -> Any:
+        """
+        Calculate a quote, or share an identical request's calculation.
+
+        Args:
+            test: A test case data structure, TestCase or Quote.
+            *args: Additional positional arguments for the calculation method.
+            **kwargs: Additional keyword arguments for the calculation method.
+
+        Returns:
+            The calculated quote.
+        """
+        key = self._key(test, args, kwargs)
+        future, leader = self._join(key)
+        if leader:
+            self._calculate(key, future, test, args, kwargs)
+        return self._own(future.result(), test)
+
+    async def aquote(self, test: Any, *args: Any, **kwargs: Any) -> Any:
+        """
+        Like `quote`, for asyncio callers. Calculations run on the event
+        loop's default executor, so the loop is not blocked.
+        """
+        key = self._key(test, args, kwargs)
+        future, leader = self._join(key)
+        if leader:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None, self._calculate, key, future, test, args, kwargs
+            )
+        return self._own(await asyncio.wrap_future(future), test)
@@ -0,0 +1,491 @@
+"""Columnar Test Suite
+
+A TestSuite that stores its test cases column by column.
+
+A regular TestSuite holds a TestCase, a dict and a uuid per row, which for
+millions of rows and dozens of factors is most of the memory a run uses.
+A ColumnarTestSuite instead keeps one column per factor: integers and
+floats in typed `array`s (8 bytes a value) and everything else dictionary
+encoded, i.e. each distinct value stored once and each row holding a small
+integer code.
+
+Rows are handed out as lightweight TestCase proxies that read from the
+columns, so frameworks written against `testcase["age"]` and
+`"age" in testcase` work unchanged, while batch code can read a whole
+column at once with `column`.
+"""
+
+from array import array
+from collections import Counter
+from collections.abc import Mapping, Sequence
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Union,
+)
+
+from .testcase import TestCase
+from .testsuite import TestSuite
+from sentinelpricing.utils.digest import new_hash, stable_repr
+from sentinelpricing.utils.indexing import IndexCache
+from sentinelpricing.utils.readers import chunked
+
+
+class _Missing:
+    """Placeholder for a field that a row does not have."""
+
+    def __repr__(self) -> str:
+        return "<missing>"
+
+    def __reduce__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+def _stable(value: Any) -> Any:
+    # MISSING is digested as a marker no row value can be.
+    return ("<missing>",) if value is MISSING else value
+
+
+# Code widths for categorical columns, narrowest first.
+_CODE_TYPES = [(code, 1 << (8 * array(code).itemsize)) for code in "BHIQ"]
+
+
+class CategoricalColumn(Sequence):
+    """
+    A dictionary encoded column.
+
+    Each distinct value is stored once in `categories`, and each row holds
+    the position of its value in `codes`, an array of the narrowest
+    unsigned integer type that fits the number of categories. Values are
+    distinct by type as well as value, so 1, 1.0 and True are kept apart.
+    """
+
+    __slots__ = ("categories", "codes", "_lookup", "_limit", "_types")
+
+    def __init__(self, values: Iterable[Any] = ()) -> None:
+        self.categories: List[Any] = []
+        self.codes = array("B")
+        # Value to code while the column holds values of a single type;
+        # (type, value) to code once it holds several, as equal values of
+        # different types (1, 1.0, True) hash and compare equal.
+        self._lookup: Optional[Dict[Any, int]] = {}
+        self._limit = _CODE_TYPES[0][1]
+        self._types: Set[type] = set()
+        self.extend(values)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __iter__(self) -> Iterator[Any]:
+        return map(self.categories.__getitem__, self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.categories[c] for c in self.codes[index]]
+        return self.categories[self.codes[index]]
+
+    def _keys(self, values: List[Any]) -> List[Any]:
+        """Return the lookup keys of values, rebuilding the lookup if it
+        was dropped or the column now holds several types."""
+        types = set(map(type, values))
+        typed = len(self._types) > 1
+        if not types <= self._types:
+            self._types |= types
+            if not typed and len(self._types) > 1:
+                self._lookup, typed = None, True
+        if self._lookup is None:
+            categories = self.categories
+            if typed:
+                categories = zip(map(type, categories), categories)
+            self._lookup = {v: i for i, v in enumerate(categories)}
+        if typed:
+            return list(zip(map(type, values), values))
+        return values
+
+    def append(self, value: Any) -> None:
+        """Append a (hashable) value to the column."""
+        self.extend([value])
+
+    def extend(self, values: Iterable[Any]) -> None:
+        """Append (hashable) values to the column.
+
+        New values are added to the categories first, so an unhashable
+        value raises TypeError before the column is changed.
+        """
+        values = values if isinstance(values, list) else list(values)
+        keys = self._keys(values)
+        lookup = self._lookup
+        assert lookup is not None
+        for key in dict.fromkeys(keys):
+            if key not in lookup:
+                lookup[key] = len(self.categories)
+                self.categories.append(key if keys is values else key[1])
+        if len(self.categories) > self._limit:
+            self._widen()
+        self.codes.extend(map(lookup.__getitem__, keys))
+
+    def _widen(self) -> None:
+        for typecode, limit in _CODE_TYPES:
+            if limit >= len(self.categories):
+                self.codes = array(typecode, self.codes)
+                self._limit = limit
+                return
+
+    def compact(self) -> None:
+        """Drop the value to code lookup, which is rebuilt if needed."""
+        self._lookup = None
+
+    def counts(self) -> Dict[Any, int]:
+        """Return the number of rows holding each value. Equal values of
+        different types are counted together, as in a dict."""
+        counts: Dict[Any, int] = {}
+        for code, count in Counter(self.codes).items():
+            value = self.categories[code]
+            counts[value] = counts.get(value, 0) + count
+        return counts
+
+
+def _new_column(value: Any) -> Union[array, CategoricalColumn, list]:
+    kind = type(value)
+    if kind is int:
+        return array("q")
+    if kind is float:
+        return array("d")
+    try:
+        hash(value)
+    except TypeError:
+        return []
+    return CategoricalColumn()
+
+
+def _extend(columns: Dict[str, Any], key: str, values: List[Any]) -> None:
+    """Append values to a column, converting the column to a more general
+    kind if they do not fit the current one."""
+    column = columns[key]
+    if isinstance(column, array):
+        expected = int if column.typecode == "q" else float
+        if set(map(type, values)) == {expected}:
+            try:
+                column.extend(array(column.typecode, values))
+                return
+            except OverflowError:
+                pass
+        column = columns[key] = CategoricalColumn(column)
+    if isinstance(column, CategoricalColumn):
+        try:
+            column.extend(values)
+            return
+        except TypeError:
+            column = columns[key] = list(column)
+    column.extend(values)
+
+
+# Rows buffered per column before being appended to the typed columns.
+_BLOCK_SIZE = 4096
+
+
+def build_columns(
+    records: Iterable[Mapping],
+) -> Dict[str, Union[array, CategoricalColumn, list]]:
+    """
+    Convert an iterable of records into columns, in a single pass.
+
+    Columns holding only ints or only floats become typed arrays; any other
+    column of hashable values is dictionary encoded, and the rest are
+    plain lists. Rows without a field hold MISSING in its column.
+
+    Values are buffered in small blocks of rows and appended to each column
+    a block at a time, so type checks and encoding run in bulk.
+
+    Args:
+        records (Iterable[Mapping]): The rows.
+
+    Returns:
+        Dict[str, Sequence]: Mapping of field name to column.
+    """
+    columns: Dict[str, Any] = {}
+    block: Dict[str, List[Any]] = {}
+    flushed = rows = 0
+
+    def flush():
+        for key, values in block.items():
+            if key not in columns:
+                first = next((v for v in values if v is not MISSING), None)
+                columns[key] = _new_column(first)
+                if flushed:
+                    _extend(columns, key, [MISSING] * flushed)
+            _extend(columns, key, values)
+            block[key] = []
+
+    for record in records:
+        for key, value in record.items():
+            try:
+                block[key].append(value)
+            except KeyError:
+                block[key] = [MISSING] * (rows - flushed) + [value]
+        rows += 1
+        if len(record) != len(block):
+            for values in block.values():
+                if len(values) < rows - flushed:
+                    values.append(MISSING)
+        if rows - flushed == _BLOCK_SIZE:
+            flush()
+            flushed = rows
+    flush()
+
+    for column in columns.values():
+        if isinstance(column, CategoricalColumn):
+            column.compact()
+    return columns
+
+
+class ColumnarRow(Mapping):
+    """
+    Read-only mapping view of one row of a ColumnarTestSuite.
+    """
+
+    __slots__ = ("_columns", "_index")
+
+    def __init__(self, columns: Dict[str, Sequence], index: int) -> None:
+        self._columns = columns
+        self._index = index
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self._columns[key][self._index]
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: Any) -> bool:
+        column = self._columns.get(key)
+        return column is not None and column[self._index] is not MISSING
+
+    def __iter__(self) -> Iterator[Any]:
+        i = self._index
+        return (k for k, c in self._columns.items() if c[i] is not MISSING)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class ColumnarTestCase(TestCase):
+    """
+    A TestCase whose data is a row of a ColumnarTestSuite.
+
+    Created on demand when a row is accessed, rather than stored.
+    """
+
+    def __init__(self, suite: "ColumnarTestSuite", index: int) -> None:
+        self.data = ColumnarRow(suite._columns, index)
+        self.quotes: List = []
+        self.identifier = suite._identifier(index)
+
+
+class _Rows(Sequence):
+    """
+    The rows of a ColumnarTestSuite, as a read-only sequence of TestCases.
+
+    The suite cannot be modified, so the version seen by index caches never
+    changes.
+    """
+
+    __slots__ = ("_suite",)
+
+    version = 0
+
+    def __init__(self, suite: "ColumnarTestSuite") -> None:
+        self._suite = suite
+
+    def __len__(self) -> int:
+        return self._suite._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("row index out of range")
+        return ColumnarTestCase(self._suite, index)
+
+    def __iter__(self) -> Iterator[ColumnarTestCase]:
+        suite = self._suite
+        return (ColumnarTestCase(suite, i) for i in range(len(self)))
+
+    def __add__(self, other: Iterable[TestCase]) -> List[TestCase]:
+        return list(self) + list(other)
+
+    def __radd__(self, other: Iterable[TestCase]) -> List[TestCase]:
+        return list(other) + list(self)
+
+
+class ColumnarTestSuite(TestSuite):
+    """Columnar Test Suite
+
+    A read-only TestSuite stored as one typed or dictionary encoded column
+    per factor. Built the same way as a TestSuite:
+
+        >>> tests = ColumnarTestSuite.from_csv("tests.csv", types=types)
+        >>> for chunk in ColumnarTestSuite.iter_csv("tests.csv"):
+        ...     accumulator.consume(motor_r22.quote_iter(chunk))
+
+    Rows are identified by `id_column` if given, otherwise by their
+    TestCase identifier when built from TestCases, otherwise by their
+    position, counted from `start`; the chunks of `iter_records` and
+    `iter_csv` carry it on, so positions are unique within a file.
+    Operations that select rows (subset, intersection, etc.)
+    return regular TestSuites of row proxies.
+    """
+
+    MISSING = MISSING
+
+    def __init__(
+        self,
+        tests: Iterable[Union[TestCase, Mapping]] = (),
+        id_column: Optional[str] = None,
+        start: int = 0,
+    ) -> None:
+        # Identifiers are only kept for rows built from TestCases; rows
+        # built from dicts are identified by their position.
+        identifiers: List[Any] = []
+        length = 0
+
+        def records():
+            nonlocal length
+            for test in tests:
+                if isinstance(test, TestCase):
+                    if len(identifiers) < length:
+                        identifiers.extend(
+                            range(start + len(identifiers), start + length)
+                        )
+                    identifiers.append(test.identifier)
+                    yield test.data
+                elif isinstance(test, Mapping):
+                    if identifiers:
+                        identifiers.append(start + length)
+                    yield test
+                else:
+                    raise TypeError("Expected dict or TestCase")
+                length += 1
+
+        self._columns = build_columns(records())
+        self._length = length
+        self._id_column = id_column
+        self._start = start
+        self._ids: Optional[Sequence] = None
+        if id_column is not None and length:
+            self._ids = self._columns[id_column]
+        elif identifiers:
+            self._ids = identifiers
+        self._rows = _Rows(self)
+        self._indexes = IndexCache(self._rows)
+
+    @property
+    def testcases(self) -> Sequence[ColumnarTestCase]:
+        return self._rows
+
+    @testcases.setter
+    def testcases(self, testcases: Iterable[TestCase]) -> None:
+        raise AttributeError("ColumnarTestSuite is read-only.")
+
+    def _identifier(self, index: int) -> Any:
+        if self._ids is None:
+            return self._start + index
+        return self._ids[index]
+
+    @classmethod
+    def from_records(
+        cls, records: Iterable[Mapping], id_column: Optional[str] = None
+    ) -> "ColumnarTestSuite":
+        """From Records
+
+        Builds a ColumnarTestSuite from an iterable of dictionaries in a
+        single pass, without creating a TestCase per row.
+        """
+        return cls(records, id_column=id_column)
+
+    @classmethod
+    def iter_records(
+        cls,
+        records: Iterable[Mapping],
+        chunk_size: int = 10_000,
+        id_column: Optional[str] = None,
+    ) -> Iterator["ColumnarTestSuite"]:
+        """Iter Records
+
+        Yields ColumnarTestSuites of at most `chunk_size` rows, each
+        starting its positions where the previous chunk ended.
+        """
+        start = 0
+        for chunk in chunked(records, chunk_size):
+            suite = cls(chunk, id_column=id_column, start=start)
+            start += len(suite)
+            yield suite
+
+    @property
+    def columns(self) -> List[str]:
+        """The names of the columns, in first seen order."""
+        return list(self._columns)
+
+    def column(self, name: str) -> Sequence:
+        """Column
+
+        Returns a whole column, without copying: an `array` for int and
+        float columns, a CategoricalColumn (see its `codes` and
+        `categories`) for other hashable values, or a list. Rows without
+        the field hold `ColumnarTestSuite.MISSING`.
+        """
+        return self._columns[name]
+
+    def digest(self) -> Optional[str]:
+        """Digest
+
+        Returns a hex digest of the columns, computed from the raw column
+        buffers rather than row by row, or None if a value has no stable
+        repr (see `stable_repr`).
+        """
+
+        def build():
+            digest = new_hash()
+            digest.update(repr(self._length).encode())
+            for name, column in self._columns.items():
+                if isinstance(column, CategoricalColumn):
+                    values = column.categories
+                    column = column.codes
+                elif isinstance(column, array):
+                    values = []
+                else:
+                    values = column
+                text = stable_repr([name] + [_stable(v) for v in values])
+                if text is None:
+                    return None
+                digest.update(text.encode())
+                if isinstance(column, array):
+                    digest.update(column.typecode.encode())
+                    digest.update(column.tobytes())
+            return digest.hexdigest()
+
+        return self._indexes.get("digest", build)
+
+    def _counts(self, by=None) -> Dict[Any, int]:
+        column = self._columns.get(by) if isinstance(by, str) else None
+        if column is None:
+            return super()._counts(by)
+        if isinstance(column, CategoricalColumn):
+            counts = column.counts()
+        else:
+            counts = Counter(column)
+        if MISSING in counts:
+            raise KeyError(by)
+        return counts
@@ -0,0 +1,430 @@
+"""Dedup
+
+Rating each distinct combination of rating factors once.
+
+Large test suites often hold many rows that only differ in fields the
+framework never reads (policy numbers, names, dates of entry). When
+deduplication is enabled, `Framework.quote_many` rates the first row of
+each distinct combination of rating factors, freezes its breakdown and
+fans it out to every later row with the same combination: each of those
+rows gets its own Quote and identifier, sharing the representative's
+(immutable) breakdown.
+
+The rating factors are either declared or learnt. Every representative is
+rated with its quote data wrapped in a ReadTracer. With declared factors,
+a key read that was not declared is added to the dedup key (with a
+warning) and the rows seen so far are re-keyed. Otherwise results are kept
+in a QuoteCache, a trie of the keys each branch of `calculation` read, so
+rows only need to match on the factors their own branch depends on. Two
+rows that agree on every key read while rating one of them take the same
+path through `calculation`, so neither approach merges rows that would
+have been priced differently.
+"""
+
+import threading
+import warnings
+from abc import ABC, abstractmethod
+from itertools import repeat
+from time import perf_counter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .quote import Quote
+from sentinelpricing.utils.fingerprint import fingerprint
+from sentinelpricing.utils.tracing import ABSENT, ReadTracer, ReadTrie
+
+if TYPE_CHECKING:
+    from .framework import Framework
+
+
+# Attributes of a representative quote that are not shared with the rows
+# fanned out from it.
+_OWN_ATTRIBUTES = frozenset(("quotedata", "identifier"))
+
+
+class DedupReport:
+    """
+    Summary of a deduplicated `quote_many` run.
+
+    Attributes:
+        rows (int): The number of quotes produced.
+        distinct (int): The number of quotes actually rated.
+        factors (Tuple[Any, ...]): The keys rows were deduplicated on. None
+            if rows had to be compared on all of their data.
+        rating_time (float): Seconds spent rating the distinct rows.
+        overhead_time (float): Seconds spent keying and fanning out rows.
+    """
+
+    def __init__(
+        self,
+        rows: int,
+        distinct: int,
+        factors: Optional[Tuple[Any, ...]],
+        rating_time: float,
+        overhead_time: float,
+    ) -> None:
+        self.rows = rows
+        self.distinct = distinct
+        self.factors = factors
+        self.rating_time = rating_time
+        self.overhead_time = overhead_time
+
+    def __repr__(self) -> str:
+        return (
+            f"DedupReport(rows={self.rows}, distinct={self.distinct}, "
+            f"ratio={self.ratio:.2f}, time_saved={self.time_saved:.3f}s)"
+        )
+
+    @property
+    def ratio(self) -> float:
+        """Rows per distinct rating, e.g. 4.0 if each rating was reused by
+        four rows on average."""
+        return self.rows / self.distinct if self.distinct else 1.0
+
+    @property
+    def time_saved(self) -> float:
+        """Estimated seconds saved: the rows not rated, at the average time
+        per rating, less the time spent keying and fanning out."""
+        if not self.distinct:
+            return 0.0
+        per_rating = self.rating_time / self.distinct
+        return per_rating * (self.rows - self.distinct) - self.overhead_time
+
+    def summary(self) -> str:
+        """Return a human readable summary of the run."""
+        factors = "all data" if self.factors is None else list(self.factors)
+        return "\n".join(
+            (
+                f"Rows:           {self.rows}",
+                f"Distinct rated: {self.distinct}",
+                f"Dedup ratio:    {self.ratio:.2f}x",
+                f"Rating time:    {self.rating_time:.3f}s",
+                f"Overhead:       {self.overhead_time:.3f}s",
+                f"Time saved:     {self.time_saved:.3f}s (estimated)",
+                f"Factors:        {factors}",
+            )
+        )
+
+
+def _dedup_key(data: Any, factors: Optional[Sequence[Any]]) -> Hashable:
+    if factors is None:
+        return fingerprint(data)
+    key = tuple(map(data.get, factors, repeat(ABSENT)))
+    try:
+        hash(key)
+    except TypeError:
+        return fingerprint(key)
+    return key
+
+
+def _signature(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Hashable:
+    """Key results on any extra arguments given to `calculation`."""
+    return fingerprint((args, kwargs)) if args or kwargs else None
+
+
+class _RatingCache(ABC):
+    """
+    Shared logic of the caches used to rate a row once and share the
+    result: rating with traced reads, and filing the result's attributes.
+    """
+
+    keys: Optional[Tuple[Any, ...]] = ()
+
+    def lookup(self, quote: Quote, signature: Hashable = None) -> bool:
+        """
+        Fill in `quote` from a stored result, if there is one.
+
+        Args:
+            quote (Quote): An unrated quote.
+            signature (Hashable): See `_signature`.
+
+        Returns:
+            bool: Whether a stored result was found.
+        """
+        shared = self._get(quote.quotedata, signature)
+        if shared is None:
+            return False
+        quote.__dict__.update(shared)
+        return True
+
+    def rate(
+        self, instance: "Framework", quote: Quote, *args: Any, **kwargs: Any
+    ) -> Any:
+        """
+        Rate a quote, recording the keys it reads, and store the result.
+
+        Args:
+            instance (Framework): The framework instance to rate with.
+            quote (Quote): An unrated quote.
+            *args: Additional positional arguments for the calculation method.
+            **kwargs: Additional keyword arguments for the calculation method.
+
+        Returns:
+            The result of the calculation, typically `quote`.
+        """
+        data = quote.quotedata
+        tracer = ReadTracer(data)
+        quote.quotedata = tracer
+        try:
+            result = instance._calculate_wrapper(quote, *args, **kwargs)
+        finally:
+            quote.quotedata = data
+        # A calculation that builds its own result cannot share it.
+        if result is quote:
+            quote.breakdown.freeze()
+            shared = {
+                name: value
+                for name, value in quote.__dict__.items()
+                if name not in _OWN_ATTRIBUTES
+            }
+            self._put(type(instance), tracer, shared, _signature(args, kwargs))
+        return result
+
+    @abstractmethod
+    def _get(self, data: Any, signature: Hashable) -> Optional[Dict]:
+        """Return the shared attributes stored for quote data, if any."""
+
+    @abstractmethod
+    def _put(
+        self,
+        framework: type,
+        tracer: ReadTracer,
+        shared: Dict[str, Any],
+        signature: Hashable,
+    ) -> None:
+        """Store the shared attributes of a result, filed under the reads
+        recorded by `tracer`."""
+
+
+class _FactorCache(_RatingCache):
+    """
+    Results keyed on a declared list of factors.
+
+    If `calculation` reads a key that was not declared, a warning is issued
+    and the key is added, re-keying the results stored so far.
+    """
+
+    def __init__(self, factors: Iterable[Any]) -> None:
+        self.keys = tuple(factors)
+        # Dedup key to the shared attributes, and the data they came from.
+        self._results: Dict[Hashable, Dict[str, Any]] = {}
+        self._data: Dict[Hashable, Any] = {}
+
+    def _get(self, data: Any, signature: Hashable) -> Optional[Dict]:
+        return self._results.get(_dedup_key(data, self.keys))
+
+    def _put(
+        self,
+        framework: type,
+        tracer: ReadTracer,
+        shared: Dict[str, Any],
+        signature: Hashable,
+    ) -> None:
+        keys = self.keys
+        if keys is not None:
+            learnt: Optional[Tuple[Any, ...]] = None
+            if not tracer.read_all:
+                new = tuple(k for k in tracer.reads if k not in keys)
+                learnt = keys + new
+                if new:
+                    warnings.warn(
+                        f"{framework.__name__}.calculation read {list(new)}, "
+                        "which are not in the declared rating factors; "
+                        "deduplicating on them too."
+                    )
+            if learnt != keys:
+                self.keys = learnt
+                rekeyed = {
+                    _dedup_key(d, learnt): k for k, d in self._data.items()
+                }
+                self._results = {
+                    k: self._results[old] for k, old in rekeyed.items()
+                }
+                self._data = {k: self._data[old] for k, old in rekeyed.items()}
+        key = _dedup_key(tracer.data, self.keys)
+        self._results[key] = shared
+        self._data[key] = tracer.data
+
+
+class QuoteCache(_RatingCache):
+    """
+    Results of a framework, keyed on only the quote data each branch of its
+    calculation reads.
+
+    Every miss is rated with its quote data wrapped in a ReadTracer, and
+    the result filed in a ReadTrie under the (key, value) pairs it read.
+    Rows that differ only in fields the calculation did not read on their
+    branch (names, policy numbers) then hit the cache. Results are kept
+    separately for each set of extra arguments to `calculation`.
+
+    A Framework with `cache_results = True` keeps one QuoteCache across
+    calls; see `Framework.result_cache`. It may be shared by threads:
+    results are stored under a lock, and looked up without one.
+    """
+
+    def __init__(self) -> None:
+        self._tries: Dict[Hashable, ReadTrie] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of results stored."""
+        return sum(len(trie) for trie in self._tries.values())
+
+    def __repr__(self) -> str:
+        return (
+            f"QuoteCache(size={len(self)}, hits={self.hits}, "
+            f"misses={self.misses}, invalidations={self.invalidations})"
+        )
+
+    @property
+    def keys(self) -> Tuple[Any, ...]:
+        """The quote data keys read so far, in the order first read."""
+        keys: Dict[Any, None] = {}
+        for trie in self._tries.values():
+            keys.update(trie.keys)
+        return tuple(keys)
+
+    @property
+    def invalidations(self) -> int:
+        """The number of times stored results were found to be stale and
+        dropped."""
+        return sum(trie.invalidations for trie in self._tries.values())
+
+    def clear(self) -> None:
+        """Drop every stored result and the statistics."""
+        with self._lock:
+            self._tries = {}
+            self.hits = self.misses = 0
+
+    def quote(
+        self,
+        framework: type,
+        test: Any,
+        *args: Any,
+        instance: Optional["Framework"] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Return the quote for a test, rating it only if no stored result
+        matches.
+
+        Args:
+            framework (type): The Framework subclass.
+            test: A test case data structure or a Quote instance. Quotes are
+                always rated, as they may carry their own breakdown.
+            *args: Additional positional arguments for the calculation method.
+            instance (Framework, optional): The instance to rate with, which
+                is otherwise only created on a miss.
+            **kwargs: Additional keyword arguments for the calculation method.
+        """
+        if isinstance(test, Quote):
+            instance = framework() if instance is None else instance
+            return instance._calculate_wrapper(test, *args, **kwargs)
+        quote = Quote(test, framework)
+        if self.lookup(quote, _signature(args, kwargs)):
+            return quote
+        instance = framework() if instance is None else instance
+        return self.rate(instance, quote, *args, **kwargs)
+
+    def _get(self, data: Any, signature: Hashable) -> Optional[Dict]:
+        trie = self._tries.get(signature)
+        shared = None if trie is None else trie.get(data)
+        with self._lock:
+            if shared is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return shared
+
+    def _put(
+        self,
+        framework: type,
+        tracer: ReadTracer,
+        shared: Dict[str, Any],
+        signature: Hashable,
+    ) -> None:
+        with self._lock:
+            trie = self._tries.get(signature)
+            if trie is None:
+                trie = self._tries[signature] = ReadTrie()
+            stored = trie.put(tracer, shared)
+        if not stored:
+            warnings.warn(
+                f"{framework.__name__}.calculation read different keys for "
+                "the same quote data; its result cache was invalidated."
+            )
+
+
+def quote_deduplicated(
+    instance: "Framework",
+    tests: Iterable[Any],
+    factors: Optional[Iterable[Any]],
+    cache: Optional[QuoteCache],
+    *args: Any,
+    **kwargs: Any,
+) -> Tuple[List[Any], DedupReport]:
+    """
+    Rate tests with an instance of a framework, rating each distinct
+    combination of factors once.
+
+    Args:
+        instance (Framework): The framework instance to rate with.
+        tests (Iterable[Any]): Test case data or TestCases. Quote instances
+            are rated individually, as they may carry their own breakdown.
+        factors (Iterable[Any], optional): Keys to deduplicate on. They are
+            extended (with a warning) if `calculation` reads other keys.
+        cache (QuoteCache, optional): If `factors` is None, the cache to
+            look results up in and add them to. A new cache is used if None,
+            so keys are learnt for this run only.
+        *args: Additional positional arguments for the calculation method.
+        **kwargs: Additional keyword arguments for the calculation method.
+
+    Returns:
+        Tuple[List[Any], DedupReport]: The quotes, in the order of `tests`,
+            and a report of the run.
+    """
+    framework = type(instance)
+    if factors is not None:
+        results: _RatingCache = _FactorCache(factors)
+    else:
+        results = QuoteCache() if cache is None else cache
+    signature = _signature(args, kwargs)
+    quotes: List[Any] = []
+    rating_time = 0.0
+    distinct = 0
+    start = perf_counter()
+
+    for test in tests:
+        if isinstance(test, Quote):
+            began = perf_counter()
+            quotes.append(instance._calculate_wrapper(test, *args, **kwargs))
+            rating_time += perf_counter() - began
+            distinct += 1
+            continue
+
+        quote = Quote(test, framework)
+        if results.lookup(quote, signature):
+            quotes.append(quote)
+            continue
+
+        began = perf_counter()
+        quotes.append(results.rate(instance, quote, *args, **kwargs))
+        rating_time += perf_counter() - began
+        distinct += 1
+
+    overhead = perf_counter() - start - rating_time
+    report = DedupReport(
+        len(quotes), distinct, results.keys, rating_time, overhead
+    )
+    return quotes, report
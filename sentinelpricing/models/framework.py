@@ -1,10 +1,41 @@
 import abc
-from typing import Any, List, Callable, Union
-
+import inspect
+import os
+from array import array
+from concurrent.futures import Executor
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Callable,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .dedup import QuoteCache, quote_deduplicated
 from .pricetest import PriceTest
 from .quote import Quote
 from .quoteset import QuoteSet
-from .lookuptable import LookupTable
+from .lookuptable import LazyLookupTable, LookupTable
+from .memoize import MemoInfo, MemoizedMethod
+from .rerate import HitRecord, compare_many, rerate
+from .resultstore import ResultStore
+from .snapshot import Snapshot, write_snapshot
+from .tableloader import TableLoadReport, TableSpec, load_tables
+from sentinelpricing.utils.digest import (
+    new_hash,
+    source_of,
+    stable_repr,
+    state_repr,
+)
+from sentinelpricing.utils.tracing import RowHitRecorder, row_hits
 
 
 class Framework(abc.ABC):
@@ -49,8 +80,38 @@ class Framework(abc.ABC):
     # Public attributes.
     name: Union[str, None] = None
 
-    # These aren't really in use yet, but serve as a reminder that dates are
-    # a pain point I want to address.
+    # The quote data keys `calculation` depends on, if known. Used by
+    # `quote_many(..., dedup=True)`.
+    rating_factors: Optional[Collection[Any]] = None
+
+    # Keep a cache of results across `quote`, `quote_iter` and `quote_many`
+    # calls, keyed on the quote data each branch of `calculation` reads.
+    # Only suitable if `calculation` depends on nothing but the quote data,
+    # its arguments and the state set up: the cache is dropped whenever an
+    # instance is set up with tables or values that differ from the last
+    # one's. See `result_cache`.
+    cache_results: bool = False
+    _result_cache: Optional[QuoteCache] = None
+
+    # The state token of the last instance set up, and the shared tables it
+    # identifies by id(), kept alive so the ids are not reused.
+    _cache_state: Optional[Tuple[Hashable, List[Any]]] = None
+
+    # Store results on disk, keyed on the digests of the framework and the
+    # tests, so unchanged reruns of `quote_many` are loaded.
+    result_store: Optional[ResultStore] = None
+
+    # The table_id of each table, by id(), if this instance records the
+    # lookup table rows each quote hits.
+    _table_ids: Optional[Dict[int, int]] = None
+
+    # The snapshot new instances are restored from instead of running set
+    # up, once `from_snapshot` has been called on the class.
+    _snapshot: Optional[Snapshot] = None
+
+    # The period the framework's rates are in force, from effective_date up
+    # to, not including, expiry_date (dates or ISO strings; None for no
+    # limit). Used by FrameworkRouter to pick the version for each quote.
     effective_date: Any = None
     expiry_date: Any = None
 
@@ -59,10 +120,18 @@ class Framework(abc.ABC):
         Initialize a new instance of the Framework.
 
         During initialization, all inherited set up methods are executed first,
-        followed by the subclass's own `setup` method.
+        followed by the subclass's own `setup` method. If the class has been
+        restored from a snapshot (see `from_snapshot`), the instance takes
+        the snapshot's state instead.
         """
-        self._run_inherited_setup_methods()
-        self.setup()
+        snapshot = type(self).__dict__.get("_snapshot")
+        if snapshot is not None:
+            snapshot.restore(self)
+        else:
+            self._run_inherited_setup_methods()
+            self.setup()
+        if self.cache_results or self._memoized_methods():
+            self._check_cache_state()
 
     def __init_subclass__(cls, **kwargs: Any) -> None:
         """
@@ -125,23 +194,274 @@ class Framework(abc.ABC):
         """
         # Convert test to a Quote instance if it isn't one already.
         q = test if isinstance(test, Quote) else Quote(test, self.__class__)
-        return self.calculation(q, *args, **kwargs)
+        if self._table_ids is None:
+            return self.calculation(q, *args, **kwargs)
+
+        recorder = RowHitRecorder(self._table_ids)
+        token = row_hits.set(recorder)
+        try:
+            result = self.calculation(q, *args, **kwargs)
+        finally:
+            row_hits.reset(token)
+        if isinstance(result, Quote):
+            result.row_hits = array("Q", sorted(recorder.hits))
+        return result
+
+    def _lookup_tables(self) -> Dict[str, LookupTable]:
+        """
+        Return the LookupTables held by this instance, including those in
+        lists, tuples and dicts, by attribute path (e.g. "age",
+        "bands[0]" or "tables['lic']").
+        """
+        tables: Dict[str, LookupTable] = {}
+
+        def walk(path: str, value: Any) -> None:
+            if isinstance(value, LookupTable):
+                tables[path] = value
+            elif isinstance(value, (list, tuple)):
+                for i, item in enumerate(value):
+                    walk(f"{path}[{i}]", item)
+            elif isinstance(value, dict):
+                for key, item in value.items():
+                    walk(f"{path}[{key!r}]", item)
+
+        for name, value in vars(self).items():
+            walk(name, value)
+        return tables
+
+    def load_tables(
+        self,
+        specs: Mapping[str, TableSpec],
+        executor: Union[str, Executor] = "thread",
+        max_workers: Optional[int] = None,
+    ) -> TableLoadReport:
+        """
+        Load tables concurrently and assign them to the instance, for use
+        in `setup`.
+
+        Tables are only assigned once all have loaded; if any fails, none
+        are, and a TableLoadError lists every failure (see
+        `sentinelpricing.models.tableloader`).
+
+        Args:
+            specs (Mapping[str, TableSpec]): The attribute name of each
+                table, mapped to the CSV file it is loaded from (with
+                `LookupTable.from_csv`, named after the attribute) or a
+                function returning it.
+            executor (str or Executor): "thread" (the default) for a thread
+                pool, suited to tables dominated by file I/O; "process" for
+                a process pool, for CPU bound parsing, in which case
+                functions must be picklable and tables are not shared
+                through the table cache; or an Executor to use.
+            max_workers (int, optional): The size of the pool created.
+
+        Returns:
+            TableLoadReport: How long each table took to load, and the
+                critical path: the tables set up waited for.
+
+        Raises:
+            TableLoadError: If any table failed to load.
+        """
+        tables, report = load_tables(specs, executor, max_workers)
+        for name, table in tables.items():
+            setattr(self, name, table)
+        return report
+
+    def _record_row_hits(self, table_ids: Optional[Dict[str, int]] = None):
+        """
+        Number this instance's tables and record the rows each quote hits
+        as its `row_hits`.
+
+        Args:
+            table_ids (Dict[str, int], optional): Ids to keep for tables at
+                the same paths, e.g. those of an earlier run.
+        """
+        table_ids = dict(table_ids or {})
+        next_id = max(table_ids.values(), default=-1) + 1
+        self._table_ids = {}
+        for path, table in self._lookup_tables().items():
+            if path not in table_ids:
+                table_ids[path] = next_id
+                next_id += 1
+            self._table_ids[id(table)] = table_ids[path]
+
+    def _code_digest(self) -> str:
+        """
+        Return the digest of everything but set up and the lookup tables:
+        the methods and public class attributes of the framework and its
+        public instance state.
+        """
+        digest = new_hash()
+        for name in dir(type(self)):
+            if name == "setup" or name.startswith("__"):
+                continue
+            value = inspect.getattr_static(type(self), name)
+            if inspect.getattr_static(Framework, name, None) is value:
+                continue
+            value = getattr(value, "__func__", value)
+            value = getattr(value, "__wrapped__", value)
+            if callable(value):
+                digest.update(name.encode() + source_of(value))
+            elif not name.startswith("_"):
+                digest.update(f"{name}={stable_repr(value)}".encode())
+        holding_tables = {
+            path.split("[", 1)[0] for path in self._lookup_tables()
+        }
+        for name, value in sorted(vars(self).items()):
+            if name not in holding_tables and not name.startswith("_"):
+                digest.update(f"{name}={state_repr(value)}\n".encode())
+        return digest.hexdigest()
+
+    def _state_token(self) -> Tuple[Hashable, List[Any]]:
+        """
+        Return a token of the state set up, cheaper than a digest: shared
+        tables (frozen, e.g. from the table cache, or lazy, e.g. restored
+        from a snapshot) are identified by id() and so are neither hashed
+        nor loaded; other tables and values by their contents.
+
+        Returns:
+            Tuple[Hashable, List[Any]]: The token, and the shared tables it
+                identifies by id().
+        """
+        shared: List[Any] = []
+
+        def part(value: Any) -> Hashable:
+            if isinstance(value, LookupTable) and (
+                isinstance(value, LazyLookupTable) or value.frozen
+            ):
+                shared.append(value)
+                return ("table", id(value))
+            if isinstance(value, (list, tuple)):
+                return tuple(map(part, value))
+            if isinstance(value, dict):
+                return tuple(
+                    (state_repr(k), part(v)) for k, v in value.items()
+                )
+            return state_repr(value)
+
+        token = tuple(
+            (name, part(value)) for name, value in sorted(vars(self).items())
+        )
+        return token, shared
+
+    def _check_cache_state(self) -> None:
+        """
+        Drop the class's cached results, and those of its memoized
+        methods, if this instance was set up with different state from the
+        last instance, e.g. after a table was reloaded, so results
+        calculated with the old tables are not served.
+        """
+        cls = type(self)
+        state = self._state_token()
+        previous = cls.__dict__.get("_cache_state")
+        if previous is not None and previous[0] == state[0]:
+            return
+        cls._cache_state = state
+        if previous is not None:
+            cls.clear_cache()
+
+    def _digest(self) -> str:
+        """
+        Return the digest of this instance's code and state. See `digest`.
+        """
+        digest = new_hash()
+        self._hash_source(digest)
+        for name, value in sorted(vars(self).items()):
+            digest.update(f"{name}={state_repr(value)}\n".encode())
+        return digest.hexdigest()
+
+    @classmethod
+    def _hash_source(cls, digest: Any) -> None:
+        """
+        Update a hash with the source of the class and its Framework
+        parents, and the inherited set up methods.
+        """
+        for klass in cls.__mro__:
+            if klass not in (Framework, abc.ABC, object):
+                digest.update(source_of(klass))
+        for setup_method in cls._setup_methods:
+            digest.update(source_of(setup_method))
+
+    @classmethod
+    def digest(cls) -> str:
+        """
+        Return a content fingerprint of the framework, as a hex digest that
+        is stable across processes.
+
+        It covers the source of the class and its Framework parents, the
+        inherited set up methods, and the state left by set up: the
+        contents of every LookupTable (or other object with a `digest`
+        method) and every plain value. Other objects only contribute their
+        type, and code outside the classes (e.g. module level helpers) is
+        not covered.
+
+        Returns:
+            str: The digest.
+        """
+        return cls()._digest()
+
+    @classmethod
+    def snapshot(cls, path: Union[str, os.PathLike]) -> None:
+        """
+        Run set up and save the resulting state to a file, for
+        `from_snapshot`.
+
+        The state saved is every LookupTable, PriceTest and Rate, and plain
+        values, held by the instance (see
+        `sentinelpricing.models.snapshot`).
+
+        Args:
+            path (str or PathLike): The file to write.
+
+        Raises:
+            TypeError: If set up leaves any other kind of object on the
+                instance.
+        """
+        write_snapshot(cls(), path)
+
+    @classmethod
+    def from_snapshot(
+        cls, path: Union[str, os.PathLike], check: bool = True
+    ) -> "Framework":
+        """
+        Restore the framework from a snapshot instead of running set up.
+
+        Only the snapshot's header is read; the file is memory mapped and
+        each table is decoded when first used. From then on every new
+        instance of the class, including those created by `quote` and
+        `quote_many`, is restored from the snapshot, sharing its tables.
+
+        Args:
+            path (str or PathLike): A file written by `snapshot`.
+            check (bool): Refuse the snapshot if the code of the framework
+                or any file its tables were loaded from has changed since
+                it was written. Defaults to True.
+
+        Returns:
+            Framework: A restored instance.
+
+        Raises:
+            ValueError: If the file is not a current snapshot of this class.
+        """
+        cls._snapshot = Snapshot(cls, path, check)
+        return cls()
 
     def describe(self) -> None:
         """
         Print out details about the framework.
 
-        This method inspects the instance for any attributes that are instances
-        of LookupTable and prints them out. This can be useful for debugging
-        or simply understanding the configuration of the framework.
+        This method lists the LookupTables held by the instance (see
+        `_lookup_tables`), and whether each has been loaded: tables created
+        with `LookupTable.lazy` are only loaded once used. This can be
+        useful for debugging or simply understanding the configuration of
+        the framework.
         """
-        rating_tables = []
-        for attr_name in dir(self):
-            attr = getattr(self, attr_name)
-            if isinstance(attr, LookupTable):
-                rating_tables.append(attr)
+        tables = self._lookup_tables()
+        loaded = sum(table.loaded for table in tables.values())
         print("Framework:", self)
-        print("Rating Tables:", rating_tables)
+        print(f"Rating Tables: {len(tables)} ({loaded} loaded)")
+        for path, table in tables.items():
+            print(f"  {path}:", "loaded" if table.loaded else "not loaded")
 
     @abc.abstractmethod
     def setup(self) -> None:
@@ -176,30 +496,226 @@ class Framework(abc.ABC):
         pass
 
     @classmethod
-    def quote_many(cls, tests: List[Any], *args: Any, **kwargs: Any) -> Any:
+    def result_cache(cls) -> QuoteCache:
+        """
+        Return the cache of results kept when `cache_results` is True.
+
+        Each Framework subclass has its own cache, created on first use.
+        Results are keyed on only the quote data keys that the branch of
+        `calculation` taken actually read (see
+        `sentinelpricing.models.dedup.QuoteCache`), so rows differing in
+        unused fields share a result.
+
+        Returns:
+            QuoteCache: The cache, with `hits`, `misses` and `keys`.
+        """
+        cache = cls.__dict__.get("_result_cache")
+        if cache is None:
+            cache = QuoteCache()
+            cls._result_cache = cache
+        return cache
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """
+        Drop the cached results, and those of its memoized methods, e.g.
+        after changing a rating table.
+        """
+        cls.result_cache().clear()
+        for method in cls._memoized_methods().values():
+            method.cache_clear(cls)
+
+    @classmethod
+    def _memoized_methods(cls) -> Dict[str, MemoizedMethod]:
+        methods = {}
+        for name in dir(cls):
+            attr = getattr(cls, name, None)
+            if isinstance(attr, MemoizedMethod):
+                methods[name] = attr
+        return methods
+
+    @classmethod
+    def memo_info(cls) -> Dict[str, MemoInfo]:
+        """
+        Return the cache statistics of each memoized method.
+
+        Returns:
+            Dict[str, MemoInfo]: Method name to hits, misses, maximum and
+                current size. The statistics cover every Framework class
+                sharing the method.
+        """
+        return {
+            name: method.cache_info()
+            for name, method in cls._memoized_methods().items()
+        }
+
+    @classmethod
+    def quote_many(
+        cls,
+        tests: List[Any],
+        *args: Any,
+        dedup: Union[bool, Iterable[Any], None] = None,
+        store: Union[ResultStore, bool, None] = None,
+        record_hits: bool = False,
+        instance: Optional["Framework"] = None,
+        **kwargs: Any,
+    ) -> Any:
         """
         Calculate multiple quotes using the framework.
 
         This class method creates an instance of the framework and applies the
         calculation method to each test case in the provided list.
 
+        With `dedup`, each distinct combination of rating factors is rated
+        once and the result shared by every row with that combination (see
+        `sentinelpricing.models.dedup`). The returned QuoteSet then has a
+        `dedup_report` attribute with the dedup ratio and time saved. If
+        `cache_results` is set, results are deduplicated through the
+        framework's `result_cache` unless `dedup` is False or a list of keys.
+
+        With a `store` (or `result_store`), an unchanged rerun of the same
+        framework over the same tests is loaded from disk instead (see
+        `sentinelpricing.models.resultstore`).
+
         Args:
             tests (List[Any]): A list of test case data structures or Quote
                 instances.
             *args: Additional positional arguments for the calculation method.
+            dedup (bool or Iterable, optional): True to deduplicate on
+                `rating_factors`, or on the keys each branch of
+                `calculation` is seen to read if those are not declared. An
+                iterable of keys deduplicates on those keys.
+            store (ResultStore or bool, optional): Where to load and store
+                the results of the run. Defaults to `result_store`; False
+                to calculate without storing.
+            record_hits (bool): Record the lookup table rows each quote
+                hits, so the run can be patched by `rerate` after a table
+                edit. Runs recording hits are not loaded from or saved to a
+                store, nor served from `result_cache`.
+            instance (Framework, optional): An instance to rate with, e.g.
+                one kept warm by a FrameworkRouter, rather than setting up a
+                new one.
             **kwargs: Additional keyword arguments for the calculation method.
 
         Returns:
             A Quoteset containing the calculated quotes.
         """
-        instance = cls()
-        quote_set = QuoteSet(
-            [
+        if instance is None:
+            instance = cls()
+        if record_hits:
+            instance._record_row_hits()
+            store = False
+        if store is None or store is True:
+            store = cls.result_store
+        key = None
+        if store:
+            if iter(tests) is tests:
+                # Keying the run reads the tests, so keep one-shot
+                # iterators for the calculation.
+                tests = list(tests)
+            key = store.key(instance, tests, args, kwargs)
+        if key is not None:
+            quotes = store.load(key, cls, tests)
+            if quotes is not None:
+                return cls._quote_set(instance, quotes, None)
+
+        if dedup is None:
+            dedup = cls.cache_results
+        if dedup is False:
+            quotes = [
                 instance._calculate_wrapper(test, *args, **kwargs)
                 for test in tests
-            ],
-            framework=cls,
-        )
+            ]
+            report = None
+        else:
+            cache = None
+            if cls.cache_results and not record_hits:
+                cache = cls.result_cache()
+            if dedup is not True:
+                factors = dedup
+            elif cache is None:
+                factors = cls.rating_factors
+            else:
+                factors = None
+            quotes, report = quote_deduplicated(
+                instance, tests, factors, cache, *args, **kwargs
+            )
+
+        if key is not None:
+            store.save(key, quotes)
+        quote_set = cls._quote_set(instance, quotes, report)
+        if record_hits:
+            quote_set.hit_record = HitRecord(instance, args, kwargs)
+        return quote_set
+
+    @classmethod
+    def rerate(cls, quotes: QuoteSet) -> QuoteSet:
+        """
+        Patch a recorded run for a change of lookup tables.
+
+        `quotes` must come from `quote_many(..., record_hits=True)`, rated
+        with a framework whose code is the same as this one's: only set up,
+        and so the contents of the lookup tables, may differ. The tables of
+        this framework are compared with those recorded, and only the
+        quotes that hit a changed row are rated again (see
+        `sentinelpricing.models.rerate`).
+
+        Args:
+            quotes (QuoteSet): The recorded run, which is left unchanged.
+
+        Returns:
+            QuoteSet: The run for this framework, sharing the unaffected
+                quotes with `quotes`. Its `rerated` attribute holds the
+                positions of the quotes rated again, and it records hits
+                so it can be patched in turn.
+
+        Raises:
+            ValueError: If `quotes` did not record hits, or the frameworks
+                differ in more than their lookup tables.
+        """
+        return rerate(cls, quotes)
+
+    @staticmethod
+    def compare_many(
+        frameworks: Sequence[type], tests: Iterable[Any], *args: Any, **kwargs
+    ) -> List[QuoteSet]:
+        """
+        Rate tests with several versions of a framework in a single pass.
+
+        The first framework rates every test, recording the lookup table
+        rows it hits. A later version whose code is the same as the first's,
+        so that only its tables differ, reuses the first's result for every
+        test that did not hit a changed row, as `rerate` does; other
+        versions rate every test. Rating four table-only proposals against
+        a current framework then costs little more than rating it once.
+
+            >>> current, proposed = Framework.compare_many(
+            ...     [MotorV1, MotorV2], tests
+            ... )
+            >>> alignment = current.align(proposed)
+
+        Args:
+            frameworks (Sequence[type]): The Framework subclasses, the first
+                being the one compared against.
+            tests (Iterable[Any]): Test case data, TestCases or Quotes.
+                Quotes are rated from their quote data.
+            *args: Additional positional arguments for the calculation method.
+            **kwargs: Additional keyword arguments for the calculation method.
+
+        Returns:
+            List[QuoteSet]: A QuoteSet per framework, with quotes in the
+                order of `tests` and sharing their identifiers. Each has a
+                `rerated` attribute holding the positions it rated itself.
+        """
+        return compare_many(frameworks, tests, *args, **kwargs)
+
+    @classmethod
+    def _quote_set(
+        cls, instance: "Framework", quotes: List[Any], report: Any
+    ) -> QuoteSet:
+        quote_set = QuoteSet(quotes, framework=cls)
+        if report is not None:
+            quote_set.dedup_report = report
 
         for v in instance.__dict__.values():
             if isinstance(v, PriceTest):
@@ -208,7 +724,45 @@ class Framework(abc.ABC):
         return quote_set
 
     @classmethod
-    def quote(cls, test: Any, *args: Any, **kwargs: Any) -> Any:
+    def quote_iter(
+        cls, tests: Iterable[Any], *args: Any, **kwargs: Any
+    ) -> Iterator[Quote]:
+        """
+        Lazily calculate quotes using the framework.
+
+        Like `quote_many`, but yields each quote as soon as it has been
+        calculated instead of collecting them into a QuoteSet. Combined with
+        an Accumulator, this allows runs that are too large to hold in
+        memory.
+
+        Args:
+            tests (Iterable[Any]): An iterable of test case data structures
+                or Quote instances.
+            *args: Additional positional arguments for the calculation method.
+            **kwargs: Additional keyword arguments for the calculation method.
+
+        Yields:
+            Quote: The calculated quotes, in the order of `tests`.
+        """
+        instance = cls()
+        if cls.cache_results:
+            cache = cls.result_cache()
+            for test in tests:
+                yield cache.quote(
+                    cls, test, *args, instance=instance, **kwargs
+                )
+            return
+        for test in tests:
+            yield instance._calculate_wrapper(test, *args, **kwargs)
+
+    @classmethod
+    def quote(
+        cls,
+        test: Any,
+        *args: Any,
+        instance: Optional["Framework"] = None,
+        **kwargs: Any,
+    ) -> Any:
         """
         Calculate a single quote using the framework.
 
@@ -218,10 +772,17 @@ class Framework(abc.ABC):
         Args:
             test: A test case data structure or a Quote instance.
             *args: Additional positional arguments for the calculation method.
+            instance (Framework, optional): An instance to rate with, rather
+                than setting up a new one.
             **kwargs: Additional keyword arguments for the calculation method.
 
         Returns:
             The calculated quote.
         """
-        instance = cls()
+        if cls.cache_results:
+            return cls.result_cache().quote(
+                cls, test, *args, instance=instance, **kwargs
+            )
+        if instance is None:
+            instance = cls()
         return instance._calculate_wrapper(test, *args, **kwargs)
@@ -0,0 +1,274 @@
+"""Live
+
+Reloading a framework's tables in a running process.
+
+A LiveFramework keeps a framework set up and serves quotes from it, while
+a background thread watches the files its tables were loaded from (see
+`LookupTable.from_csv`). When one changes, a new version of the framework
+is set up in the background and swapped in once complete:
+
+    >>> live = LiveFramework(Motor, interval=5.0)
+    >>> live.quote(test)            # rated by the current version
+    >>> # ... tables/age.csv is edited ...
+    >>> live.version                # a few seconds later
+    1
+
+Set up runs again for each version, but through the shared table cache
+(see `sentinelpricing.models.tablecache`), so only the changed files are
+parsed again; unchanged tables, and their lookup caches, carry over.
+
+Each version is its own subclass of the framework, so caches kept per
+class (`Framework.result_cache` and memoized methods) are per version: a
+new version starts with empty caches, and never sees results calculated
+with old tables. Every quote is rated from start to finish by the version
+current when it started; a replaced version's caches are cleared once its
+last quote has finished. A version is only swapped in once fully set up,
+so no quote ever sees a half-loaded framework, and if set up fails, the
+current version is kept.
+"""
+
+import os
+import threading
+import warnings
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_Versions = Dict[str, Optional[Tuple[int, int]]]
+
+
+def _file_version(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _sources(instance: Any) -> _Versions:
+    """Return the current version of each file the instance's tables were
+    loaded from. Lazy tables are only included once loaded."""
+    sources = {table.source for table in instance._lookup_tables().values()}
+    return {path: _file_version(path) for path in sources if path}
+
+
+class _Version:
+    """A set up version of the framework, and the quotes rating with it."""
+
+    def __init__(self, number: int, framework: type, instance: Any) -> None:
+        self.number = number
+        self.framework = framework
+        self.instance = instance
+        self.sources = _sources(instance)
+        self.inflight = 0
+        self.retired = False
+
+
+class LiveFramework:
+    """
+    A framework whose tables are reloaded when their files change.
+
+    Attributes:
+        framework (type): The Framework subclass served.
+        interval (float, optional): Seconds between checks of the table
+            files, or None to only reload when `check` or `reload` is
+            called.
+        last_error (BaseException, optional): The error raised by the last
+            failed reload, if any.
+    """
+
+    def __init__(
+        self, framework: type, interval: Optional[float] = 1.0
+    ) -> None:
+        """
+        Set up the framework and start watching its tables.
+
+        The first version is created with `framework()`, so is restored
+        from the framework's snapshot if it has one.
+
+        Args:
+            framework (type): A Framework subclass.
+            interval (float, optional): See above. Defaults to 1 second.
+        """
+        self.framework = framework
+        self.interval = interval
+        self.last_error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._reloading = threading.Lock()
+        self._current = _Version(0, framework, framework())
+        # The file versions seen by the last check, to wait for files to
+        # settle, and those a reload failed on, not to retry them.
+        self._seen: _Versions = self._current.sources
+        self._failed: Optional[_Versions] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if interval is not None:
+            self._thread = threading.Thread(
+                target=self._watch,
+                name=f"LiveFramework({framework.__name__})",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def __repr__(self) -> str:
+        return (
+            f"LiveFramework({self.framework.__name__}, "
+            f"version={self.version})"
+        )
+
+    def __enter__(self) -> "LiveFramework":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def version(self) -> int:
+        """The number of the current version, counting reloads."""
+        return self._current.number
+
+    @property
+    def instance(self) -> Any:
+        """The current version's framework instance."""
+        return self._current.instance
+
+    def _acquire(self) -> _Version:
+        with self._lock:
+            version = self._current
+            version.inflight += 1
+        return version
+
+    def _release(self, version: _Version) -> None:
+        with self._lock:
+            version.inflight -= 1
+            drained = version.retired and not version.inflight
+        if drained:
+            version.framework.clear_cache()
+
+    def quote(self, test: Any, *args: Any, **kwargs: Any) -> Any:
+        """
+        Calculate a quote with the current version.
+
+        Args:
+            test: A test case data structure or a Quote instance.
+            *args: Additional positional arguments for the calculation method.
+            **kwargs: Additional keyword arguments for the calculation method.
+
+        Returns:
+            The calculated quote.
+        """
+        version = self._acquire()
+        try:
+            framework, instance = version.framework, version.instance
+            if framework.cache_results:
+                return framework.result_cache().quote(
+                    framework, test, *args, instance=instance, **kwargs
+                )
+            return instance._calculate_wrapper(test, *args, **kwargs)
+        finally:
+            self._release(version)
+
+    def quote_many(
+        self, tests: Iterable[Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        """
+        Calculate quotes with the current version, which rates the whole
+        run even if a reload completes part way through. See
+        `Framework.quote_many`.
+        """
+        version = self._acquire()
+        try:
+            return version.framework.quote_many(
+                tests, *args, instance=version.instance, **kwargs
+            )
+        finally:
+            self._release(version)
+
+    def changed(self) -> List[str]:
+        """Return the table files changed since the current version was
+        set up."""
+        current = self._current
+        return [
+            path
+            for path, version in current.sources.items()
+            if _file_version(path) != version
+        ]
+
+    def check(self) -> bool:
+        """
+        Reload if any table file has changed, and stayed unchanged since
+        the previous check, so files are not read while being written.
+        Called every `interval` by the watching thread.
+
+        Returns:
+            bool: Whether a new version was swapped in.
+        """
+        current = self._current
+        # Lazy tables' files are watched once the tables are loaded.
+        for path, version in _sources(current.instance).items():
+            current.sources.setdefault(path, version)
+        seen = {path: _file_version(path) for path in current.sources}
+        settled = seen == self._seen
+        self._seen = seen
+        if seen == current.sources or not settled or seen == self._failed:
+            return False
+        return self.reload()
+
+    def reload(self) -> bool:
+        """
+        Set up a new version now and swap it in.
+
+        Returns:
+            bool: Whether the new version was swapped in. If set up failed,
+                the current version is kept, the error is kept as
+                `last_error` and a warning is issued.
+        """
+        with self._reloading:
+            old = self._current
+            seen = {path: _file_version(path) for path in old.sources}
+            # A subclass per version, so caches kept per class are too.
+            framework = type(
+                self.framework.__name__,
+                (self.framework,),
+                {
+                    "__module__": self.framework.__module__,
+                    "__qualname__": self.framework.__qualname__,
+                    "__doc__": self.framework.__doc__,
+                },
+            )
+            # Run the framework's own set up methods, once each.
+            framework._setup_methods = self.framework._setup_methods
+            try:
+                instance = framework()
+            except Exception as error:
+                self.last_error = error
+                self._failed = seen
+                warnings.warn(
+                    f"Reloading {self.framework.__name__} failed, keeping "
+                    f"version {old.number}: {error!r}"
+                )
+                return False
+            new = _Version(old.number + 1, framework, instance)
+            with self._lock:
+                self._current = new
+                old.retired = True
+                drained = not old.inflight
+            self.last_error = self._failed = None
+            self._seen = new.sources
+        if drained:
+            old.framework.clear_cache()
+        return True
+
+    def _watch(self) -> None:
+        assert self.interval is not None
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as error:  # pragma: no cover
+                # Keep watching; the error is reported like failed reloads.
+                self.last_error = error
+
+    def close(self) -> None:
+        """Stop watching the table files."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
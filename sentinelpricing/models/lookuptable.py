@@ -1,9 +1,15 @@
+import os
 from bisect import bisect_left
 from collections import namedtuple
 from functools import lru_cache
-from typing import List, Dict, Any, Optional, Tuple, Union
+from threading import Lock
+from typing import List, Dict, Any, Callable, Optional, Tuple, Union
 
 from .rate import Rate
+from .tablecache import TableCache, default_cache
+from sentinelpricing.utils.digest import new_hash
+from sentinelpricing.utils.readers import Types, read_csv
+from sentinelpricing.utils.tracing import row_hits
 
 
 class LookupTable:
@@ -48,12 +54,15 @@ class LookupTable:
         40  |3  |2
     """
 
+    # The file the table was loaded from, if any (see `from_csv`).
+    source: Optional[str] = None
+
     def __init__(
         self,
         data: List[Dict[str, Any]],
         rate_column: Optional[str] = None,
         name: Optional[str] = None,
-        cache: bool = True
+        cache: bool = True,
     ) -> None:
         """
         Initialize a new instance of LookupTable.
@@ -76,9 +85,7 @@ class LookupTable:
         # Process each row in the input data.
         for row in data:
             if rate_column not in row:
-                raise KeyError(
-                    f"Invalid or missing rate key in row: {row}"
-                )
+                raise KeyError(f"Invalid or missing rate key in row: {row}")
             rates.append(float(row[rate_column]))
 
             # Process index values: if a value is a numeric string,
@@ -126,11 +133,166 @@ class LookupTable:
         self.index, self.rates = map(list, zip(*combined))
 
         if cache:
-            self.lookup = lru_cache(self.lookup)
+            self._locate = lru_cache(self._locate)  # type: ignore
+
+    @classmethod
+    def from_csv(
+        cls,
+        path: str,
+        rate_column: Optional[str] = None,
+        name: Optional[str] = None,
+        types: Types = None,
+        shared: Union[bool, TableCache] = True,
+        **kwargs: Any,
+    ) -> "LookupTable":
+        """
+        Build a lookup table from a CSV file, laid out as described above.
+
+        By default the table comes from a process-wide TableCache (see
+        `sentinelpricing.models.tablecache`): a file already loaded with the
+        same options, and unchanged since, is not parsed again, and every
+        framework that loads it shares one frozen table.
+
+        Args:
+            path (str): The CSV file.
+            rate_column (str, optional): See `LookupTable`.
+            name (str, optional): See `LookupTable`.
+            types (Mapping, optional): Column converters, see
+                `sentinelpricing.utils.readers.compile_types`.
+            shared (bool or TableCache): Whether to use the default table
+                cache, or the cache to use. False always builds a new,
+                modifiable table.
+            **kwargs: Passed on to `csv.reader` (e.g. delimiter).
+
+        Returns:
+            LookupTable: The table.
+        """
+
+        def build() -> "LookupTable":
+            table = cls(
+                list(read_csv(path, types, **kwargs)), rate_column, name
+            )
+            table.source = os.path.realpath(path)
+            return table
+
+        if shared is False:
+            return build()
+        cache = default_cache if shared is True else shared
+        return cache.get(
+            path,
+            build,
+            kind=cls,
+            rate_column=rate_column,
+            name=name,
+            types=None if types is None else tuple(sorted(types.items())),
+            **kwargs,
+        )
+
+    @classmethod
+    def lazy(
+        cls,
+        loader: Union[str, os.PathLike, Callable[[], "LookupTable"]],
+        name: Optional[str] = None,
+        **options: Any,
+    ) -> "LazyLookupTable":
+        """
+        Return a table that is only loaded when first used.
+
+        Set up methods load every table up front, including those only a
+        few quotes reach and those a subclass replaces straight away. A
+        lazy table defers loading until its first lookup (or any other use
+        of its contents), and is loaded once even if several threads use it
+        at the same time. `Framework.describe` reports which tables have
+        been loaded.
+
+        Args:
+            loader (str, PathLike or Callable): A CSV file, loaded with
+                `from_csv`, or a function returning the table.
+            name (str, optional): The table's name, which overrides that of
+                the loaded table.
+            **options: Passed on to `from_csv` if loader is a file.
+
+        Returns:
+            LazyLookupTable: The table, not yet loaded.
+
+        Example:
+            >>> def setup(self):
+            ...     self.convictions = LookupTable.lazy(
+            ...         "convictions.csv", name="convictions"
+            ...     )
+        """
+        if isinstance(loader, (str, os.PathLike)):
+            path = loader
+
+            def loader() -> "LookupTable":
+                return cls.from_csv(path, name=name, **options)
+
+        elif options:
+            raise TypeError("Options are only used when loading a file.")
+        return LazyLookupTable(loader, name)
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the table's contents are loaded; see `lazy`."""
+        return True
+
+    def freeze(self) -> "LookupTable":
+        """
+        Make the table's index and rates immutable (tuples), so it can be
+        shared between frameworks.
+
+        Returns:
+            LookupTable: This table.
+        """
+        self.index = tuple(self.index)  # type: ignore
+        self.rates = tuple(self.rates)  # type: ignore
+        return self
+
+    @property
+    def frozen(self) -> bool:
+        """Whether the table has been frozen."""
+        return isinstance(self.rates, tuple)
 
     def __len__(self):
         return len(self.index)
 
+    def __getstate__(self) -> Dict[str, Any]:
+        # The index type is created per table and the lookup cache wraps a
+        # bound method, so neither pickles: both are rebuilt on unpickling.
+        state = {
+            k: v
+            for k, v in vars(self).items()
+            if k not in ("_locate", "index_type")
+        }
+        state["index"] = type(self.index)(map(tuple, self.index))
+        state["_fields"] = self.index_type._fields
+        state["_cached"] = "_locate" in vars(self)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        state = dict(state)
+        Index = namedtuple("Index", state.pop("_fields"))  # type: ignore
+        cached = state.pop("_cached")
+        self.__dict__.update(state)
+        self.index_type = Index
+        self.index = type(self.index)(map(Index._make, self.index))
+        if cached:
+            self._locate = lru_cache(self._locate)  # type: ignore
+
+    def digest(self) -> str:
+        """
+        Return a hex digest of the table's name, index and rates, stable
+        across processes.
+
+        Returns:
+            str: The digest.
+        """
+        digest = new_hash()
+        digest.update(repr((self.name, self.index_type._fields)).encode())
+        digest.update(repr([tuple(i) for i in self.index]).encode())
+        digest.update(repr(self.rates).encode())
+        return digest.hexdigest()
+
     def __getitem__(self, key: Union[Any, Tuple[Any, ...]]) -> "Rate":
         """
         Enable subscript notation for lookups.
@@ -146,12 +308,13 @@ class LookupTable:
             key = (key,)
         return self.lookup(*key)
 
-
     def lookup(self, *keys: Any) -> "Rate":
         """
         Retrieve a rate value from the lookup table based on the provided keys.
 
         The keys should match the number of index dimensions of the table.
+        If row hits are being recorded (see
+        `sentinelpricing.utils.tracing.row_hits`), the row used is recorded.
 
         Args:
             *keys: The key values for the lookup.
@@ -164,6 +327,14 @@ class LookupTable:
             KeyError: If the number of keys provided does not match the table
                 dimensions.
         """
+        row = self._locate(*keys)
+        recorder = row_hits.get()
+        if recorder is not None:
+            recorder.record(self, row)
+        return Rate(self.name or "Unnamed Rate", self.rates[row])
+
+    def _locate(self, *keys: Any) -> int:
+        """Return the position of the row used for the given keys."""
         if not self.index or len(keys) != len(self.index[0]):
             raise KeyError("Incompatible number of keys provided.")
 
@@ -171,14 +342,99 @@ class LookupTable:
         search_key = self.index_type(*keys)
         idx = bisect_left(self.index, search_key)
 
-        # Determine the appropriate rate value.
+        # Determine the appropriate row.
         if idx < len(self.index) and self.index[idx] == search_key:
-            rate_value = self.rates[idx]
+            return idx
         elif idx == 0:
-            rate_value = self.rates[0]
+            return 0
         elif idx < len(self.index) and self.index[idx] > search_key:
-            rate_value = self.rates[idx - 1]
+            return idx - 1
         else:
-            rate_value = self.rates[-1]
+            return len(self.index) - 1
+
+
+class LazyLookupTable(LookupTable):
+    """
+    A LookupTable loaded on first use. See `LookupTable.lazy`.
+
+    Until loaded, the table only holds its loader. The first access to any
+    other attribute (the index, rates, a lookup) loads the table and takes
+    on its contents, after which it behaves, and performs, exactly like
+    the loaded table.
+    """
+
+    def __init__(
+        self, loader: Callable[[], LookupTable], name: Optional[str] = None
+    ) -> None:
+        self._lazy_loader: Optional[Callable[[], LookupTable]] = loader
+        self._lazy_lock = Lock()
+        if name is not None:
+            self.name = name
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyLookupTable {self.__dict__.get('name')!r}, {state}>"
+
+    @property
+    def loaded(self) -> bool:
+        return self._lazy_loader is None
+
+    def load(self) -> "LazyLookupTable":
+        """
+        Load the table now, if it is not already.
+
+        Returns:
+            LazyLookupTable: This table.
+        """
+        if self._lazy_loader is None:
+            return self
+        with self._lazy_lock:
+            loader = self._lazy_loader
+            if loader is None:
+                return self
+            try:
+                table = loader()
+            except AttributeError as error:
+                # Would otherwise read as a missing attribute of this table.
+                raise RuntimeError(f"Loading {self!r} failed.") from error
+            if not isinstance(table, LookupTable):
+                raise TypeError(
+                    f"Expected the loader to return a LookupTable, got "
+                    f"{type(table).__name__}."
+                )
+            if isinstance(table, LazyLookupTable):
+                table.load()
+            state = {
+                k: v
+                for k, v in vars(table).items()
+                if not k.startswith("_lazy")
+            }
+            if self.__dict__.get("name") is not None:
+                state["name"] = self.name
+            if "_locate" in state:
+                # Cache row positions against this table, not the loaded one.
+                state["_locate"] = lru_cache(
+                    type(table)._locate.__get__(self)  # type: ignore
+                )
+            self.__dict__.update(state)
+            self._lazy_loader = None
+        return self
+
+    def __getstate__(self) -> Dict[str, Any]:
+        self.load()
+        state = super().__getstate__()
+        for name in ("_lazy_loader", "_lazy_lock"):
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._lazy_loader = None
+        self._lazy_lock = Lock()
+        super().__setstate__(state)
 
-        return Rate(self.name or "Unnamed Rate", rate_value)
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not set yet, i.e. before loading.
+        if name.startswith(("_lazy", "__")) or self.loaded:
+            raise AttributeError(name)
+        self.load()
+        return object.__getattribute__(self, name)
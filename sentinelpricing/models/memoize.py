@@ -0,0 +1,241 @@
+"""Memoize
+
+Caching the contribution of Framework helper methods.
+
+A helper such as a base premium that only depends on region and month is
+recalculated for every quote, although it only ever sees a handful of
+distinct inputs. Decorating it with `memoize` caches its contribution,
+keyed on the named quote factors (and any other arguments): both its
+return value and the breakdown steps it appended to the quote. On a hit
+the steps are replayed onto the quote, recomputing each result from the
+quote's current price, so the breakdown reads exactly as if the helper had
+run.
+
+    >>> class Motor(Framework):
+    ...     @memoize(keys=["region", "month"])
+    ...     def base_premium(self, quote):
+    ...         quote += self.base[quote["region"], quote["month"]]
+    ...
+    ...     def calculation(self, quote):
+    ...         self.base_premium(quote)
+    ...         ...
+    >>> Motor.base_premium.cache_info()
+    MemoInfo(hits=99996, misses=4, maxsize=1024, currsize=4)
+
+A helper must only depend on the named factors, its other arguments and
+the framework's tables. If it is seen to read any other quote data, a
+warning is issued and that result is not cached. Results are kept per
+Framework class; reloading the module defining a framework redefines its
+methods and so starts new caches, setting up an instance whose tables or
+other state differ from the last instance's clears them, and
+`Framework.clear_cache` clears them explicitly, e.g. after changing a
+table in place. When lookup table row
+hits are being recorded, the rows a cached result hit are recorded too.
+Caches may be used and cleared from several threads at once.
+"""
+
+import threading
+import warnings
+from collections import OrderedDict, namedtuple
+from functools import update_wrapper
+from types import MethodType
+from typing import Any, Callable, Hashable, Iterable, Optional, Tuple
+
+from .quote import Quote
+from .step import Step
+from sentinelpricing.utils.fingerprint import fingerprint
+from sentinelpricing.utils.tracing import ABSENT, ReadTracer, row_hits
+
+MemoInfo = namedtuple("MemoInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# Stored in place of a helper's return value when it returned the quote.
+_QUOTE = object()
+
+
+def _replay(quote: Quote, steps: Tuple[Any, ...]) -> None:
+    """Append recorded steps to a quote, recomputing their results."""
+    breakdown = quote._writable_breakdown()
+    price = breakdown.final_price
+    for step in steps:
+        if isinstance(step, Step):
+            if callable(step.oper):
+                price = step.oper(price, step.other)
+            else:
+                price = step.result
+            if price != step.result:
+                step = Step(step.name, step.oper, step.other, price)
+        breakdown.append(step)
+
+
+class MemoizedMethod:
+    """
+    A Framework method whose contribution is cached. See `memoize`.
+
+    Attributes:
+        keys (Tuple[Hashable, ...]): The quote factors results are keyed on.
+        maxsize (int, optional): The most results kept, least recently used
+            first out. None for no limit.
+        hits (int): Calls answered from the cache.
+        misses (int): Calls that ran the method.
+    """
+
+    def __init__(
+        self,
+        method: Callable[..., Any],
+        keys: Iterable[Hashable],
+        maxsize: Optional[int] = 1024,
+    ) -> None:
+        update_wrapper(self, method)
+        self.method = method
+        self.keys = tuple(keys)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # Key to return value, steps appended and table rows hit.
+        self._cache: "OrderedDict[Hashable, Tuple[Any, Tuple, Any]]" = (
+            OrderedDict()
+        )
+        # Guards the cache, which every Framework class using the method
+        # shares; the method itself runs outside it.
+        self._lock = threading.Lock()
+        self._warned = False
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> Any:
+        if instance is None:
+            return self
+        return MethodType(self, instance)
+
+    def __repr__(self) -> str:
+        return f"<memoized {self.__qualname__} on {list(self.keys)}>"
+
+    def __call__(
+        self, framework: Any, quote: Any, *args: Any, **kwargs: Any
+    ) -> Any:
+        inputs: Hashable = (
+            tuple(quote.get(k, ABSENT) for k in self.keys),
+            args,
+            tuple(sorted(kwargs.items())) if kwargs else (),
+        )
+        try:
+            hash(inputs)
+        except TypeError:
+            inputs = fingerprint(inputs)
+        key = (type(framework), inputs)
+
+        cache = self._cache
+        recording = row_hits.get()
+        with self._lock:
+            entry = cache.get(key)
+            # Results cached while not recording table row hits cannot
+            # replay them, so are calculated again.
+            if entry is not None and (
+                recording is None or entry[2] is not None
+            ):
+                self.hits += 1
+                cache.move_to_end(key)
+            else:
+                entry = None
+                self.misses += 1
+        if entry is not None:
+            result, steps, hits = entry
+            if steps:
+                _replay(quote, steps)
+            if recording is not None:
+                recording.hits.update(hits)
+            return quote if result is _QUOTE else result
+
+        if not isinstance(quote, Quote):
+            return self.method(framework, quote, *args, **kwargs)
+
+        data = quote.quotedata
+        tracer = ReadTracer(data)
+        start = len(quote.breakdown)
+        recorder = None if recording is None else recording.child()
+        token = row_hits.set(recorder)
+        quote.quotedata = tracer
+        try:
+            result = self.method(framework, quote, *args, **kwargs)
+        finally:
+            quote.quotedata = data
+            row_hits.reset(token)
+        hits = None if recorder is None else frozenset(recorder.hits)
+        if recording is not None:
+            recording.hits.update(hits)
+
+        undeclared = [k for k in tracer.reads if k not in self.keys]
+        if undeclared or tracer.read_all:
+            if not self._warned:
+                self._warned = True
+                read = "all quote data" if tracer.read_all else undeclared
+                warnings.warn(
+                    f"{self.__qualname__} read {read}, which are not in "
+                    "its memoize keys; those results are not cached."
+                )
+            return result
+
+        steps = tuple(quote.breakdown.steps[start:])
+        with self._lock:
+            cache[key] = (
+                _QUOTE if result is quote else result,
+                steps,
+                hits,
+            )
+            if self.maxsize is not None and len(cache) > self.maxsize:
+                cache.popitem(last=False)
+        return result
+
+    def cache_info(self) -> MemoInfo:
+        """Return the hits, misses, maximum and current size of the
+        cache."""
+        return MemoInfo(self.hits, self.misses, self.maxsize, len(self._cache))
+
+    def cache_clear(self, framework: Optional[type] = None) -> None:
+        """
+        Drop cached results, and reset the statistics.
+
+        Args:
+            framework (type, optional): Only drop the results of this
+                Framework class, keeping the statistics.
+        """
+        with self._lock:
+            if framework is None:
+                self._cache.clear()
+                self.hits = self.misses = 0
+                return
+            for key in [k for k in self._cache if k[0] is framework]:
+                del self._cache[key]
+
+
+def memoize(
+    keys: Iterable[Hashable], maxsize: Optional[int] = 1024
+) -> Callable[[Callable[..., Any]], MemoizedMethod]:
+    """
+    Cache the contribution of a Framework method on the quote factors it
+    depends on.
+
+    The method must take the quote as its first argument. Its return value
+    and any steps or notes it appends to the quote's breakdown are cached,
+    keyed on the values of `keys` in the quote data, the framework class
+    and the method's other arguments.
+
+    Args:
+        keys (Iterable[Hashable]): The quote factors the method depends on.
+        maxsize (int, optional): The most results kept per method, least
+            recently used first out. None for no limit. Defaults to 1024.
+
+    Returns:
+        A decorator for the method. The decorated method has `cache_info()`
+            and `cache_clear()`, like `functools.lru_cache`.
+
+    Example:
+        >>> @memoize(keys=["region", "month"])
+        ... def base_premium(self, quote):
+        ...     quote += self.base[quote["region"], quote["month"]]
+    """
+    if isinstance(keys, (str, bytes)):
+        keys = (keys,)
+
+    def decorator(method: Callable[..., Any]) -> MemoizedMethod:
+        return MemoizedMethod(method, keys, maxsize)
+
+    return decorator
@@ -55,13 +55,16 @@ class Quote:
             final_price (Optional[float]): A pre-calculated final price. If
                 provided, the breakdown will start with this value.
             identifier (Optional[Any]): An optional unique identifier for the
-                quote. If not provided, a new UUID will be generated.
+                quote. If not provided, the TestCase's identifier is used, or
+                failing that a new UUID will be generated.
         """
-        self.identifier = identifier or uuid.uuid4()
+        self.identifier = identifier
         self.framework = framework or "Unnamed Framework"
 
         if isinstance(testcase, TestCase):
             self.quotedata = testcase.data
+            if identifier is None:
+                self.identifier = testcase.identifier
         elif isinstance(testcase, dict):
             self.quotedata = testcase
         else:
@@ -69,6 +72,9 @@ class Quote:
                 "testcase must be a Mapping or a TestCase instance."
             )
 
+        if self.identifier is None:
+            self.identifier = uuid.uuid4()
+
         self.breakdown = (
             Breakdown(final_price) if final_price is not None else Breakdown()
         )
@@ -349,9 +355,18 @@ class Quote:
 
         result = oper(self.breakdown.final_price, other_value)
         step = Step(name, oper, other_value, result)
-        self.breakdown.append(step)
+        self._writable_breakdown().append(step)
         return self
 
+    def _writable_breakdown(self) -> Breakdown:
+        """
+        Return the breakdown, first copying it if it is frozen (shared with
+        other quotes).
+        """
+        if self.breakdown.frozen:
+            self.breakdown = self.breakdown.copy()
+        return self.breakdown
+
     def note(self, text: str) -> None:
         """
         Append a note to the quote's breakdown.
@@ -359,7 +374,7 @@ class Quote:
         Args:
             text (str): The note text to be recorded.
         """
-        self.breakdown.append(Note(text))
+        self._writable_breakdown().append(Note(text))
 
     def get(self, *args, **kwargs):
         return self.quotedata.get(*args, **kwargs)
@@ -372,7 +387,7 @@ class Quote:
             final_price,
             final_price
         )
-        self.breakdown.append(overriding_step)
+        self._writable_breakdown().append(overriding_step)
 
     @property
     def calculated(self) -> bool:
@@ -1,20 +1,43 @@
 """QuoteSet"""
 
-from collections import Counter
+import warnings
+from array import array
+from itertools import compress
+from math import inf
+from operator import attrgetter, itemgetter
 from statistics import mean
 from typing import (
     Any,
     Callable,
+    Collection,
     Dict,
+    Hashable,
     Iterable,
     Iterator,
     List,
+    Mapping,
     Optional,
+    Sequence,
+    Set,
+    Tuple,
     Union,
 )
 
+from .alignment import Alignment
 from .quote import Quote
 from sentinelpricing.utils.calculations import percentage, dict_difference
+from sentinelpricing.utils.fingerprint import fingerprint
+from sentinelpricing.utils.binning import binned_key_getter, normalise_bins
+from sentinelpricing.utils.sketch import QuantileSketch, sketch_values
+from sentinelpricing.utils.indexing import (
+    IndexCache,
+    SortedIndex,
+    VersionedList,
+    group_items,
+    has_callable,
+    normalise_by,
+    read_only_groups,
+)
 
 
 class QuoteSet:
@@ -24,10 +47,28 @@ class QuoteSet:
     A QuoteSet is generated after running either a TestSuite or TestCase
     through a Framework. It supports aggregation, statistical operations, and
     grouping of quotes.
+
+    Groupings are cached per `by` spec, so repeated grouped queries (mix,
+    avg, etc.) only pay for the grouping once. The cache is dropped whenever
+    the `quotes` list is modified. Quotes are assumed not to change their
+    quote data once they are part of a QuoteSet.
+
+    Quote identifiers are expected to be unique. How duplicates are handled
+    is set by `id_check`: "warn" (the default) issues a warning, "strict"
+    raises a ValueError and "off" skips the check. Sets derived from a set
+    already known to be unique (subsets, intersections, etc.) inherit that
+    knowledge rather than checking again.
     """
 
+    id_check: str = "warn"
+
+    _ID_CHECK_MODES = ("strict", "warn", "off")
+
     def __init__(
-        self, quotes: Iterable["Quote"], framework: Optional[Any] = None
+        self,
+        quotes: Iterable["Quote"],
+        framework: Optional[Any] = None,
+        id_check: Optional[str] = None,
     ) -> None:
         """
         Initialize a QuoteSet instance.
@@ -35,10 +76,34 @@ class QuoteSet:
         Args:
             quotes (Iterable[Quote]): An iterable of Quote objects.
             framework: Optional framework associated with these quotes.
+            id_check (str, optional): "strict", "warn" or "off"; overrides
+                the class default for this set and the sets derived from it.
         """
-        self.quotes: List["Quote"] = list(quotes)
+        if id_check is not None:
+            if id_check not in self._ID_CHECK_MODES:
+                raise ValueError(
+                    f"id_check must be one of {self._ID_CHECK_MODES}"
+                )
+            self.id_check = id_check
+        self.quotes = quotes
+        self._key_functions: Dict[str, Callable[["Quote"], Any]] = {}
         self.unique_id_check()
 
+    @property
+    def quotes(self) -> List["Quote"]:
+        """
+        The Quote objects held in the set.
+
+        Returns:
+            List[Quote]: The quotes, in insertion order.
+        """
+        return self._quotes
+
+    @quotes.setter
+    def quotes(self, quotes: Iterable["Quote"]) -> None:
+        self._quotes = VersionedList(quotes)
+        self._indexes = IndexCache(self._quotes)
+
     def __iter__(self) -> Iterator["Quote"]:
         """
         Return an iterator over the Quote objects in the list.
@@ -76,7 +141,13 @@ class QuoteSet:
         Returns:
             QuoteSet: A new QuoteSet containing quotes from both sets.
         """
-        return QuoteSet(self.quotes + other.quotes)
+        unique = None
+        if self._proven_unique() and other._proven_unique():
+            # Only the smaller side needs checking against the larger.
+            small, large = sorted((self, other), key=len)
+            index = large._identifier_index()
+            unique = not any(q.identifier in index for q in small.quotes)
+        return self._derive(list(self.quotes) + list(other.quotes), unique)
 
     def __sub__(self, other: "QuoteSet") -> "QuoteSet":
         """
@@ -86,58 +157,232 @@ class QuoteSet:
             other (QuoteSet): Another QuoteSet to subtract.
 
         Returns:
-            QuoteSet: A new QuoteSet containing quotes from both sets.
+            QuoteSet: A new QuoteSet containing the quotes in this set whose
+                identifiers are not in `other`.
         """
+        return self.subtract(other)
 
-        other_identifiers = {q.identifier for q in other.quotes}
+    def __and__(self, other: "QuoteSet") -> "QuoteSet":
+        """
+        Intersect two QuoteSets by identifier, see `intersection`.
+        """
+        return self.intersection(other)
 
-        return QuoteSet(
-            list(
-                filter(
-                    lambda q: q.identifier in other_identifiers, self.quotes
-                )
-            )
-        )
+    def __or__(self, other: "QuoteSet") -> "QuoteSet":
+        """
+        Union two QuoteSets by identifier, see `union`.
+        """
+        return self.union(other)
 
     def __contains__(self, other):
+        """
+        Check whether a quote with the same quote data is in the set.
+
+        Membership is tested against a hash index of the quote data
+        fingerprints, built on first use and cached until the set changes.
+
+        Args:
+            other (Quote or dict): The quote, or quote data, to look for.
+
+        Returns:
+            bool: True if a quote with equal quote data is in the set.
+        """
         if isinstance(other, Quote):
-            # Should this be comparing quotedata or identifier?
-            return any(other.quotedata == q.quotedata for q in self)
+            return fingerprint(other.quotedata) in self._fingerprint_index()
         if isinstance(other, dict):
-            return any(other == q.quotedata for q in self)
+            return fingerprint(other) in self._fingerprint_index()
+        return False
+
+    def _identifier_index(self) -> Dict[Any, "Quote"]:
+        """
+        Return a cached mapping of identifier to (first) Quote.
+        """
+
+        def build():
+            index: Dict[Any, "Quote"] = {}
+            for q in self.quotes:
+                index.setdefault(q.identifier, q)
+            return index
+
+        return self._indexes.get("identifier", build)
+
+    def _fingerprint_index(self) -> Set[Hashable]:
+        """
+        Return a cached set of the quote data fingerprints in the set.
+        """
+        return self._indexes.get(
+            "fingerprint",
+            lambda: {fingerprint(q.quotedata) for q in self.quotes},
+        )
+
+    def _membership(
+        self, on: str
+    ) -> Tuple[Collection[Hashable], Callable[["Quote"], Hashable]]:
+        """
+        Return the index and key function used by the set operations.
+
+        Args:
+            on (str): "identifier" or "quotedata".
+        """
+        if on == "identifier":
+            return self._identifier_index(), lambda q: q.identifier
+        if on == "quotedata":
+            return self._fingerprint_index(), lambda q: fingerprint(
+                q.quotedata
+            )
+        raise ValueError(f"Expected 'identifier' or 'quotedata', got {on!r}")
+
+    def get(self, identifier: Any, default: Any = None) -> Any:
+        """
+        Retrieve a quote by its identifier.
+
+        Args:
+            identifier: The identifier of the quote.
+            default: Returned if no quote has that identifier.
+
+        Returns:
+            Quote: The first quote with that identifier, or `default`.
+        """
+        return self._identifier_index().get(identifier, default)
+
+    def intersection(
+        self, other: "QuoteSet", on: str = "identifier"
+    ) -> "QuoteSet":
+        """
+        Return the quotes in this set that are also in `other`.
+
+        Args:
+            other (QuoteSet): The set to intersect with.
+            on (str): Compare quotes by "identifier" or by "quotedata".
+
+        Returns:
+            QuoteSet: A new QuoteSet, in the order of this set.
+        """
+        index, key = other._membership(on)
+        return self._derive(
+            [q for q in self.quotes if key(q) in index], self._proven_unique()
+        )
+
+    def subtract(
+        self, other: "QuoteSet", on: str = "identifier"
+    ) -> "QuoteSet":
+        """
+        Return the quotes in this set that are not in `other`.
+
+        Args:
+            other (QuoteSet): The set to subtract.
+            on (str): Compare quotes by "identifier" or by "quotedata".
+
+        Returns:
+            QuoteSet: A new QuoteSet, in the order of this set.
+        """
+        index, key = other._membership(on)
+        return self._derive(
+            [q for q in self.quotes if key(q) not in index],
+            self._proven_unique(),
+        )
+
+    def union(self, other: "QuoteSet", on: str = "identifier") -> "QuoteSet":
+        """
+        Return the quotes in this set, followed by those only in `other`.
+
+        Args:
+            other (QuoteSet): The set to union with.
+            on (str): Compare quotes by "identifier" or by "quotedata".
+
+        Returns:
+            QuoteSet: A new QuoteSet.
+        """
+        index, key = self._membership(on)
+        unique = (
+            on == "identifier"
+            and self._proven_unique()
+            and other._proven_unique()
+        )
+        return self._derive(
+            list(self.quotes)
+            + [q for q in other.quotes if key(q) not in index],
+            unique or None,
+        )
+
+    def _resolve_by(self, by: Any) -> Hashable:
+        """
+        Normalise a `by` argument, resolving registered key function names.
+
+        Args:
+            by (Any): A key, iterable of keys, callable or the name of a
+                registered key function.
+
+        Returns:
+            Hashable: A hashable grouping spec.
+        """
+        if isinstance(by, str) and by in self._key_functions:
+            return self._key_functions[by]
+        return normalise_by(by)
 
     def _groupby(
         self,
-        quotes: Union[None, List[Quote]] = None,
+        quotes: Union[None, Iterable[Quote]] = None,
         by: Optional[Union[Any, Callable[[Quote], Any]]] = None,
-    ) -> Dict[Any, List["Quote"]]:
+        bins: Optional[Any] = None,
+    ) -> Mapping[Any, Sequence["Quote"]]:
         """
         Group quotes by a specified key or set of keys.
 
+        Groupings of the whole set are cached against the `by` and `bins`
+        specs, and returned read-only. Groupings by callables (other than
+        registered key functions) are not cached, see `register_key`;
+        passing `quotes` groups those quotes instead and bypasses the cache.
+
         Args:
+            quotes (Iterable[Quote], optional): Quotes to group instead of
+                the quotes in the set.
             by (Any or Iterable[Any], optional): The key(s) used for grouping.
                 If an iterable is provided (and not a string/bytes), the keys
-                are combined into a tuple.
+                are combined into a tuple. May also be a callable, or the
+                name of a key function added with `register_key`.
+            bins (optional): Band the grouped values: a Bins instance, a
+                list of band edges, a band width or a callable applied to the
+                value. When grouping by several keys, a dict of key to bins.
 
         Returns:
-            Dict[Any, List[Quote]]: A mapping from group key to list of Quote
-                objects.
+            Mapping[Any, Sequence[Quote]]: A mapping from group key to the
+                Quote objects in the group.
         """
+        spec = self._resolve_by(by)
+        bins_spec = normalise_bins(spec, bins)
 
-        _by: Union[Tuple[Any,...], Callable, str]
-        if callable(by):
-            _by = by
-        elif isinstance(by, Iterable) and not isinstance(by, (str)):
-            _by = tuple(by)
-        else:
-            _by = by
+        def build(items):
+            return group_items(
+                items, binned_key_getter(spec, bins_spec, items)
+            )
 
-        groups: Dict[Any, List["Quote"]] = {}
-        iterable = quotes or self.quotes
-        for q in iterable:
-            key: Any = _by(q) if callable(_by) else q[_by]
-            groups.setdefault(key, []).append(q)
-        return groups
+        if quotes is not None:
+            return build(list(quotes))
+        if has_callable(by, bins_spec):
+            return build(self.quotes)
+
+        return self._indexes.get(
+            ("groupby", spec, bins_spec),
+            lambda: read_only_groups(build(self.quotes)),
+        )
+
+    def register_key(self, name: str, func: Callable[["Quote"], Any]) -> None:
+        """
+        Register a named key function for use as a `by` argument.
+
+        Lambdas passed directly as `by` are new objects on every call, so
+        their groupings can never be reused. Registering the function under a
+        name lets repeated queries such as `qs.avg(by="age_band")` hit the
+        group cache.
+
+        Args:
+            name (str): The name to register the function under. Takes
+                precedence over a quote data field of the same name.
+            func (Callable): Function returning the group key of a Quote.
+        """
+        self._key_functions[name] = func
+        self._indexes.clear()
 
     def _statistic_function(
         self,
@@ -146,6 +391,7 @@ class QuoteSet:
         on: Optional[str] = None,
         where: Optional[Callable[["Quote"], bool]] = None,
         sort_keys: bool = True,
+        bins: Optional[Any] = None,
     ) -> Union[Dict[Any, Any], Any]:
         """
         Apply an aggregation function to the quotes or to groups of quotes.
@@ -155,12 +401,13 @@ class QuoteSet:
                 values (e.g., mean, max).
             by (Any or Iterable[Any], optional): Key(s) to group quotes before
                 applying the function.
-            bin (Callable): A function that groups the by field.
             on (str, optional): The attribute name to extract from each Quote
                 (defaults to "final_price").
             where (Callable, optional): A function to filter quotes
                 before aggregation.
             sort_keys (bool): Whether to sort the grouping keys in the result.
+            bins (optional): Band the `by` values before grouping, see
+                `_groupby`.
 
         Returns:
             Union[Dict[Any, Any], Any]:
@@ -171,15 +418,16 @@ class QuoteSet:
         """
         attribute: str = on or "final_price"
 
-        filtered_quotes = (
-            list(filter(where, self.quotes)) if where else self.quotes
-        )
+        filtered_quotes = list(filter(where, self.quotes)) if where else None
 
         if by is None:
-            values = [getattr(q, attribute) for q in filtered_quotes]
+            quotes = (
+                self.quotes if filtered_quotes is None else filtered_quotes
+            )
+            values = [getattr(q, attribute) for q in quotes]
             return func(values)
 
-        grouped_data = self._groupby(quotes=filtered_quotes, by=by)
+        grouped_data = self._groupby(quotes=filtered_quotes, by=by, bins=bins)
         prelim: Dict[Any, List[Any]] = {
             key: [getattr(q, attribute) for q in quotes]
             for key, quotes in grouped_data.items()
@@ -202,6 +450,8 @@ class QuoteSet:
             where (Callable, optional): A function to filter quotes
                 before aggregation.
             sort_keys (bool): Whether to sort the grouping keys in the result.
+            bins (optional): Band the `by` values, e.g. a Bins instance, a
+                list of band edges or a band width.
 
         Returns:
             Union[Dict[Any, float], float]:
@@ -223,6 +473,8 @@ class QuoteSet:
             where (Callable, optional): A function to filter quotes
                 before aggregation.
             sort_keys (bool): Whether to sort the grouping keys in the result.
+            bins (optional): Band the `by` values, e.g. a Bins instance, a
+                list of band edges or a band width.
 
         Returns:
             Union[Dict[Any, float], float]:
@@ -244,6 +496,8 @@ class QuoteSet:
             where (Callable, optional): A function to filter quotes
                 before aggregation.
             sort_keys (bool): Whether to sort the grouping keys in the result.
+            bins (optional): Band the `by` values, e.g. a Bins instance, a
+                list of band edges or a band width.
 
         Returns:
             Union[Dict[Any, float], float]:
@@ -265,6 +519,8 @@ class QuoteSet:
             where (Callable, optional): A function to filter quotes
                 before aggregation.
             sort_keys (bool): Whether to sort the grouping keys in the result.
+            bins (optional): Band the `by` values, e.g. a Bins instance, a
+                list of band edges or a band width.
 
         Returns:
             Union[Dict[Any, float], float]:
@@ -274,6 +530,241 @@ class QuoteSet:
         """
         return self._statistic_function(sum, *args, **kwargs)
 
+    def quantiles(
+        self,
+        q: Union[float, Iterable[float]] = (0.25, 0.5, 0.75),
+        *args: Any,
+        k: int = 200,
+        **kwargs: Any,
+    ) -> Union[Dict[Any, Any], Any]:
+        """
+        Compute approximate quantiles of a specified attribute across quotes.
+
+        Values are fed through a QuantileSketch rather than sorted, so the
+        cost is close to linear in the number of quotes and the result is
+        within the sketch's rank error (around 1.65% for the default `k`).
+
+        Args:
+            q (float or Iterable[float]): Quantile(s) between 0 and 1.
+            by (Any or Iterable[Any], optional): Key(s) or Callable to group
+                quotes by.
+            on (str, optional): The attribute name to extract from each Quote
+                (defaults to "final_price").
+            where (Callable, optional): A function to filter quotes
+                before aggregation.
+            sort_keys (bool): Whether to sort the grouping keys in the result.
+            k (int): Sketch size; larger values are more accurate.
+
+        Returns:
+            Union[Dict[Any, Any], Any]:
+                - A value (or list of values, one per quantile) if no grouping
+                    is specified.
+                - A dictionary mapping group keys to those values if
+                    grouping is used.
+        """
+        if isinstance(q, (int, float)):
+            return self._statistic_function(
+                lambda v: sketch_values(v, k=k).quantile(q), *args, **kwargs
+            )
+        qs = list(q)
+        return self._statistic_function(
+            lambda v: sketch_values(v, k=k).quantiles(qs), *args, **kwargs
+        )
+
+    def sketch(
+        self, *args: Any, k: int = 200, **kwargs: Any
+    ) -> Union[Dict[Any, QuantileSketch], QuantileSketch]:
+        """
+        Build quantile sketches of a specified attribute across quotes.
+
+        Sketches from different QuoteSets (for example shards processed by
+        separate workers) can be combined with `QuantileSketch.merge`.
+
+        Args:
+            by (Any or Iterable[Any], optional): Key(s) or Callable to group
+                quotes by.
+            on (str, optional): The attribute name to extract from each Quote
+                (defaults to "final_price").
+            where (Callable, optional): A function to filter quotes
+                before aggregation.
+            sort_keys (bool): Whether to sort the grouping keys in the result.
+            k (int): Sketch size; larger values are more accurate.
+
+        Returns:
+            Union[Dict[Any, QuantileSketch], QuantileSketch]:
+                - A single sketch if no grouping is specified.
+                - A dictionary mapping group keys to sketches if grouping is
+                    used.
+        """
+        return self._statistic_function(
+            lambda v: sketch_values(v, k=k), *args, **kwargs
+        )
+
+    def _value_key(
+        self, on: Union[str, Callable[["Quote"], float]]
+    ) -> Callable[["Quote"], float]:
+        """
+        Resolve `on` into a function returning a value of a Quote.
+
+        Args:
+            on (str or Callable): A registered key function name, a Quote
+                attribute (e.g. "final_price"), a quote data field or a
+                callable.
+        """
+        if callable(on):
+            return on
+        if on in self._key_functions:
+            return self._key_functions[on]
+        if hasattr(Quote, on):
+            return attrgetter(on)
+        return itemgetter(on)
+
+    def _sorted_index(
+        self, on: Union[str, Callable[["Quote"], float]] = "final_price"
+    ) -> SortedIndex:
+        """
+        Return the sorted index of a numeric value, building it if needed.
+
+        Args:
+            on (str or Callable): The value to index, see `_value_key`.
+
+        Returns:
+            SortedIndex: The index, cached until the set changes. Indexes
+                of callables are not cached, as for `_groupby`.
+        """
+        if callable(on):
+            return SortedIndex.build(self.quotes, self._value_key(on))
+        return self._indexes.get(
+            ("sorted", on),
+            lambda: SortedIndex.build(self.quotes, self._value_key(on)),
+        )
+
+    def _view_of_index(
+        self,
+        index: SortedIndex,
+        start: int,
+        stop: int,
+        reverse: bool,
+        on: Union[str, Callable[["Quote"], float]],
+    ) -> "QuoteSetView":
+        """
+        Create a view of a slice of a sorted index, sharing the slice as the
+        view's own index.
+        """
+        positions = index.positions[start:stop]
+        if reverse:
+            positions.reverse()
+        view = QuoteSetView(self, positions)
+        if not callable(on):
+            view._indexes.set(
+                ("sorted", on), index.select(start, stop, reverse)
+            )
+        return view
+
+    def top(
+        self,
+        k: int,
+        on: Union[str, Callable[["Quote"], float]] = "final_price",
+        largest: bool = True,
+    ) -> "QuoteSetView":
+        """
+        Retrieve the k most (or least) expensive quotes.
+
+        The first call for a given `on` sorts the set once; later calls only
+        slice the cached index.
+
+        Args:
+            k (int): The number of quotes to return.
+            on (str or Callable): The value to rank by: a Quote attribute,
+                a quote data field, a registered key function name or a
+                callable (defaults to "final_price").
+            largest (bool): Return the largest values, in descending order.
+                If False, the smallest values in ascending order.
+
+        Returns:
+            QuoteSetView: A view of the selected quotes.
+        """
+        if k < 0:
+            raise ValueError("k must not be negative.")
+        index = self._sorted_index(on)
+        n = len(index)
+        k = min(k, n)
+        if largest:
+            return self._view_of_index(index, n - k, n, True, on)
+        return self._view_of_index(index, 0, k, False, on)
+
+    def between(
+        self,
+        lo: float,
+        hi: float,
+        on: Union[str, Callable[["Quote"], float]] = "final_price",
+    ) -> "QuoteSetView":
+        """
+        Retrieve the quotes whose value lies between `lo` and `hi`.
+
+        Args:
+            lo (float): The lower bound (inclusive).
+            hi (float): The upper bound (inclusive).
+            on (str or Callable): The value to compare, as for `top`.
+
+        Returns:
+            QuoteSetView: A view of the matching quotes, in ascending order
+                of value.
+        """
+        index = self._sorted_index(on)
+        start, stop = index.span(lo, hi)
+        return self._view_of_index(index, start, max(start, stop), False, on)
+
+    def rank(
+        self,
+        quote: Union["Quote", float],
+        on: Union[str, Callable[["Quote"], float]] = "final_price",
+    ) -> float:
+        """
+        Return the fraction of quotes whose value is at most that of `quote`.
+
+        Args:
+            quote (Quote or float): A quote, or a value to rank directly.
+            on (str or Callable): The value to compare, as for `top`.
+
+        Returns:
+            float: A number between 0 and 1, as `QuantileSketch.rank`.
+
+        Raises:
+            ValueError: If the set is empty.
+        """
+        index = self._sorted_index(on)
+        if not len(index):
+            raise ValueError("Cannot rank against an empty QuoteSet.")
+        if isinstance(quote, Quote):
+            quote = self._value_key(on)(quote)
+        return index.count_at_most(quote) / len(index)
+
+    def histogram(
+        self,
+        edges: Iterable[float],
+        on: Union[str, Callable[["Quote"], float]] = "final_price",
+    ) -> Dict[Tuple[float, float], int]:
+        """
+        Count the quotes in each band of value.
+
+        Args:
+            edges (Iterable[float]): Band edges. Bands are closed below and
+                open above.
+            on (str or Callable): The value to band, as for `top`.
+
+        Returns:
+            Dict[Tuple[float, float], int]: Mapping of (lower, upper) band to
+                the number of quotes in it, from -inf to inf, as
+                `Alignment.dislocation`.
+        """
+        edges = sorted(edges)
+        counts = self._sorted_index(on).band_counts(edges)
+        bounds = [-inf, *edges, inf]
+        return {
+            (bounds[i], bounds[i + 1]): count for i, count in enumerate(counts)
+        }
+
     def apply(
         self,
         func: Callable[[Iterable[Any]], Any],
@@ -306,6 +797,7 @@ class QuoteSet:
         self,
         by: Optional[Union[Any, Iterable[Any]]] = None,
         percent: bool = False,
+        bins: Optional[Any] = None,
         **kwargs: Any,
     ) -> Dict[Any, Union[int, float]]:
         """
@@ -316,6 +808,8 @@ class QuoteSet:
             by (Any or Iterable[Any], optional): Key(s) to group quotes.
             percent (bool): If True, returns the percentage representation of
                  each group.
+            bins (optional): Band the `by` values before grouping, see
+                `_groupby`.
             **kwargs: Additional keyword arguments to pass to the percentage
                 function.
 
@@ -323,7 +817,7 @@ class QuoteSet:
             Dict[Any, Union[int, float]]: A dictionary mapping each group key
                 to its count or percentage.
         """
-        grouped = self._groupby(by=by)
+        grouped = self._groupby(by=by, bins=bins)
         if percent:
             return {
                 k: percentage(len(v), len(self), **kwargs)
@@ -392,6 +886,38 @@ class QuoteSet:
             self.apply(func, by=by), other.apply(func, by=by)
         )
 
+    def align(
+        self,
+        other: "QuoteSet",
+        on: Union[str, Iterable[str]] = "identifier",
+        keep_quotes: bool = False,
+    ) -> Alignment:
+        """
+        Pair each quote in this set with its counterpart in another set.
+
+        Typically used to compare the same TestSuite quoted by two versions
+        of a framework, quote by quote. The join is a single hash join, so
+        it is linear in the size of both sets.
+
+        Args:
+            other (QuoteSet): The set to compare against (the "right" side).
+            on (str or Iterable[str]): "identifier" to pair quotes by
+                identifier, otherwise the quote data key(s) to pair on.
+            keep_quotes (bool): Keep references to the paired quotes.
+
+        Returns:
+            Alignment: The paired prices, see Alignment for the available
+                analyses. Further chunks can be added with `Alignment.add`.
+
+        Raises:
+            NotImplementedError: If `other` is not a QuoteSet.
+        """
+        if not isinstance(other, QuoteSet):
+            raise NotImplementedError("Align only implemented for QuoteSet")
+        # Index the other set first, so pairs follow the order of this set.
+        alignment = Alignment(on=on, keep_quotes=keep_quotes)
+        return alignment.add(right=other).add(left=self)
+
     def factors(self, keys: Optional[Iterable[str]] = None) -> Dict[str, set]:
         """
         Retrieve unique sets of factors present in the quote data.
@@ -426,26 +952,212 @@ class QuoteSet:
                 selection.
 
         Returns:
-            QuoteSet: A new QuoteSet containing quotes that match the filtering
-                criteria.
+            QuoteSetView: A view of the quotes that match the filtering
+                criteria. The quotes are not copied; call `materialize` on
+                the view for an independent QuoteSet.
 
         Raises:
             NotImplementedError: If dict-based filtering is attempted.
         """
         if callable(by):
-            return QuoteSet(filter(by, self))
+            positions = compress(range(len(self)), map(by, self.quotes))
+            return QuoteSetView(self, positions)
         raise NotImplementedError(
             "Dict-based filtering is deprecated. Use a function instead."
         )
 
+    def materialize(self) -> "QuoteSet":
+        """
+        Return a QuoteSet that holds its own list of quotes.
+
+        A QuoteSet already does, so this returns the set itself; views
+        override it to copy their quotes out of the parent.
+
+        Returns:
+            QuoteSet: A materialised QuoteSet.
+        """
+        return self
+
+    def _derive(
+        self, quotes: Iterable["Quote"], unique: Optional[bool] = None
+    ) -> "QuoteSet":
+        """
+        Create a QuoteSet from quotes derived from this one.
+
+        The new set inherits this set's `id_check` mode. If `unique` is
+        known it is recorded, and the identifier check only runs when it is
+        not known to pass.
+
+        Args:
+            quotes (Iterable[Quote]): The quotes of the new set.
+            unique (bool, optional): Whether the identifiers are known to be
+                unique (True), known to clash (False) or unknown (None).
+
+        Returns:
+            QuoteSet: The new set.
+        """
+        derived = QuoteSet(quotes, id_check="off")
+        derived.id_check = self.id_check
+        if unique is not None:
+            derived._indexes.set("unique", unique)
+        derived.unique_id_check()
+        return derived
+
+    def _proven_unique(self) -> Optional[bool]:
+        """
+        Return True if the identifiers are already known to be unique,
+        without checking them.
+        """
+        return True if "unique" in self._indexes and self.unique_ids else None
+
+    @property
+    def unique_ids(self) -> bool:
+        """
+        Whether every quote in the set has a distinct identifier.
+
+        Computed on first access from the identifier index, and cached until
+        the set changes.
+        """
+        return self._indexes.get(
+            "unique", lambda: len(self._identifier_index()) == len(self)
+        )
+
     def unique_id_check(self) -> None:
         """
-        Check for duplicate quote identifiers and warn if duplicates exist.
+        Check for duplicate quote identifiers, according to `id_check`.
+
+        Raises:
+            ValueError: If `id_check` is "strict" and identifiers are not
+                unique. In "warn" mode a UserWarning is issued instead.
+        """
+        if self.id_check == "off" or self.unique_ids:
+            return
+        if self.id_check == "strict":
+            raise ValueError("QuoteSet contains non-unique quote identifiers.")
+        warnings.warn("QuoteSet contains non-unique quote identifiers.")
+
+
+class _IndexedQuotes(Sequence):
+    """
+    Read-only sequence of the quotes at `positions` in `source`.
+    """
+
+    __slots__ = ("_source", "_positions")
+
+    def __init__(self, source: List["Quote"], positions: array) -> None:
+        self._source = source
+        self._positions = positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __iter__(self) -> Iterator["Quote"]:
+        return map(self._source.__getitem__, self._positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._source[i] for i in self._positions[index]]
+        return self._source[self._positions[index]]
+
+
+class QuoteSetView(QuoteSet):
+    """
+    A lightweight, read-only subset of a QuoteSet.
+
+    Returned by `QuoteSet.subset`. A view holds a reference to its parent's
+    list of quotes and an array of positions within it, rather than its own
+    list of quotes, and supports everything a QuoteSet does. Subsets of a
+    view are views of the same parent, so filters compose without copying.
+    Sorted indexes (see `top`) are filtered out of the parent's rather than
+    rebuilt, and views returned by `top` and `between` start with theirs.
+
+    Views are invalidated if the parent's quote list is modified; call
+    `materialize` for an independent QuoteSet.
+    """
+
+    def __init__(self, parent: QuoteSet, positions: Iterable[int]) -> None:
+        """
+        Initialise a view of `parent`.
+
+        Args:
+            parent (QuoteSet): The set (or view) to take a view of.
+            positions (Iterable[int]): Positions within `parent`.
+        """
+        self._parent = parent
+        self._relative = array("q", positions)
+        if isinstance(parent, QuoteSetView):
+            source = parent._source
+            self._positions = array(
+                "q", map(parent._positions.__getitem__, self._relative)
+            )
+        else:
+            source = parent.quotes
+            self._positions = self._relative
+        self._source: VersionedList = source
+        self._source_version = source.version
+        self.id_check = parent.id_check
+        self._key_functions = dict(parent._key_functions)
+        self._indexes = IndexCache(source)
+        if parent._proven_unique():
+            self._indexes.set("unique", True)
+
+    @property
+    def quotes(self) -> Sequence["Quote"]:
+        """
+        The Quote objects in the view, as a read-only sequence.
+
+        Raises:
+            RuntimeError: If the parent's quotes have been modified since the
+                view was created.
+        """
+        if self._source.version != self._source_version:
+            raise RuntimeError(
+                "The parent QuoteSet has been modified since this view was "
+                "created."
+            )
+        return _IndexedQuotes(self._source, self._positions)
+
+    @quotes.setter
+    def quotes(self, quotes: Iterable["Quote"]) -> None:
+        raise AttributeError(
+            "QuoteSetView is read-only, materialize it first."
+        )
+
+    def subset(
+        self, by: Union[Callable[["Quote"], bool], Dict[Any, Any]]
+    ) -> "QuoteSetView":
+        """
+        Retrieve a subset of the view, as a view of the same parent.
+        """
+        if callable(by):
+            return QuoteSetView(
+                self, compress(range(len(self)), map(by, self.quotes))
+            )
+        return super().subset(by)
 
-        Prints a warning message if any Quote in the set has a non-unique
-            identifier.
+    def _sorted_index(
+        self, on: Union[str, Callable[["Quote"], float]] = "final_price"
+    ) -> SortedIndex:
+        """
+        Return the sorted index of a numeric value, building it if needed.
+
+        If the parent already holds the index, the view's index is filtered
+        out of it rather than built by sorting again.
+        """
+        spec = ("sorted", on)
+        if spec in self._indexes or spec not in self._parent._indexes:
+            return super()._sorted_index(on)
+        index = self._parent._sorted_index(on).restrict(
+            self._relative, len(self._parent)
+        )
+        self._indexes.set(spec, index)
+        return index
+
+    def materialize(self) -> QuoteSet:
+        """
+        Copy the quotes in the view into a new, independent QuoteSet.
+
+        Returns:
+            QuoteSet: A QuoteSet holding the same quotes.
         """
-        ids = [q.identifier for q in self]
-        id_counts = Counter(ids)
-        if any(count > 1 for count in id_counts.values()):
-            print("Warning, non-unique IDs")
+        return self._derive(list(self.quotes), self._proven_unique())
@@ -0,0 +1,235 @@
+"""Rerate
+
+Re-rating only the quotes a lookup table edit affects.
+
+With `quote_many(..., record_hits=True)`, every quote records the lookup
+table rows it used as `row_hits`, an array of (table_id, row_id) pairs
+packed into ints (see `sentinelpricing.utils.tracing.pack_hit`), and the
+QuoteSet keeps a HitRecord of the tables it was rated with. Given a new
+version of the framework whose code is unchanged, only its tables,
+`Framework.rerate` compares each table to the recorded one and re-rates
+just the quotes that hit a changed row:
+
+    >>> current = MotorV1.quote_many(tests, record_hits=True)
+    >>> proposed = MotorV2.rerate(current)
+    >>> len(proposed.rerated) / len(proposed)
+    0.04
+
+A table whose rates changed in place only affects quotes that hit the
+changed rows. A table whose index changed (rows added, removed or moved)
+affects every quote that used it.
+
+`Framework.compare_many` applies the same idea to several versions at
+once: the first is rated recording hits, and each later version that only
+differs in its tables shares every quote that did not hit a changed row.
+"""
+
+import copy
+from array import array
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from .quote import Quote
+from .quoteset import QuoteSet
+from .testcase import TestCase
+from sentinelpricing.utils.tracing import pack_hit
+
+if TYPE_CHECKING:
+    from .framework import Framework
+
+
+class HitRecord:
+    """
+    The lookup tables a run was rated with, for `Framework.rerate`.
+
+    Attributes:
+        framework (type): The Framework subclass that rated the run.
+        code (str): The digest of its calculation code and non-table state.
+        tables (Dict[str, Tuple[int, tuple, tuple]]): The attribute path of
+            each table, mapped to its table_id and a copy of its index and
+            rates.
+        args (tuple): Extra positional arguments given to `calculation`.
+        kwargs (dict): Extra keyword arguments given to `calculation`.
+    """
+
+    def __init__(
+        self,
+        instance: "Framework",
+        args: Tuple[Any, ...] = (),
+        kwargs: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.framework = type(instance)
+        self.code = instance._code_digest()
+        table_ids = instance._table_ids or {}
+        self.tables = {
+            path: (
+                table_ids[id(table)],
+                tuple(table.index),
+                tuple(table.rates),
+            )
+            for path, table in instance._lookup_tables().items()
+        }
+        self.args = args
+        self.kwargs = kwargs or {}
+
+    def __repr__(self) -> str:
+        return (
+            f"HitRecord({self.framework.__name__}, "
+            f"tables={list(self.tables)})"
+        )
+
+    @property
+    def table_ids(self) -> Dict[str, int]:
+        """The table_id of each table, by attribute path."""
+        return {path: table[0] for path, table in self.tables.items()}
+
+    def changes(self, instance: "Framework") -> Tuple[Set[int], Set[int]]:
+        """
+        Compare the tables of a framework instance to the recorded ones.
+
+        Args:
+            instance (Framework): An instance of the new framework version.
+
+        Returns:
+            Tuple[Set[int], Set[int]]: The packed hits of rows whose rate
+                changed, and the table_ids of tables whose index changed.
+
+        Raises:
+            ValueError: If anything but the tables' contents changed.
+        """
+        if instance._code_digest() != self.code:
+            raise ValueError(
+                f"{type(instance).__name__} differs from "
+                f"{self.framework.__name__} in more than its lookup tables; "
+                "rate the tests again instead."
+            )
+        tables = instance._lookup_tables()
+        rows: Set[int] = set()
+        replaced: Set[int] = set()
+        for path, (table_id, index, rates) in self.tables.items():
+            table = tables.get(path)
+            if table is None:
+                raise ValueError(f"Lookup table {path!r} was removed.")
+            if tuple(table.index) != index:
+                replaced.add(table_id)
+                continue
+            rows.update(
+                pack_hit(table_id, row)
+                for row, (old, new) in enumerate(zip(rates, table.rates))
+                if old != new
+            )
+        return rows, replaced
+
+
+def _affected(hits: Any, rows: Set[int], replaced: Set[int]) -> bool:
+    """Whether a quote with these hits used a changed row or table."""
+    if hits is None or not rows.isdisjoint(hits):
+        return True
+    return bool(replaced) and any(hit >> 32 in replaced for hit in hits)
+
+
+def rerate(framework: type, quotes: QuoteSet) -> QuoteSet:
+    """
+    Re-rate the quotes of a recorded run affected by table changes. See
+    `Framework.rerate`.
+    """
+    record = getattr(quotes, "hit_record", None)
+    if not isinstance(record, HitRecord):
+        raise ValueError(
+            "Quotes must be rated with quote_many(..., record_hits=True)."
+        )
+    instance = framework()
+    rows, replaced = record.changes(instance)
+    instance._record_row_hits(record.table_ids)
+
+    patched: List[Any] = list(quotes)
+    positions = array("q")
+    for position, quote in enumerate(patched):
+        if not _affected(getattr(quote, "row_hits", None), rows, replaced):
+            # Unaffected: share the recorded result, as compare_many does.
+            quote.breakdown.freeze()
+            shared = copy.copy(quote)
+            shared.framework = framework
+            patched[position] = shared
+            continue
+        test = Quote(
+            TestCase(quote.quotedata), framework, identifier=quote.identifier
+        )
+        patched[position] = instance._calculate_wrapper(
+            test, *record.args, **record.kwargs
+        )
+        positions.append(position)
+
+    quote_set = framework._quote_set(instance, patched, None)
+    quote_set.hit_record = HitRecord(instance, record.args, record.kwargs)
+    quote_set.rerated = positions
+    return quote_set
+
+
+def compare_many(
+    frameworks: Sequence[type], tests: Iterable[Any], *args: Any, **kwargs: Any
+) -> List[QuoteSet]:
+    """
+    Rate tests with several framework versions in a single pass. See
+    `Framework.compare_many`.
+    """
+    if not frameworks:
+        raise ValueError("Expected at least one framework.")
+    instances = [framework() for framework in frameworks]
+    base = instances[0]
+    base._record_row_hits()
+    record = HitRecord(base, args, kwargs)
+
+    # The changed rows and tables of each later version, or None if its
+    # code differs from the first and every quote must be rated.
+    plans: List[Optional[Tuple[Set[int], Set[int]]]] = []
+    for instance in instances[1:]:
+        try:
+            plans.append(record.changes(instance))
+        except ValueError:
+            plans.append(None)
+
+    runs: List[List[Any]] = [[] for _ in frameworks]
+    rated = [array("q") for _ in frameworks]
+    for position, test in enumerate(tests):
+        # Every version rates the same TestCase, so quotes share their
+        # identifiers and line up across runs.
+        if isinstance(test, Quote):
+            test = TestCase(test.quotedata, test.identifier)
+        elif not isinstance(test, TestCase):
+            test = TestCase(test)
+        quote = base._calculate_wrapper(test, *args, **kwargs)
+        runs[0].append(quote)
+        rated[0].append(position)
+        hits = getattr(quote, "row_hits", None)
+
+        for n, plan in enumerate(plans, 1):
+            if plan is not None and not _affected(hits, *plan):
+                # Unaffected: share the first version's result.
+                quote.breakdown.freeze()
+                shared = copy.copy(quote)
+                shared.framework = frameworks[n]
+                runs[n].append(shared)
+                continue
+            runs[n].append(
+                instances[n]._calculate_wrapper(test, *args, **kwargs)
+            )
+            rated[n].append(position)
+
+    quote_sets = []
+    for framework, instance, quotes, positions in zip(
+        frameworks, instances, runs, rated
+    ):
+        quote_set = framework._quote_set(instance, quotes, None)
+        quote_set.rerated = positions
+        quote_sets.append(quote_set)
+    return quote_sets
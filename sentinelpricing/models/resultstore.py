@@ -0,0 +1,420 @@
+"""Result Store
+
+Persisting the results of a run on disk, so unchanged reruns are loaded
+rather than recalculated.
+
+Results are stored per run, in a file named after three digests: the
+framework's (its code, inherited set up methods and the contents of its
+LookupTables, see `Framework.digest`), the test suite's (see
+`TestSuite.digest`) and that of any extra arguments to `calculation`.
+Changing any of them names a different file, so stale results are never
+loaded; they are simply evicted, least recently used first, once the store
+grows past its size limit.
+
+Files hold each distinct breakdown once, as typed arrays of step codes,
+names and values, plus an array mapping every row to its breakdown. On
+loading, rows with the same breakdown share one frozen Breakdown, as with
+`quote_many(..., dedup=True)`. Only plain Quotes whose steps use the
+arithmetic operators and int or float values can be stored; any other run
+is recalculated every time.
+"""
+
+import json
+import os
+import sys
+import tempfile
+from array import array
+from operator import add, mul, sub, truediv
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .breakdown import Breakdown
+from .note import Note
+from .quote import Quote
+from .step import Step
+from .testcase import TestCase
+from sentinelpricing.utils.digest import digest_rows, new_hash, stable_repr
+
+_MAGIC = b"SPRS"
+_VERSION = 1
+_SUFFIX = ".results"
+
+# Step operations and their codes. The top bits of a code flag a step whose
+# `other` is None, or whose `other` or `result` is an int.
+_OPERATIONS: List[Any] = [None, add, sub, mul, truediv, "assignment"]
+_NOTE = 15
+_OTHER_NONE = 0x80
+_OTHER_INT = 0x40
+_RESULT_INT = 0x20
+_OPERATION_MASK = 0x1F
+
+# Arrays written to a results file, in order, with their type codes.
+_ARRAYS = (
+    ("ops", "B"),
+    ("names", "L"),
+    ("others", "d"),
+    ("results", "d"),
+    ("offsets", "Q"),
+    ("rows", "L"),
+)
+
+# The attributes of a Quote that are stored: anything else set on a quote
+# means the run cannot be stored.
+_QUOTE_ATTRIBUTES = frozenset(
+    ("identifier", "framework", "quotedata", "breakdown")
+)
+
+
+class _Unstorable(Exception):
+    """Raised while encoding a run that cannot be stored."""
+
+
+def _number(value: Any) -> Tuple[float, bool]:
+    kind = type(value)
+    if kind is float:
+        return value, False
+    if kind is int and -(2**53) <= value <= 2**53:
+        return float(value), True
+    raise _Unstorable
+
+
+def _encode(quotes: List[Any]) -> bytes:
+    """Encode a run's breakdowns, raising _Unstorable if it cannot be."""
+    arrays = {name: array(typecode) for name, typecode in _ARRAYS}
+    arrays["offsets"].append(0)
+    names: Dict[str, int] = {}
+    distinct: Dict[Tuple, int] = {}
+    # Breakdowns shared between quotes (e.g. by dedup) are encoded once.
+    seen: Dict[int, int] = {}
+    operations = {op: code for code, op in enumerate(_OPERATIONS)}
+
+    for quote in quotes:
+        if type(quote) is not Quote:
+            raise _Unstorable
+        if quote.__dict__.keys() != _QUOTE_ATTRIBUTES:
+            raise _Unstorable
+        breakdown = quote.breakdown
+        code = seen.get(id(breakdown))
+        if code is None:
+            encoded = []
+            for step in breakdown.steps:
+                if isinstance(step, Note):
+                    name = names.setdefault(step.text, len(names))
+                    encoded.append((_NOTE, name, 0.0, 0.0))
+                    continue
+                if type(step) is not Step or type(step.name) is not str:
+                    raise _Unstorable
+                try:
+                    op = operations[step.oper]
+                except (KeyError, TypeError):
+                    raise _Unstorable from None
+                result, is_int = _number(step.result)
+                if is_int:
+                    op |= _RESULT_INT
+                if step.other is None:
+                    other = 0.0
+                    op |= _OTHER_NONE
+                else:
+                    other, is_int = _number(step.other)
+                    if is_int:
+                        op |= _OTHER_INT
+                name = names.setdefault(step.name, len(names))
+                encoded.append((op, name, other, result))
+            steps = tuple(encoded)
+            code = distinct.get(steps)
+            if code is None:
+                code = distinct[steps] = len(distinct)
+                for op, name, other, result in steps:
+                    arrays["ops"].append(op)
+                    arrays["names"].append(name)
+                    arrays["others"].append(other)
+                    arrays["results"].append(result)
+                arrays["offsets"].append(len(arrays["ops"]))
+            seen[id(breakdown)] = code
+        arrays["rows"].append(code)
+
+    header = json.dumps(
+        {
+            "version": _VERSION,
+            "byteorder": sys.byteorder,
+            "names": list(names),
+            "lengths": [len(arrays[name]) for name, _ in _ARRAYS],
+        }
+    ).encode()
+    parts = [_MAGIC, len(header).to_bytes(8, "little"), header]
+    parts.extend(arrays[name].tobytes() for name, _ in _ARRAYS)
+    return b"".join(parts)
+
+
+def _read(blob: bytes) -> Optional[Tuple[Dict[str, Any], Dict[str, array]]]:
+    """Read the header and arrays of a results file, or None if it is not
+    one written by this version, or is truncated or corrupt."""
+    if blob[:4] != _MAGIC:
+        return None
+    try:
+        size = int.from_bytes(blob[4:12], "little")
+        position = 12 + size
+        header = json.loads(blob[12:position])
+        if (
+            header["version"] != _VERSION
+            or header["byteorder"] != sys.byteorder
+        ):
+            return None
+        arrays = {}
+        for (name, typecode), length in zip(_ARRAYS, header["lengths"]):
+            values = array(typecode)
+            end = position + length * values.itemsize
+            values.frombytes(blob[position:end])
+            arrays[name] = values
+            position = end
+    except (ValueError, KeyError, TypeError):
+        # json.JSONDecodeError is a ValueError.
+        return None
+    if position != len(blob) or len(arrays) != len(_ARRAYS):
+        return None
+    return header, arrays
+
+
+def _decode(
+    blob: bytes, framework: type, tests: List[Any]
+) -> Optional[List[Quote]]:
+    """Decode a results file into quotes for `tests`, or None if the file
+    does not match them or is truncated or corrupt."""
+    read = _read(blob)
+    if read is None:
+        return None
+    header, arrays = read
+    rows = arrays["rows"]
+    if len(rows) != len(tests):
+        return None
+
+    try:
+        breakdowns = _breakdowns(header["names"], arrays)
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+    if any(code >= len(breakdowns) for code in rows):
+        return None
+
+    quotes = []
+    for test, code in zip(tests, rows):
+        quote = Quote(test, framework)
+        quote.breakdown = breakdowns[code]
+        quotes.append(quote)
+    return quotes
+
+
+def _breakdowns(names: List[str], arrays: Dict[str, array]) -> List[Breakdown]:
+    """Decode the shared breakdowns of a results file."""
+    ops, others, results = arrays["ops"], arrays["others"], arrays["results"]
+    offsets = arrays["offsets"]
+    breakdowns = []
+    for start, stop in zip(offsets, offsets[1:]):
+        steps: List[Union[Step, Note]] = []
+        for i in range(start, stop):
+            op = ops[i]
+            if op == _NOTE:
+                steps.append(Note(names[arrays["names"][i]]))
+                continue
+            other: Any = others[i]
+            if op & _OTHER_NONE:
+                other = None
+            elif op & _OTHER_INT:
+                other = int(other)
+            result: Any = results[i]
+            if op & _RESULT_INT:
+                result = int(result)
+            steps.append(
+                Step(
+                    names[arrays["names"][i]],
+                    _OPERATIONS[op & _OPERATION_MASK],
+                    other,
+                    result,
+                )
+            )
+        breakdown = Breakdown.__new__(Breakdown)
+        breakdown.steps = steps
+        breakdown.frozen = True
+        breakdowns.append(breakdown)
+    return breakdowns
+
+
+class ResultStore:
+    """
+    A directory of stored run results, capped in size.
+
+    Example:
+        >>> class Motor(Framework):
+        ...     result_store = ResultStore("~/.cache/motor", max_bytes=2**30)
+        >>> quotes = Motor.quote_many(tests)  # calculated and stored
+        >>> quotes = Motor.quote_many(tests)  # loaded
+
+    Attributes:
+        directory (Path): Where results are stored. Defaults to the
+            SENTINELPRICING_CACHE environment variable, or
+            ~/.cache/sentinelpricing.
+        max_bytes (int): The most bytes of results kept; the least recently
+            used files are deleted to stay under it.
+        hits (int): Runs loaded from the store.
+        misses (int): Runs not found in the store.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, os.PathLike, None] = None,
+        max_bytes: int = 1 << 30,
+    ) -> None:
+        if directory is None:
+            directory = os.environ.get(
+                "SENTINELPRICING_CACHE", "~/.cache/sentinelpricing"
+            )
+        self.directory = Path(directory).expanduser()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"ResultStore({str(self.directory)!r}, "
+            f"max_bytes={self.max_bytes})"
+        )
+
+    def key(
+        self,
+        instance: Any,
+        tests: Iterable[Any],
+        args: Tuple[Any, ...] = (),
+        kwargs: Optional[Dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """
+        Return the name results of a run are stored under, or None if the
+        run cannot be stored.
+
+        Args:
+            instance (Framework): The framework instance rating the run.
+            tests (Iterable[Any]): The test cases, a TestSuite or a list of
+                dicts or TestCases. Runs including Quotes are not stored.
+            args (tuple): Extra positional arguments to `calculation`.
+            kwargs (dict, optional): Extra keyword arguments.
+        """
+        arguments = stable_repr((args, sorted((kwargs or {}).items())))
+        if arguments is None:
+            return None
+        digest = getattr(tests, "digest", None)
+        if digest is not None:
+            tests_digest = digest()
+        else:
+            rows = []
+            for test in tests:
+                if isinstance(test, TestCase):
+                    rows.append(test.data)
+                elif isinstance(test, dict):
+                    rows.append(test)
+                else:
+                    return None
+            tests_digest = digest_rows(rows)
+        if tests_digest is None:
+            return None
+        digest = new_hash()
+        digest.update(arguments.encode())
+        return f"{instance._digest()}-{tests_digest}-{digest.hexdigest()}"
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key + _SUFFIX)
+
+    def load(
+        self, key: str, framework: type, tests: Iterable[Any]
+    ) -> Optional[List[Quote]]:
+        """
+        Return the stored quotes for `tests`, or None if there are none.
+
+        Args:
+            key (str): See `key`.
+            framework (type): The Framework subclass, set on the quotes.
+            tests (Iterable[Any]): The test cases, which the quotes are
+                built from so they carry their data and identifiers.
+        """
+        path = self._path(key)
+        try:
+            blob = path.read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        quotes = _decode(blob, framework, list(tests))
+        if quotes is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            # Mark the file as recently used.
+            os.utime(path)
+        except OSError:
+            pass
+        return quotes
+
+    def save(self, key: str, quotes: List[Any]) -> bool:
+        """
+        Store the quotes of a run, evicting old runs as needed.
+
+        Args:
+            key (str): See `key`.
+            quotes (List[Any]): The results, in the order of the tests.
+
+        Returns:
+            bool: Whether the run could be stored.
+        """
+        try:
+            blob = _encode(quotes)
+        except _Unstorable:
+            return False
+        if len(blob) > self.max_bytes:
+            return False
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, so readers never see half a file.
+        handle, temporary = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(handle, "wb") as file:
+                file.write(blob)
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self._evict()
+        return True
+
+    def _files(self) -> List[Tuple[float, int, Path]]:
+        files = []
+        for path in self.directory.glob("*" + _SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    @property
+    def size(self) -> int:
+        """The total bytes of results stored."""
+        if not self.directory.exists():
+            return 0
+        return sum(size for _, size, _ in self._files())
+
+    def _evict(self) -> None:
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        """Delete every stored run."""
+        if self.directory.exists():
+            for _, _, path in self._files():
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,256 @@
+"""Router
+
+Quoting each policy with the framework version in force on its date.
+
+Rate changes are released as new Framework subclasses, each in force for a
+period: from its `effective_date` up to, not including, its
+`expiry_date`. A FrameworkRouter holds a set of versions in an interval
+index, and routes each quote to a warm instance of the version in force on
+the date read from the quote data:
+
+    >>> router = FrameworkRouter(date_key="inception_date")
+    >>> router.register(MotorV1, "2024-01-01", "2024-07-01")
+    >>> router.register(MotorV2, "2024-07-01")
+    >>> router.quote({"inception_date": "2024-08-15", ...}).framework
+    <class 'MotorV2'>
+
+`quote_many` rates a whole suite by grouping its tests by version and
+running each group as a batch through `Framework.quote_many`, rather than
+switching frameworks quote by quote.
+"""
+
+import datetime
+from bisect import bisect_right
+from threading import Lock
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .quoteset import QuoteSet
+
+# A date, or an ISO format string of one.
+DateLike = Any
+
+
+def _as_date(value: DateLike) -> datetime.date:
+    """Return a date given as a date, a datetime or an ISO format string."""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        if len(value) > 10:
+            return datetime.datetime.fromisoformat(value).date()
+        return datetime.date.fromisoformat(value)
+    raise TypeError(
+        f"Expected a date or an ISO format string, got {type(value).__name__}"
+    )
+
+
+class FrameworkRouter:
+    """
+    Framework versions indexed by the period each is in force.
+
+    Attributes:
+        date_key (str): The quote data key holding the date quotes are
+            routed on, e.g. the policy's inception date.
+    """
+
+    def __init__(
+        self,
+        date_key: str = "effective_date",
+        frameworks: Iterable[type] = (),
+    ) -> None:
+        """
+        Initialize a new FrameworkRouter.
+
+        Args:
+            date_key (str): See above. Defaults to "effective_date".
+            frameworks (Iterable[type]): Framework subclasses to register
+                with their own `effective_date` and `expiry_date`.
+        """
+        self.date_key = date_key
+        # The interval index: periods sorted by start, which never overlap.
+        self._starts: List[datetime.date] = []
+        self._periods: List[Tuple[datetime.date, datetime.date, type]] = []
+        self._instances: Dict[type, Any] = {}
+        self._lock = Lock()
+        for framework in frameworks:
+            self.register(framework)
+
+    def __len__(self) -> int:
+        return len(self._periods)
+
+    def __iter__(self) -> Iterator[Tuple[datetime.date, datetime.date, type]]:
+        """Iterate over the (effective, expiry, framework) periods, in
+        order."""
+        return iter(self._periods)
+
+    def __repr__(self) -> str:
+        versions = ", ".join(f.__name__ for _, _, f in self._periods)
+        return f"FrameworkRouter({self.date_key!r}, [{versions}])"
+
+    def register(
+        self,
+        framework: type,
+        effective: Optional[DateLike] = None,
+        expiry: Optional[DateLike] = None,
+    ) -> type:
+        """
+        Add a framework version, in force from `effective` up to, not
+        including, `expiry`.
+
+        Returns the framework, so it can be used as a class decorator for
+        frameworks that declare their own dates.
+
+        Args:
+            framework (type): A Framework subclass.
+            effective (date or str, optional): Defaults to the framework's
+                `effective_date`; None for no start.
+            expiry (date or str, optional): Defaults to the framework's
+                `expiry_date`; None for no end.
+
+        Returns:
+            type: The framework.
+
+        Raises:
+            ValueError: If the period is empty or overlaps that of another
+                version.
+        """
+        if effective is None:
+            effective = framework.effective_date
+        if expiry is None:
+            expiry = framework.expiry_date
+        start = datetime.date.min if effective is None else _as_date(effective)
+        end = datetime.date.max if expiry is None else _as_date(expiry)
+        if start >= end:
+            raise ValueError(
+                f"{framework.__name__} expires ({end}) before it is "
+                f"effective ({start})."
+            )
+        with self._lock:
+            position = bisect_right(self._starts, start)
+            # Only the periods either side of the new one can overlap it.
+            before, after = max(position - 1, 0), position + 1
+            neighbours = self._periods[before:after]
+            for other_start, other_end, other in neighbours:
+                if start < other_end and other_start < end:
+                    raise ValueError(
+                        f"{framework.__name__} ({start} to {end}) overlaps "
+                        f"{other.__name__} ({other_start} to {other_end})."
+                    )
+            self._starts.insert(position, start)
+            self._periods.insert(position, (start, end, framework))
+        return framework
+
+    def framework_for(self, date: DateLike) -> type:
+        """
+        Return the framework version in force on a date.
+
+        Args:
+            date (date or str): The date.
+
+        Raises:
+            LookupError: If no version is in force on the date.
+        """
+        day = _as_date(date)
+        position = bisect_right(self._starts, day) - 1
+        if position >= 0:
+            _, end, framework = self._periods[position]
+            if day < end:
+                return framework
+        raise LookupError(f"No framework version is in force on {day}.")
+
+    def route(self, test: Any) -> type:
+        """Return the framework version for a test case, dict or Quote."""
+        return self.framework_for(test[self.date_key])
+
+    def instance(self, framework: type) -> Any:
+        """
+        Return the warm instance of a registered framework, set up (or
+        restored from its snapshot) on first use and reused after.
+        """
+        instance = self._instances.get(framework)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(framework)
+                if instance is None:
+                    instance = self._instances[framework] = framework()
+        return instance
+
+    def warm(self) -> None:
+        """Set up every registered version now, rather than on first
+        use."""
+        for _, _, framework in self._periods:
+            self.instance(framework)
+
+    def quote(self, test: Any, *args: Any, **kwargs: Any) -> Any:
+        """
+        Calculate a quote with the version in force on its date.
+
+        Args:
+            test: A test case data structure or a Quote instance.
+            *args: Additional positional arguments for the calculation method.
+            **kwargs: Additional keyword arguments for the calculation method.
+
+        Returns:
+            The calculated quote.
+        """
+        framework = self.route(test)
+        instance = self.instance(framework)
+        if framework.cache_results:
+            return framework.result_cache().quote(
+                framework, test, *args, instance=instance, **kwargs
+            )
+        return instance._calculate_wrapper(test, *args, **kwargs)
+
+    def quote_many(
+        self, tests: Iterable[Any], *args: Any, **kwargs: Any
+    ) -> QuoteSet:
+        """
+        Calculate quotes, each with the version in force on its date.
+
+        Tests are grouped by version and each group is rated as one batch
+        with `Framework.quote_many`, so dedup, result caches and stores
+        apply per version.
+
+        Args:
+            tests (Iterable[Any]): Test case data structures or Quotes.
+            *args: Additional positional arguments for the calculation method.
+            **kwargs: Additional keyword arguments for `quote_many` and the
+                calculation method.
+
+        Returns:
+            QuoteSet: The quotes, in the order of `tests`. Its `versions`
+                attribute maps each framework used to the QuoteSet of its
+                batch.
+        """
+        tests = list(tests)
+        groups: Dict[type, List[int]] = {}
+        routes: Dict[Any, type] = {}
+        for position, test in enumerate(tests):
+            date = test[self.date_key]
+            try:
+                framework = routes[date]
+            except (KeyError, TypeError):
+                framework = self.framework_for(date)
+                try:
+                    routes[date] = framework
+                except TypeError:
+                    pass
+            groups.setdefault(framework, []).append(position)
+
+        quotes: List[Any] = [None] * len(tests)
+        versions: Dict[type, QuoteSet] = {}
+        for framework, positions in groups.items():
+            batch = framework.quote_many(
+                [tests[p] for p in positions],
+                *args,
+                instance=self.instance(framework),
+                **kwargs,
+            )
+            versions[framework] = batch
+            for position, quote in zip(positions, batch):
+                quotes[position] = quote
+
+        quote_set = QuoteSet(quotes)
+        quote_set.versions = versions
+        return quote_set
@@ -0,0 +1,323 @@
+"""Snapshot
+
+Saving a framework's set up state, so new processes start without running
+set up.
+
+`Framework.snapshot(path)` runs set up once and writes what it left on the
+instance: every LookupTable, PriceTest and Rate, and plain values (numbers,
+strings, None and lists, tuples, sets and dicts of them). Anything else,
+such as a fitted model, cannot be snapshotted, and raises a TypeError
+naming the attribute rather than being pickled.
+
+    >>> Motor.snapshot("motor.snapshot")            # once, e.g. at build
+    >>> motor = Motor.from_snapshot("motor.snapshot")  # in each worker
+
+The file starts with a versioned JSON header describing the state, followed
+by each table's index columns and rates as typed arrays. Restoring only
+reads the header: the file is memory mapped, and each table is a
+LazyLookupTable decoded from the mapping when first used. Once restored,
+instances of the class (including those created by `quote` and
+`quote_many`) start from the snapshot instead of running set up.
+
+A snapshot records the framework's fingerprint, the source of its classes
+and set up methods, and the modification time and size of every file its
+tables were loaded from (see `LookupTable.from_csv`). If any of them has
+changed since, the snapshot is stale and is refused.
+"""
+
+import json
+import mmap
+import os
+import sys
+import tempfile
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .lookuptable import LazyLookupTable, LookupTable
+from .pricetest import PriceTest
+from .rate import Rate
+from sentinelpricing.utils.digest import new_hash
+
+_MAGIC = b"SPSN"
+_VERSION = 1
+_ALIGNMENT = 8
+
+# Scalars stored as they are in the JSON header.
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _fingerprint(framework: type) -> str:
+    """Return the digest of a framework's code and set up methods."""
+    digest = new_hash()
+    framework._hash_source(digest)
+    return digest.hexdigest()
+
+
+def _file_version(path: str) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _column(values: List[Any]) -> Tuple[str, bytes]:
+    """Encode a column of table values, as its kind and bytes."""
+    kinds = {type(v) for v in values}
+    if kinds == {float}:
+        return "d", array("d", values).tobytes()
+    if kinds == {int} and all(-(2**63) <= v < 2**63 for v in values):
+        return "q", array("q", values).tobytes()
+    if kinds.issubset(_SCALARS):
+        return "json", json.dumps(values).encode()
+    raise TypeError(f"Cannot snapshot table values of type {kinds}")
+
+
+class _Writer:
+    """Encodes a framework instance's state and tables."""
+
+    def __init__(self) -> None:
+        self.tables: List[Dict[str, Any]] = []
+        self.table_ids: Dict[int, int] = {}
+        self.sources: Dict[str, Optional[List[int]]] = {}
+        self.data = bytearray()
+
+    def _section(self, blob: bytes) -> List[int]:
+        self.data.extend(b"\0" * (-len(self.data) % _ALIGNMENT))
+        offset = len(self.data)
+        self.data.extend(blob)
+        return [offset, len(blob)]
+
+    def table(self, table: LookupTable) -> int:
+        number = self.table_ids.get(id(table))
+        if number is not None:
+            return number
+        index = table.index
+        fields = list(table.index_type._fields)
+        columns = []
+        for column in zip(*index):
+            kind, blob = _column(list(column))
+            columns.append([kind] + self._section(blob))
+        kind, blob = _column(list(table.rates))
+        source = table.source
+        if source is not None:
+            self.sources[source] = _file_version(source)
+        self.tables.append(
+            {
+                "name": table.name,
+                "fields": fields,
+                "columns": columns,
+                "rates": [kind] + self._section(blob),
+                "frozen": table.frozen,
+                "cache": "_locate" in vars(table),
+                "source": source,
+            }
+        )
+        number = self.table_ids[id(table)] = len(self.tables) - 1
+        return number
+
+    def node(self, value: Any, path: str) -> List[Any]:
+        """Encode a value as a JSON node."""
+        if isinstance(value, LookupTable):
+            return ["table", self.table(value)]
+        if isinstance(value, PriceTest):
+            if not isinstance(value.by, str):
+                raise TypeError(
+                    f"Cannot snapshot {path}: a PriceTest binning by a "
+                    "function."
+                )
+            return ["pricetest", value.by, self.node(value.ratetable, path)]
+        if type(value) is Rate:
+            return [
+                "rate",
+                self.node(value.name, path),
+                self.node(value.value, path),
+            ]
+        if type(value) in _SCALARS:
+            return ["value", value]
+        if type(value) in (list, tuple, set, frozenset):
+            return [
+                type(value).__name__,
+                [self.node(v, f"{path}[{i}]") for i, v in enumerate(value)],
+            ]
+        if type(value) is dict:
+            return [
+                "dict",
+                [
+                    [self.node(k, path), self.node(v, f"{path}[{k!r}]")]
+                    for k, v in value.items()
+                ],
+            ]
+        raise TypeError(
+            f"Cannot snapshot {path}: {type(value).__name__} is not a "
+            "LookupTable, PriceTest, Rate or plain value."
+        )
+
+
+def write_snapshot(instance: Any, path: Union[str, os.PathLike]) -> None:
+    """Write the state of a set up framework instance. See
+    `Framework.snapshot`."""
+    framework = type(instance)
+    writer = _Writer()
+    state = {
+        name: writer.node(value, name)
+        for name, value in sorted(vars(instance).items())
+    }
+    header = json.dumps(
+        {
+            "version": _VERSION,
+            "byteorder": sys.byteorder,
+            "framework": f"{framework.__module__}.{framework.__qualname__}",
+            "fingerprint": _fingerprint(framework),
+            "sources": writer.sources,
+            "tables": writer.tables,
+            "state": state,
+        }
+    ).encode()
+    start = len(_MAGIC) + 8 + len(header)
+    padding = b"\0" * (-start % _ALIGNMENT)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    # Write to a temporary file first, so readers never see half a file.
+    handle, temporary = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(handle, "wb") as file:
+            file.write(_MAGIC)
+            file.write(len(header).to_bytes(8, "little"))
+            file.write(header)
+            file.write(padding)
+            file.write(writer.data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+class Snapshot:
+    """
+    A framework snapshot, mapped into memory. See `Framework.from_snapshot`.
+
+    Attributes:
+        framework (type): The Framework subclass it restores.
+        path (str): The snapshot file.
+        tables (List[LazyLookupTable]): The snapshot's tables, loaded from
+            the mapping when first used and shared by every instance
+            restored.
+    """
+
+    def __init__(
+        self,
+        framework: type,
+        path: Union[str, os.PathLike],
+        check: bool = True,
+    ) -> None:
+        self.framework = framework
+        self.path = os.fspath(path)
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:4] != _MAGIC:
+            raise ValueError(f"{self.path} is not a framework snapshot.")
+        size = int.from_bytes(self._map[4:12], "little")
+        end = 12 + size
+        header = json.loads(self._map[12:end])
+        self._start = end + (-end % _ALIGNMENT)
+        if header["version"] != _VERSION:
+            raise ValueError(
+                f"{self.path} is a version {header['version']} snapshot; "
+                f"expected version {_VERSION}."
+            )
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{self.path} was written on another platform.")
+        name = f"{framework.__module__}.{framework.__qualname__}"
+        if header["framework"] != name:
+            raise ValueError(
+                f"{self.path} is a snapshot of {header['framework']}, "
+                f"not {name}."
+            )
+        if check:
+            self._check(header)
+        self._header = header
+        self.tables = [
+            LazyLookupTable(
+                lambda number=number: self._load(number), table["name"]
+            )
+            for number, table in enumerate(header["tables"])
+        ]
+
+    def __repr__(self) -> str:
+        return f"Snapshot({self.framework.__name__}, {self.path!r})"
+
+    def _check(self, header: Dict[str, Any]) -> None:
+        if header["fingerprint"] != _fingerprint(self.framework):
+            raise ValueError(
+                f"{self.path} is stale: the code of "
+                f"{self.framework.__name__} has changed since."
+            )
+        for source, version in header["sources"].items():
+            if _file_version(source) != version:
+                raise ValueError(
+                    f"{self.path} is stale: {source} has changed since."
+                )
+
+    def _values(self, kind: str, offset: int, length: int) -> List[Any]:
+        start = self._start + offset
+        end = start + length
+        blob = self._map[start:end]
+        if kind == "json":
+            return json.loads(blob)
+        values = array(kind)
+        values.frombytes(blob)
+        return values.tolist()
+
+    def _load(self, number: int) -> LookupTable:
+        spec = self._header["tables"][number]
+        table = LookupTable.__new__(LookupTable)
+        Index = namedtuple("Index", spec["fields"])  # type: ignore
+        columns = [self._values(*column) for column in spec["columns"]]
+        index = list(map(Index, *columns))
+        rates = self._values(*spec["rates"])
+        table.dimension = (
+            (0, "One-Dimensional")
+            if len(spec["fields"]) == 1
+            else (1, "Multi-Dimensional")
+        )
+        table.index_type = Index
+        table.index, table.rates = index, rates
+        table.name = spec["name"]
+        if spec["source"] is not None:
+            table.source = spec["source"]
+        if spec["frozen"]:
+            table.freeze()
+        if spec["cache"]:
+            table._locate = lru_cache(table._locate)  # type: ignore
+        return table
+
+    def _node(self, node: List[Any]) -> Any:
+        kind = node[0]
+        if kind == "value":
+            return node[1]
+        if kind == "table":
+            return self.tables[node[1]]
+        if kind == "pricetest":
+            return PriceTest(node[1], self._node(node[2]))
+        if kind == "rate":
+            return Rate(self._node(node[1]), self._node(node[2]))
+        if kind == "dict":
+            return {self._node(k): self._node(v) for k, v in node[1]}
+        items = [self._node(item) for item in node[1]]
+        return {"list": list, "tuple": tuple, "set": set}.get(kind, frozenset)(
+            items
+        )
+
+    def restore(self, instance: Any) -> None:
+        """
+        Set the snapshot's state on a framework instance. Tables are shared
+        with other restored instances; everything else is new.
+
+        Args:
+            instance (Framework): An instance that has not been set up.
+        """
+        for name, node in self._header["state"].items():
+            setattr(instance, name, self._node(node))
@@ -0,0 +1,137 @@
+"""Table Cache
+
+A process-wide cache of lookup tables built from files.
+
+Set up methods are chained, so constructing `MotorV2(MotorV1)` runs
+MotorV1's set up first and loads every one of its tables, even those V2
+replaces straight away; keeping a dozen versions warm loads the same files
+a dozen times. `LookupTable.from_csv` instead goes through a TableCache,
+keyed on the file (its resolved path plus modification time and size, or
+its content hash) and the build options. Each distinct table is built once
+and frozen, and the same object is handed to every framework and version
+that asks for it.
+
+A table is rebuilt once its file changes on disk, and the stale copy is
+dropped.
+"""
+
+import hashlib
+import os
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Tuple, TypeVar
+
+from sentinelpricing.utils.fingerprint import fingerprint
+
+T = TypeVar("T")
+
+
+class TableCache:
+    """
+    Tables built from files, shared across frameworks.
+
+    Attributes:
+        check (str): How a file is recognised as unchanged: "mtime" (its
+            modification time and size, the default) or "hash" (a hash of
+            its contents, for file systems with coarse timestamps).
+        hits (int): Requests answered from the cache.
+        misses (int): Requests that built a table.
+    """
+
+    def __init__(self, check: str = "mtime") -> None:
+        if check not in ("mtime", "hash"):
+            raise ValueError(f"Expected 'mtime' or 'hash', got {check!r}")
+        self.check = check
+        self.hits = 0
+        self.misses = 0
+        self._tables: Dict[Hashable, Any] = {}
+        # The current version of each file, to drop stale tables.
+        self._versions: Dict[str, Hashable] = {}
+        self._building: Dict[Hashable, Lock] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def __repr__(self) -> str:
+        return (
+            f"TableCache(size={len(self)}, hits={self.hits}, "
+            f"misses={self.misses})"
+        )
+
+    def key(self, path: str, **options: Any) -> Tuple[str, Tuple]:
+        """
+        Return the resolved path and cache key of a file and build options:
+        the path, the version of the file and the options.
+
+        Args:
+            path (str): The file.
+            **options: Everything else the table built depends on.
+        """
+        path = os.path.realpath(path)
+        if self.check == "hash":
+            digest = hashlib.blake2b()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            version: Hashable = digest.digest()
+        else:
+            stat = os.stat(path)
+            version = (stat.st_mtime_ns, stat.st_size)
+        try:
+            settings: Hashable = tuple(sorted(options.items()))
+            hash(settings)
+        except TypeError:
+            settings = fingerprint(options)
+        return path, (path, version, settings)
+
+    def get(self, path: str, build: Callable[[], T], **options: Any) -> T:
+        """
+        Return the table built from a file, building it if needed.
+
+        Concurrent requests for the same table wait for a single build.
+
+        Args:
+            path (str): The file the table is built from.
+            build (Callable): Builds the table. Tables with a `freeze`
+                method are frozen before being shared.
+            **options: The build options, part of the key.
+        """
+        path, key = self.key(path, **options)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self.hits += 1
+                return table
+            lock = self._building.setdefault(key, Lock())
+
+        with lock:
+            with self._lock:
+                table = self._tables.get(key)
+            if table is not None:
+                with self._lock:
+                    self.hits += 1
+                return table
+            table = build()
+            freeze = getattr(table, "freeze", None)
+            if freeze is not None:
+                freeze()
+            with self._lock:
+                if self._versions.get(path, key[1]) != key[1]:
+                    for stale in [k for k in self._tables if k[0] == path]:
+                        del self._tables[stale]
+                self._versions[path] = key[1]
+                self._tables[key] = table
+                self._building.pop(key, None)
+                self.misses += 1
+        return table
+
+    def clear(self) -> None:
+        """Drop every table and reset the statistics."""
+        with self._lock:
+            self._tables.clear()
+            self._versions.clear()
+            self.hits = self.misses = 0
+
+
+# The cache used by LookupTable.from_csv unless told otherwise.
+default_cache = TableCache()
@@ -9,14 +9,40 @@ to create the quote, the other to hold the calculations/history.
 
 from typing import (
     Any,
+    Callable,
+    Collection,
     List,
     Dict,
+    Hashable,
+    Iterator,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
     Union,
     Iterable,
 )
 
 from .testcase import TestCase
 from sentinelpricing.utils.calculations import dict_difference, percentage
+from sentinelpricing.utils.digest import digest_rows
+from sentinelpricing.utils.fingerprint import fingerprint
+from sentinelpricing.utils.readers import (
+    chunked,
+    read_csv,
+    read_jsonl,
+    read_xml,
+)
+from sentinelpricing.utils.indexing import (
+    IndexCache,
+    VersionedList,
+    group_items,
+    has_callable,
+    key_getter,
+    normalise_by,
+    read_only_groups,
+)
 
 
 class TestSuite:
@@ -40,9 +66,18 @@ class TestSuite:
     Note: the uninstantiated framework is passed. Sentinel handles
     instantiating the framework automatically.
 
+    Files too large to hold in memory can be read in chunks instead, and
+    each chunk quoted as it arrives:
+
+        >>> for chunk in TestSuite.iter_csv("path/to/file.csv"):
+        ...     accumulator.consume(motor_r22.quote_iter(chunk))
+
     When using the 'quote' method in the TestSuite, the response is a
     QuoteSet. The QuoteSet contains all details relating to price, and
     a copy of the quote data used to generate the quote.
+
+    Groupings used by `mix` are cached per `by` spec and dropped whenever
+    the `testcases` list is modified.
     """
 
     def __init__(self, tests: Iterable[Union[TestCase, Dict]]):
@@ -50,13 +85,173 @@ class TestSuite:
         # dicts is confusing. Especially so, given we can easily convert a list
         # to a dict using the index as a key.
 
-        if all(not isinstance(t, (dict, TestCase)) for t in tests):
+        tests = list(tests)
+        if tests and all(not isinstance(t, (dict, TestCase)) for t in tests):
             raise TypeError("Expected dict or TestCase")
 
-        self.testcases: List[TestCase] = list(
-            map(lambda x: TestCase(x) if isinstance(x, dict) else x, tests)
+        self.testcases = map(
+            lambda x: TestCase(x) if isinstance(x, dict) else x, tests
         )
 
+    @classmethod
+    def _of(cls, testcases: Iterable[TestCase]) -> "TestSuite":
+        """Create a suite from TestCases, skipping the checks in __init__."""
+        suite = cls.__new__(cls)
+        suite.testcases = testcases
+        return suite
+
+    @staticmethod
+    def _testcases(
+        records: Iterable[Dict], id_column: Optional[str]
+    ) -> Iterator[TestCase]:
+        if id_column is None:
+            return map(TestCase, records)
+        return (TestCase(r, r[id_column]) for r in records)
+
+    @classmethod
+    def from_records(
+        cls, records: Iterable[Dict], id_column: Optional[str] = None
+    ) -> "TestSuite":
+        """From Records
+
+        Builds a TestSuite from an iterable of dictionaries, such as
+        `DataFrame.to_dict("records")` or one of the readers in
+        `sentinelpricing.utils.readers`. Each record is wrapped in a
+        TestCase as it is read, without an intermediate list of dicts.
+
+        If `id_column` is given, its value is used as the identifier of
+        each TestCase (the column is kept in the data).
+        """
+        return cls._of(cls._testcases(records, id_column))
+
+    @classmethod
+    def iter_records(
+        cls,
+        records: Iterable[Dict],
+        chunk_size: int = 10_000,
+        id_column: Optional[str] = None,
+    ) -> Iterator["TestSuite"]:
+        """Iter Records
+
+        Yields TestSuites of at most `chunk_size` testcases from an
+        iterable of dictionaries, so only one chunk is in memory at a time.
+        """
+        for chunk in chunked(cls._testcases(records, id_column), chunk_size):
+            yield cls._of(chunk)
+
+    @classmethod
+    def from_csv(
+        cls,
+        path: str,
+        types: Optional[Mapping[str, Any]] = None,
+        id_column: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "TestSuite":
+        """From CSV
+
+        Loads a CSV file with a header row. `types` maps column names to
+        converters (a callable, or "str", "int", "float" or "bool"), which
+        are applied to every value in the column; other columns are left as
+        strings. Further keyword arguments are passed to `csv.reader`.
+
+            >>> TestSuite.from_csv("tests.csv", types={"age": int})
+        """
+        return cls.from_records(read_csv(path, types, **kwargs), id_column)
+
+    @classmethod
+    def iter_csv(
+        cls,
+        path: str,
+        chunk_size: int = 10_000,
+        types: Optional[Mapping[str, Any]] = None,
+        id_column: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Iterator["TestSuite"]:
+        """Iter CSV
+
+        Streams a CSV file as TestSuites of at most `chunk_size`
+        testcases, see `from_csv`.
+        """
+        return cls.iter_records(
+            read_csv(path, types, **kwargs), chunk_size, id_column
+        )
+
+    @classmethod
+    def from_jsonl(
+        cls,
+        path: str,
+        types: Optional[Mapping[str, Any]] = None,
+        id_column: Optional[str] = None,
+        encoding: str = "utf-8",
+    ) -> "TestSuite":
+        """From JSON Lines
+
+        Loads a file holding one JSON object per line. `types` converts
+        the given fields, as for `from_csv`.
+        """
+        return cls.from_records(read_jsonl(path, types, encoding), id_column)
+
+    @classmethod
+    def iter_jsonl(
+        cls,
+        path: str,
+        chunk_size: int = 10_000,
+        types: Optional[Mapping[str, Any]] = None,
+        id_column: Optional[str] = None,
+        encoding: str = "utf-8",
+    ) -> Iterator["TestSuite"]:
+        """Iter JSON Lines
+
+        Streams a JSON Lines file as TestSuites of at most `chunk_size`
+        testcases, see `from_jsonl`.
+        """
+        return cls.iter_records(
+            read_jsonl(path, types, encoding), chunk_size, id_column
+        )
+
+    @classmethod
+    def from_xml(
+        cls,
+        path: str,
+        record_tag: str = "testcase",
+        types: Optional[Mapping[str, Any]] = None,
+        id_column: Optional[str] = None,
+    ) -> "TestSuite":
+        """From XML
+
+        Loads every `record_tag` element of an XML file, using its
+        attributes and the text of its child elements as the testcase data.
+        The file is parsed incrementally, see `utils.readers.read_xml`.
+        """
+        return cls.from_records(read_xml(path, record_tag, types), id_column)
+
+    @classmethod
+    def iter_xml(
+        cls,
+        path: str,
+        chunk_size: int = 10_000,
+        record_tag: str = "testcase",
+        types: Optional[Mapping[str, Any]] = None,
+        id_column: Optional[str] = None,
+    ) -> Iterator["TestSuite"]:
+        """Iter XML
+
+        Streams an XML file as TestSuites of at most `chunk_size`
+        testcases, see `from_xml`.
+        """
+        return cls.iter_records(
+            read_xml(path, record_tag, types), chunk_size, id_column
+        )
+
+    @property
+    def testcases(self) -> List[TestCase]:
+        return self._testcases
+
+    @testcases.setter
+    def testcases(self, testcases: Iterable[TestCase]) -> None:
+        self._testcases = VersionedList(testcases)
+        self._indexes = IndexCache(self._testcases)
+
     def __iter__(self) -> Iterable[TestCase]:
         return iter(self.testcases)
 
@@ -91,60 +286,122 @@ class TestSuite:
         Returns:
             TestSuite: A new TestSuite containing testcases from A minus B.
         """
+        return self.subtract(other)
 
-        if not isinstance(other, TestSuite):
-            raise ValueError(f"Expected TestSuite, got {other.__name__}")
+    def __and__(self, other: "TestSuite") -> "TestSuite":
+        return self.intersection(other)
 
-        other_ids = {t.identifier for t in other.testcases}
-
-        return TestSuite(
-            list(
-                filter(
-                    lambda t: getattr(t, "identifier", True) in other_ids,
-                    self.testcases,
-                )
-            )
-        )
+    def __or__(self, other: "TestSuite") -> "TestSuite":
+        return self.union(other)
 
     def __contains__(self, other) -> bool:
         if isinstance(other, TestCase):
-            # Should this be comparing quotedata or identifier?
-            return any(other.data == t.data for t in self.testcases)
+            return fingerprint(other.data) in self._fingerprint_index()
         if isinstance(other, dict):
-            return any(other == t.data for t in self.testcases)
+            return fingerprint(other) in self._fingerprint_index()
         return NotImplemented
 
-    def _groupby(self, by=None) -> Dict[Any, List]:
-        if isinstance(by, Iterable):
-            _by = tuple(by)
-        else:
-            _by = by
+    def _identifier_index(self) -> Dict[Any, TestCase]:
+        def build():
+            index: Dict[Any, TestCase] = {}
+            for t in self.testcases:
+                index.setdefault(t.identifier, t)
+            return index
+
+        return self._indexes.get("identifier", build)
+
+    def _fingerprint_index(self) -> Set[Hashable]:
+        return self._indexes.get(
+            "fingerprint",
+            lambda: {fingerprint(t.data) for t in self.testcases},
+        )
+
+    def digest(self) -> Optional[str]:
+        """Digest
+
+        Returns a hex digest of the quote data of every test case, in
+        order, that is stable across processes, or None if some data has
+        no stable repr (see `digest_rows`). Identifiers are not included.
+        Cached until the suite is modified.
+        """
+        return self._indexes.get(
+            "digest", lambda: digest_rows(t.data for t in self.testcases)
+        )
+
+    def _membership(
+        self, on: str
+    ) -> Tuple[Collection[Hashable], Callable[[TestCase], Hashable]]:
+        if on == "identifier":
+            return self._identifier_index(), lambda t: t.identifier
+        if on == "data":
+            return self._fingerprint_index(), lambda t: fingerprint(t.data)
+        raise ValueError(f"Expected 'identifier' or 'data', got {on!r}")
+
+    def _check_other(self, other: Any) -> None:
+        if not isinstance(other, TestSuite):
+            raise ValueError(f"Expected TestSuite, got {type(other).__name__}")
+
+    def intersection(
+        self, other: "TestSuite", on: str = "identifier"
+    ) -> "TestSuite":
+        """Intersection
+
+        Returns the testcases in this suite that are also in `other`,
+        compared by "identifier" or by "data".
+        """
+        self._check_other(other)
+        index, key = other._membership(on)
+        return TestSuite([t for t in self.testcases if key(t) in index])
+
+    def subtract(
+        self, other: "TestSuite", on: str = "identifier"
+    ) -> "TestSuite":
+        """Subtract
+
+        Returns the testcases in this suite that are not in `other`,
+        compared by "identifier" or by "data".
+        """
+        self._check_other(other)
+        index, key = other._membership(on)
+        return TestSuite([t for t in self.testcases if key(t) not in index])
+
+    def union(self, other: "TestSuite", on: str = "identifier") -> "TestSuite":
+        """Union
+
+        Returns the testcases in this suite followed by those only in
+        `other`, compared by "identifier" or by "data".
+        """
+        self._check_other(other)
+        index, key = self._membership(on)
+        return TestSuite(
+            self.testcases
+            + [t for t in other.testcases if key(t) not in index]
+        )
 
-        # TODO: Find out if this is worth replacing with
-        # itertools.groupby
-        _prelim: Dict[Any, List[Any]] = {}
-        for t in self.testcases:
-            key = t[_by]
-            if key not in _prelim:
-                _prelim[key] = []
-            _prelim[key].append(t)
+    def _groupby(self, by=None) -> Mapping[Any, Sequence]:
+        spec = normalise_by(by)
+        if has_callable(spec):
+            return group_items(self.testcases, key_getter(spec))
+        return self._indexes.get(
+            ("groupby", spec),
+            lambda: read_only_groups(
+                group_items(self.testcases, key_getter(spec))
+            ),
+        )
 
-        return _prelim
+    def _counts(self, by=None) -> Dict[Any, int]:
+        return {k: len(v) for k, v in self._groupby(by=by).items()}
 
     def mix(self, by=None, percent=False, sorted=True, **kwargs):
         """Mix
 
         Returns the mix for a given factor in a set of test cases.
         """
-        grouped = self._groupby(by=by)
-        print(grouped)
+        mix = self._counts(by=by)
         if percent:
             mix = {
-                k: percentage(len(v), len(self), **kwargs)
-                for k, v in grouped.items()
+                k: percentage(v, len(self), **kwargs) for k, v in mix.items()
             }
-        else:
-            mix = {k: len(v) for k, v in grouped.items()}
 
         if sorted:
             keys = list(mix.keys())
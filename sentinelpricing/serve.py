@@ -0,0 +1,584 @@
+"""Serve
+
+A local HTTP rating service, built on the standard library only.
+
+A RatingService keeps frameworks set up and rates quote data posted as
+JSON, returning each quote's final price and breakdown:
+
+    >>> service = RatingService({"motor": Motor, "travel": travel_router})
+    >>> service.run(port=8000)
+
+    $ curl -d '{"age": 34, "region": "N"}' localhost:8000/quote/motor
+    {"identifier": "...", "framework": "Motor", "final_price": 412.5,
+     "breakdown": [{"name": "Base", "operation": "add", ...}, ...]}
+
+A request body is a single object of quote data, answered with a quote,
+or a list of them, answered with {"quotes": [...]}. With one framework,
+`/quote` rates with it. `GET /health` lists the frameworks served.
+
+Concurrent requests are micro-batched: the first request for a framework
+waits up to `window` seconds for others to arrive, and all of them are
+rated with a single `Framework.quote_many` call, on a worker thread so
+the service keeps accepting requests meanwhile. Under load, requests that
+arrive while a batch is rated form the next batch.
+
+Frameworks may be given as Framework subclasses (set up once, when the
+service starts), FrameworkRouters or LiveFrameworks.
+
+The module also bundles a load generator, `load_test`, reporting latency
+percentiles and throughput. Both are available from the command line:
+
+    $ python -m sentinelpricing.serve run mymodels.motor:Motor --port 8000
+    $ python -m sentinelpricing.serve load --port 8000 --path /quote/Motor \\
+    ...     --payload quote.json --requests 20000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from sentinelpricing.models.note import Note
+from sentinelpricing.models.quote import Quote
+from sentinelpricing.models.rate import Rate
+
+# The most bytes accepted in a request body.
+MAX_BODY = 64 << 20
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, Rate):
+        value = value.value
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def quote_json(quote: Any) -> Dict[str, Any]:
+    """
+    Return a JSON-serialisable description of a calculated quote: its
+    identifier, framework, final price and breakdown.
+
+    Args:
+        quote: A Quote, or whatever else `calculation` returned.
+    """
+    if not isinstance(quote, Quote):
+        return {"result": _jsonable(quote)}
+    steps = []
+    for step in quote.breakdown:
+        if isinstance(step, Note):
+            steps.append({"note": step.text})
+            continue
+        operation = step.oper
+        if operation is not None:
+            operation = getattr(operation, "__name__", str(operation))
+        steps.append(
+            {
+                "name": _jsonable(step.name),
+                "operation": operation,
+                "other": _jsonable(step.other),
+                "result": _jsonable(step.result),
+            }
+        )
+    framework = quote.framework
+    return {
+        "identifier": str(quote.identifier),
+        "framework": getattr(framework, "__name__", str(framework)),
+        "final_price": _jsonable(quote.final_price),
+        "breakdown": steps,
+    }
+
+
+class _Target:
+    """A framework served, with its queue of requests to batch."""
+
+    def __init__(self, name: str, framework: Any) -> None:
+        self.name = name
+        self.framework = framework
+        if isinstance(framework, type):
+            instance = framework()
+
+            def quote_many(tests: List[Any]) -> Any:
+                return framework.quote_many(tests, instance=instance)
+
+            self.quote_many: Callable[[List[Any]], Any] = quote_many
+        else:
+            warm = getattr(framework, "warm", None)
+            if warm is not None:
+                warm()
+            self.quote_many = framework.quote_many
+        # One worker per framework, so its batches never run concurrently.
+        self.executor = ThreadPoolExecutor(1, f"serve-{name}")
+        self.queue: Optional["asyncio.Queue[Tuple[Any, asyncio.Future]]"]
+        self.queue = None
+
+    def rate(self, tests: List[Any]) -> List[Tuple[bool, Any]]:
+        """Rate a batch, isolating the tests that fail. Runs on the
+        worker."""
+        try:
+            return [(True, quote_json(q)) for q in self.quote_many(tests)]
+        except Exception:
+            if len(tests) == 1:
+                raise
+        results: List[Tuple[bool, Any]] = []
+        for test in tests:
+            try:
+                results.append((True, quote_json(self.quote_many([test])[0])))
+            except Exception as error:
+                results.append((False, error))
+        return results
+
+
+class RatingService:
+    """
+    Rates quote data posted over HTTP, batching concurrent requests.
+
+    Attributes:
+        window (float): Seconds a request waits for others to batch with.
+        max_batch (int): The most tests rated in one batch.
+        batches (int): Batches rated.
+        rated (int): Tests rated.
+        port (int, optional): The port listened on, once started.
+    """
+
+    def __init__(
+        self,
+        frameworks: Union[Any, Mapping[str, Any]],
+        window: float = 0.002,
+        max_batch: int = 1024,
+    ) -> None:
+        """
+        Initialize a new RatingService, setting up its frameworks.
+
+        Args:
+            frameworks: The frameworks served by name, or a single
+                framework, served under its class name. Each is a Framework
+                subclass, a FrameworkRouter or a LiveFramework.
+            window (float): See above. Defaults to 2 milliseconds.
+            max_batch (int): See above. Defaults to 1024.
+        """
+        if not isinstance(frameworks, Mapping):
+            name = getattr(frameworks, "__name__", type(frameworks).__name__)
+            frameworks = {name: frameworks}
+        self.targets = {
+            name: _Target(name, framework)
+            for name, framework in frameworks.items()
+        }
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.rated = 0
+        self.port: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._batchers: List["asyncio.Task[None]"] = []
+
+    def __repr__(self) -> str:
+        return f"RatingService({list(self.targets)}, port={self.port})"
+
+    async def rate(self, name: str, data: Any) -> Any:
+        """
+        Rate quote data with a framework, batched with other requests.
+
+        Args:
+            name (str): The framework's name.
+            data: The quote data.
+
+        Returns:
+            Dict: The quote, see `quote_json`.
+        """
+        target = self.targets[name]
+        if target.queue is None:
+            target.queue = asyncio.Queue()
+            self._batchers.append(asyncio.ensure_future(self._batcher(target)))
+        future = asyncio.get_running_loop().create_future()
+        await target.queue.put((data, future))
+        return await future
+
+    async def _batcher(self, target: _Target) -> None:
+        assert target.queue is not None
+        queue = target.queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            if self.window > 0 and queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.window)
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            tests = [data for data, _ in batch]
+            try:
+                results = await loop.run_in_executor(
+                    target.executor, target.rate, tests
+                )
+            except Exception as error:
+                results = [(False, error)] * len(batch)
+            if len(results) != len(batch):
+                # Fail the requests left without a result, not hang them.
+                missing = RuntimeError(
+                    f"Rating returned {len(results)} results for "
+                    f"{len(batch)} requests."
+                )
+                results = list(results)[: len(batch)]
+                results += [(False, missing)] * (len(batch) - len(results))
+            self.batches += 1
+            self.rated += len(batch)
+            for (_, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    async def _dispatch(
+        self, method: str, path: str, body: bytes
+    ) -> Tuple[int, Any]:
+        path = path.split("?", 1)[0].rstrip("/")
+        if path == "/health":
+            if method != "GET":
+                return 405, {"error": "Use GET."}
+            return 200, {
+                "status": "ok",
+                "frameworks": list(self.targets),
+                "batches": self.batches,
+                "rated": self.rated,
+            }
+        if path == "/quote" and len(self.targets) == 1:
+            name = next(iter(self.targets))
+        elif path.startswith("/quote/"):
+            name = path.split("/", 2)[2]
+        else:
+            return 404, {"error": f"Unknown path {path!r}."}
+        if name not in self.targets:
+            return 404, {"error": f"Unknown framework {name!r}."}
+        if method != "POST":
+            return 405, {"error": "Use POST."}
+        try:
+            data = json.loads(body)
+        except ValueError as error:
+            return 400, {"error": f"Invalid JSON: {error}"}
+
+        if isinstance(data, dict):
+            try:
+                return 200, await self.rate(name, data)
+            except Exception as error:
+                return 422, {"error": f"{type(error).__name__}: {error}"}
+        if not isinstance(data, list) or not all(
+            isinstance(item, dict) for item in data
+        ):
+            return 400, {"error": "Expected an object or a list of them."}
+        results = await asyncio.gather(
+            *(self.rate(name, item) for item in data), return_exceptions=True
+        )
+        return 200, {
+            "quotes": [
+                (
+                    {"error": f"{type(r).__name__}: {r}"}
+                    if isinstance(r, Exception)
+                    else r
+                )
+                for r in results
+            ]
+        }
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, path, version = line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Bad request."})
+                    break
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = header.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(
+                        writer, 400, {"error": "Bad Content-Length."}
+                    )
+                    break
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "Too large."})
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self._dispatch(method, path, body)
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: Any,
+        keep_alive: bool = False,
+    ) -> None:
+        body = json.dumps(payload).encode()
+        head = (
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        """
+        Start listening. Port 0 picks a free port, set as `port`.
+
+        Args:
+            host (str): The address to listen on. Defaults to localhost.
+            port (int): The port to listen on.
+        """
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        """Stop listening and stop the batchers."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for batcher in self._batchers:
+            batcher.cancel()
+        self._batchers = []
+        for target in self.targets.values():
+            target.queue = None
+
+    def run(self, host: str = "127.0.0.1", port: int = 8000) -> None:
+        """Serve until interrupted."""
+
+        async def serve() -> None:
+            await self.start(host, port)
+            print(f"Serving {list(self.targets)} on http://{host}:{self.port}")
+            assert self._server is not None
+            try:
+                await self._server.serve_forever()
+            finally:
+                await self.close()
+
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+
+
+class LoadReport:
+    """
+    The results of a `load_test`.
+
+    Attributes:
+        requests (int): Requests answered.
+        errors (int): Requests answered with an error status.
+        seconds (float): The duration of the test.
+        throughput (float): Requests answered per second.
+        p50, p99, max (float): Latency percentiles, in milliseconds.
+    """
+
+    def __init__(
+        self, latencies: List[float], errors: int, seconds: float
+    ) -> None:
+        latencies = sorted(latencies)
+        self.requests = len(latencies)
+        self.errors = errors
+        self.seconds = seconds
+        self.throughput = self.requests / seconds if seconds else 0.0
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            rank = max(math.ceil(p / 100 * len(latencies)) - 1, 0)
+            return latencies[rank] * 1000
+
+        self.p50 = percentile(50)
+        self.p99 = percentile(99)
+        self.max = percentile(100)
+
+    def __repr__(self) -> str:
+        return (
+            f"LoadReport(requests={self.requests}, errors={self.errors}, "
+            f"throughput={self.throughput:.0f}/s, p50={self.p50:.2f}ms, "
+            f"p99={self.p99:.2f}ms)"
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.requests} requests in {self.seconds:.2f}s "
+            f"({self.errors} errors)\n"
+            f"Throughput: {self.throughput:.0f} requests/s\n"
+            f"Latency: p50 {self.p50:.2f}ms, p99 {self.p99:.2f}ms, "
+            f"max {self.max:.2f}ms"
+        )
+
+
+async def load_test(
+    payloads: Sequence[Any],
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    path: str = "/quote",
+    requests: int = 1000,
+    concurrency: int = 32,
+) -> LoadReport:
+    """
+    Post quote data to a rating service as fast as it answers, from
+    `concurrency` clients each keeping a connection open.
+
+    Args:
+        payloads (Sequence[Any]): Request bodies, sent in turn.
+        host (str): The service's address. Defaults to localhost.
+        port (int): The service's port.
+        path (str): The path posted to, e.g. "/quote/motor".
+        requests (int): The number of requests to send.
+        concurrency (int): The number of clients.
+
+    Returns:
+        LoadReport: Latency percentiles and throughput.
+    """
+    bodies = [json.dumps(payload).encode() for payload in payloads]
+    latencies: List[float] = []
+    errors = 0
+    sent = 0
+
+    async def client() -> None:
+        nonlocal errors, sent
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while sent < requests:
+                body = bodies[sent % len(bodies)]
+                sent += 1
+                start = time.perf_counter()
+                writer.write(
+                    (
+                        f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(body)}\r\n\r\n"
+                    ).encode("latin-1")
+                    + body
+                )
+                await writer.drain()
+                status = int((await reader.readline()).split()[1])
+                length = 0
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b""):
+                        break
+                    key, _, value = header.decode("latin-1").partition(":")
+                    if key.lower() == "content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                latencies.append(time.perf_counter() - start)
+                if status >= 400:
+                    errors += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return LoadReport(latencies, errors, time.perf_counter() - start)
+
+
+def _import(spec: str) -> Any:
+    module, _, name = spec.partition(":")
+    value: Any = importlib.import_module(module)
+    for part in name.split("."):
+        value = getattr(value, part)
+    return value
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Command line entry point: `run` a service or `load` test one."""
+    parser = argparse.ArgumentParser(prog="python -m sentinelpricing.serve")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Serve frameworks over HTTP.")
+    run.add_argument(
+        "frameworks",
+        nargs="+",
+        help="module:Framework, or name=module:Framework to serve it as "
+        "/quote/name.",
+    )
+    run.add_argument("--host", default="127.0.0.1")
+    run.add_argument("--port", type=int, default=8000)
+    run.add_argument("--window", type=float, default=0.002)
+    run.add_argument("--max-batch", type=int, default=1024)
+    load = commands.add_parser("load", help="Load test a running service.")
+    load.add_argument("--host", default="127.0.0.1")
+    load.add_argument("--port", type=int, default=8000)
+    load.add_argument("--path", default="/quote")
+    load.add_argument(
+        "--payload",
+        required=True,
+        help="A JSON file of quote data, or a list of quote data sent in "
+        "turn.",
+    )
+    load.add_argument("--requests", type=int, default=10000)
+    load.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        frameworks = {}
+        for spec in args.frameworks:
+            name, _, target = spec.rpartition("=")
+            framework = _import(target)
+            frameworks[name or target.rpartition(":")[2]] = framework
+        RatingService(frameworks, args.window, args.max_batch).run(
+            args.host, args.port
+        )
+        return
+
+    with open(args.payload) as file:
+        payloads = json.load(file)
+    if not isinstance(payloads, list):
+        payloads = [payloads]
+    report = asyncio.run(
+        load_test(
+            payloads,
+            args.host,
+            args.port,
+            args.path,
+            args.requests,
+            args.concurrency,
+        )
+    )
+    print(report)
+    sys.exit(1 if report.errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Binning
+
+Banding of numeric factors (age, vehicle value, etc.) for grouped reports.
+
+A Bins object describes how to band a value, and is compiled once into a
+plain function that maps a value to the lower edge of its band. Explicit
+and quantile based edges are applied with `bisect`, fixed widths with
+simple arithmetic, so no user code runs per quote.
+"""
+
+from bisect import bisect_right
+from math import floor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from .indexing import key_getter
+
+
+class Bins:
+    """
+    Description of how to band a numeric value.
+
+    Exactly one of `edges`, `width` or `quantiles` must be given. Each value
+    is labelled with the lower edge of the band it falls in. As with
+    LookupTable bands, values below the first edge are placed in the first
+    band.
+
+    Example:
+        >>> qs.avg(by="age", bins=Bins(edges=[17, 21, 25, 30, 40, 60]))
+        >>> qs.avg(by="age", bins=Bins(width=10))
+        >>> qs.mix(by="vehicle_value", bins=Bins(quantiles=5))
+    """
+
+    def __init__(
+        self,
+        edges: Optional[Iterable[float]] = None,
+        width: Optional[float] = None,
+        quantiles: Optional[int] = None,
+        origin: float = 0,
+    ) -> None:
+        """
+        Initialise a Bins description.
+
+        Args:
+            edges (Iterable[float], optional): Explicit lower edges of each
+                band.
+            width (float, optional): Width of equally sized bands, starting
+                from `origin`.
+            quantiles (int, optional): Number of (approximately) equally
+                populated bands, with edges taken from the data.
+            origin (float): Starting point of the bands when using `width`.
+
+        Raises:
+            ValueError: If not exactly one of edges, width or quantiles is
+                given, or the given value is invalid.
+        """
+        given = [x is not None for x in (edges, width, quantiles)]
+        if sum(given) != 1:
+            raise ValueError(
+                "Exactly one of edges, width or quantiles must be given."
+            )
+
+        self.edges = tuple(sorted(set(edges))) if edges is not None else None
+        self.width = width
+        self.quantiles = quantiles
+        self.origin = origin
+
+        if self.edges is not None and not self.edges:
+            raise ValueError("At least one edge is required.")
+        if width is not None and width <= 0:
+            raise ValueError("Width must be positive.")
+        if quantiles is not None and quantiles < 1:
+            raise ValueError("At least one quantile is required.")
+
+    def _spec(self) -> tuple:
+        return (self.edges, self.width, self.quantiles, self.origin)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Bins):
+            return self._spec() == other._spec()
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._spec())
+
+    def __repr__(self) -> str:
+        if self.edges is not None:
+            return f"Bins(edges={list(self.edges)})"
+        if self.width is not None:
+            return f"Bins(width={self.width}, origin={self.origin})"
+        return f"Bins(quantiles={self.quantiles})"
+
+    @property
+    def data_dependent(self) -> bool:
+        """Whether the bands depend on the values being binned."""
+        return self.quantiles is not None
+
+    def compile(
+        self, values: Optional[Iterable[Any]] = None
+    ) -> Callable[[Any], Any]:
+        """
+        Build a function mapping a value to the lower edge of its band.
+
+        Args:
+            values (Iterable, optional): The values being binned. Required
+                for quantile bins.
+
+        Returns:
+            Callable: The banding function.
+        """
+        if self.width is not None:
+            width, origin = self.width, self.origin
+            return lambda x: floor((x - origin) / width) * width + origin
+
+        if self.edges is not None:
+            return _edge_function(self.edges)
+
+        if values is None:
+            raise ValueError("Quantile bins need the values to bin.")
+        values = sorted(values)
+        if not values:
+            return lambda x: x
+        n = len(values)
+        edges = {
+            values[i * n // self.quantiles] for i in range(self.quantiles)
+        }
+        return _edge_function(sorted(edges))
+
+
+def _edge_function(edges: Sequence[Any]) -> Callable[[Any], Any]:
+    edges = tuple(edges)
+    first = edges[0]
+
+    def band(x: Any) -> Any:
+        idx = bisect_right(edges, x)
+        return edges[idx - 1] if idx else first
+
+    return band
+
+
+def as_bins(bins: Any) -> Hashable:
+    """
+    Convert a `bins` argument into a Bins object (or callable).
+
+    Args:
+        bins: A Bins instance, a sequence of edges, a band width or a
+            callable applied to each value.
+
+    Returns:
+        Hashable: A Bins instance, or the callable unchanged.
+    """
+    if isinstance(bins, Bins) or callable(bins):
+        return bins
+    if isinstance(bins, (int, float)):
+        return Bins(width=bins)
+    if isinstance(bins, Iterable) and not isinstance(bins, (str, bytes)):
+        return Bins(edges=bins)
+    raise TypeError(f"Unsupported bins argument: {bins!r}")
+
+
+def normalise_bins(by: Hashable, bins: Any) -> Hashable:
+    """
+    Convert a `bins` argument into a hashable spec matching `by`.
+
+    Args:
+        by (Hashable): A normalised grouping spec (see `normalise_by`).
+        bins: Bins for a single key or callable `by`, or a dictionary
+            mapping keys to bins when `by` is a tuple of keys.
+
+    Returns:
+        Hashable: None, a Bins/callable, or a tuple with one entry (or None)
+            per key of a tuple spec.
+    """
+    if bins is None:
+        return None
+    if isinstance(by, tuple):
+        if not isinstance(bins, dict):
+            raise TypeError(
+                "bins must be a dict of key to bins when grouping by "
+                "several keys."
+            )
+        unknown = set(bins) - set(by)
+        if unknown:
+            raise KeyError(f"bins given for keys not in by: {unknown}")
+        return tuple(as_bins(bins[key]) if key in bins else None for key in by)
+    return as_bins(bins)
+
+
+def _compile(bins: Hashable, values: Callable[[], Iterable[Any]]) -> Callable:
+    if not isinstance(bins, Bins):
+        return bins
+    return bins.compile(values() if bins.data_dependent else None)
+
+
+def binned_key_getter(
+    by: Hashable, bins: Hashable, items: Union[List[Any], Sequence[Any]]
+) -> Callable[[Any], Any]:
+    """
+    Build a grouping key function that bands the grouped values.
+
+    Data dependent bins (quantiles) are compiled against `items`.
+
+    Args:
+        by (Hashable): A normalised grouping spec.
+        bins (Hashable): A spec returned by `normalise_bins`.
+        items (Sequence): The items that will be grouped.
+
+    Returns:
+        Callable: A function returning the banded grouping key of an item.
+    """
+    if bins is None:
+        return key_getter(by)
+
+    if isinstance(by, tuple):
+        banders: Dict[int, Callable[[Any], Any]] = {
+            i: _compile(b, lambda k=key: (item[k] for item in items))
+            for i, (key, b) in enumerate(zip(by, bins))
+            if b is not None
+        }
+        keys = tuple(enumerate(by))
+
+        def tuple_key(item: Any) -> tuple:
+            return tuple(
+                banders[i](item[key]) if i in banders else item[key]
+                for i, key in keys
+            )
+
+        return tuple_key
+
+    get = key_getter(by)
+    band = _compile(bins, lambda: (get(item) for item in items))
+    return lambda item: band(get(item))
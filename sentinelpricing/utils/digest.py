@@ -0,0 +1,158 @@
+"""Digest
+
+Stable content digests of frameworks, tables and test data.
+
+Unlike `fingerprint`, which gives a hashable value for use within a
+process, a digest is a hex string that is the same across processes and
+machines, so it can name results stored on disk. Only values with a stable
+`repr` are digested: builtin numbers, strings, bytes, None and containers
+of them. Anything else cannot be digested, as its repr may include its
+memory address.
+"""
+
+import hashlib
+import inspect
+import marshal
+from typing import Any, Iterable, List, Optional
+
+# Types whose repr is the same in every process.
+_PLAIN = (str, int, float, complex, bool, bytes, type(None))
+_FLAT = frozenset(_PLAIN)
+
+# Digest size in bytes; 20 bytes (40 hex digits) is plenty for naming files.
+DIGEST_SIZE = 20
+
+
+def new_hash() -> Any:
+    """Return the hash object used for every digest."""
+    return hashlib.blake2b(digest_size=DIGEST_SIZE)
+
+
+def stable_repr(value: Any) -> Optional[str]:
+    """
+    Return a repr of `value` that is the same in every process, or None if
+    it contains a value without one.
+
+    Args:
+        value: A value, typically a framework attribute or call argument.
+    """
+    if isinstance(value, _PLAIN):
+        return repr(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [stable_repr(v) for v in value]
+        if None in items:
+            return None
+        if isinstance(value, (set, frozenset)):
+            items.sort()
+        return f"{type(value).__name__}({', '.join(items)})"
+    if isinstance(value, dict):
+        pairs = [(stable_repr(k), stable_repr(v)) for k, v in value.items()]
+        if any(k is None or v is None for k, v in pairs):
+            return None
+        return "{" + ", ".join(f"{k}: {v}" for k, v in pairs) + "}"
+    return None
+
+
+def source_of(obj: Any) -> bytes:
+    """
+    Return the source code of a function or class, or failing that (e.g.
+    for classes created with `type`) a serialisation of its byte code.
+
+    Args:
+        obj: A function, method or class.
+    """
+    try:
+        return inspect.getsource(obj).encode()
+    except (OSError, TypeError):
+        pass
+    code = getattr(obj, "__code__", None)
+    if code is not None:
+        return marshal.dumps(code)
+    if isinstance(obj, type):
+        parts = [obj.__qualname__.encode()]
+        for name, value in sorted(vars(obj).items()):
+            value = getattr(value, "__func__", value)
+            if callable(value):
+                parts.append(name.encode() + source_of(value))
+            else:
+                parts.append(f"{name}={stable_repr(value)}".encode())
+        return b"\n".join(parts)
+    return getattr(obj, "__qualname__", type(obj).__qualname__).encode()
+
+
+def _flat(row: Any) -> bool:
+    """Whether a row is a dict of plain keys and values, whose builtin
+    repr is stable; checked without building any strings."""
+    return (
+        type(row) is dict
+        and _FLAT.issuperset(map(type, row))
+        and _FLAT.issuperset(map(type, row.values()))
+    )
+
+
+def digest_rows(rows: Iterable[Any], chunk_size: int = 4096) -> Optional[str]:
+    """
+    Return the digest of a sequence of rows of test data, or None if any
+    row does not have a stable repr (see `stable_repr`).
+
+    Equal rows with their keys in a different order have different
+    digests.
+
+    Args:
+        rows (Iterable[Any]): Typically the quote data of each test case.
+        chunk_size (int): The number of rows to repr at once.
+    """
+    digest = new_hash()
+    chunk: List[Any] = []
+
+    def update() -> bool:
+        # Chunks of flat dicts, the usual case, are repr'd in one go.
+        if all(map(_flat, chunk)):
+            digest.update(repr(chunk).encode())
+            return True
+        for row in chunk:
+            text = stable_repr(row)
+            if text is None:
+                return False
+            digest.update(text.encode())
+            digest.update(b"\n")
+        return True
+
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            if not update():
+                return None
+            chunk = []
+    if not update():
+        return None
+    return digest.hexdigest()
+
+
+def state_repr(value: Any) -> str:
+    """
+    Return a stable description of a piece of framework state.
+
+    Objects with a `digest` method (such as LookupTables) are described by
+    their digest, plain values by `stable_repr`, and containers item by
+    item. Any other object is only described by its type, so changes to it
+    go unnoticed.
+
+    Args:
+        value: An attribute of a framework instance.
+    """
+    digest = getattr(value, "digest", None)
+    if callable(digest) and not isinstance(value, type):
+        return f"{type(value).__qualname__}<{digest()}>"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(map(state_repr, value)) + "]"
+    if isinstance(value, dict):
+        return (
+            "{"
+            + ", ".join(
+                f"{state_repr(k)}: {state_repr(v)}" for k, v in value.items()
+            )
+            + "}"
+        )
+    plain = stable_repr(value)
+    return f"<{type(value).__qualname__}>" if plain is None else plain
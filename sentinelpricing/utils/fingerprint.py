@@ -0,0 +1,61 @@
+"""Fingerprint
+
+Canonical, hashable representations of quote data.
+
+Two dictionaries with the same contents always produce the same fingerprint,
+regardless of insertion order, so fingerprints can be used as dictionary
+keys or set members where the dictionaries themselves cannot.
+"""
+
+from collections.abc import Mapping, Set
+from typing import Any, Hashable
+
+
+def fingerprint(data: Any, typed: bool = False) -> Hashable:
+    """
+    Return a canonical, hashable fingerprint of `data`.
+
+    Mappings become frozensets of (key, value) pairs, lists and tuples
+    become tuples and sets become frozensets, recursively. Any other value
+    is returned as is and must itself be hashable. Lists and tuples with the
+    same contents share a fingerprint.
+
+    Values that compare equal share a fingerprint too, so 1, 1.0 and True
+    do unless `typed` is set, when every value is paired with its type (as
+    with `functools.lru_cache(typed=True)`).
+
+    Args:
+        data: Quote data, or any value found within it.
+        typed (bool): Tell equal values of different types apart.
+
+    Returns:
+        Hashable: The fingerprint.
+
+    Raises:
+        TypeError: If a value cannot be made hashable.
+    """
+    if typed:
+        return _typed(data)
+    if isinstance(data, Mapping):
+        try:
+            # Fast path for flat quote data, which is by far the most common.
+            return frozenset(data.items())
+        except TypeError:
+            return frozenset((k, fingerprint(v)) for k, v in data.items())
+    if isinstance(data, (list, tuple)):
+        return tuple(fingerprint(v) for v in data)
+    if isinstance(data, Set):
+        return frozenset(fingerprint(v) for v in data)
+    hash(data)
+    return data
+
+
+def _typed(data: Any) -> Hashable:
+    if isinstance(data, Mapping):
+        return frozenset((_typed(k), _typed(v)) for k, v in data.items())
+    if isinstance(data, (list, tuple)):
+        return tuple(_typed(v) for v in data)
+    if isinstance(data, Set):
+        return frozenset(_typed(v) for v in data)
+    hash(data)
+    return type(data), data
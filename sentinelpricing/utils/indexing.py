@@ -0,0 +1,323 @@
+"""Indexing
+
+Helpers shared by QuoteSet and TestSuite for building and caching indexes
+(groupings, lookups) over their contents.
+
+Indexes are only as good as the data they were built from, so every cached
+index is tied to the version of the list it was built over. Any mutation of
+the underlying list bumps its version and the next request rebuilds the
+index from scratch.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from types import MappingProxyType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Sequence,
+    Tuple,
+)
+
+
+class VersionedList(list):
+    """A list that counts its own mutations.
+
+    Behaves exactly like a list, but every in-place modification increments
+    `version`. Index caches compare this counter to decide whether what
+    they hold is still valid.
+    """
+
+    version: int = 0
+
+    def _touch(self) -> None:
+        self.version += 1
+
+    def __setitem__(self, *args):
+        self._touch()
+        return super().__setitem__(*args)
+
+    def __delitem__(self, *args):
+        self._touch()
+        return super().__delitem__(*args)
+
+    def __iadd__(self, other):
+        self._touch()
+        return super().__iadd__(other)
+
+    def __imul__(self, other):
+        self._touch()
+        return super().__imul__(other)
+
+    def append(self, *args):
+        self._touch()
+        return super().append(*args)
+
+    def extend(self, *args):
+        self._touch()
+        return super().extend(*args)
+
+    def insert(self, *args):
+        self._touch()
+        return super().insert(*args)
+
+    def pop(self, *args):
+        self._touch()
+        return super().pop(*args)
+
+    def remove(self, *args):
+        self._touch()
+        return super().remove(*args)
+
+    def clear(self):
+        self._touch()
+        return super().clear()
+
+    def sort(self, *args, **kwargs):
+        self._touch()
+        return super().sort(*args, **kwargs)
+
+    def reverse(self):
+        self._touch()
+        return super().reverse()
+
+
+class IndexCache:
+    """Cache of indexes built over a VersionedList.
+
+    Indexes are stored against a hashable spec (for example the `by`
+    argument of a grouping). The whole cache is dropped as soon as the
+    source list reports a different version to the one the indexes were
+    built against.
+    """
+
+    def __init__(self, source: VersionedList) -> None:
+        self.source = source
+        self._version = source.version
+        self._indexes: Dict[Hashable, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    def __contains__(self, spec: Hashable) -> bool:
+        self._validate()
+        return spec in self._indexes
+
+    def _validate(self) -> None:
+        if self.source.version != self._version:
+            self._indexes.clear()
+            self._version = self.source.version
+
+    def get(self, spec: Hashable, build: Callable[[], Any]) -> Any:
+        """Return the index stored against `spec`, building it if needed.
+
+        Args:
+            spec (Hashable): The key describing the index.
+            build (Callable): Zero-argument function that builds the index.
+
+        Returns:
+            Any: The cached (or freshly built) index.
+        """
+        self._validate()
+        try:
+            return self._indexes[spec]
+        except KeyError:
+            index = self._indexes[spec] = build()
+            return index
+
+    def set(self, spec: Hashable, index: Any) -> None:
+        """Store an index that is already known, for example one derived
+        from a parent collection's indexes."""
+        self._validate()
+        self._indexes[spec] = index
+
+    def clear(self) -> None:
+        """Drop every cached index."""
+        self._indexes.clear()
+
+
+class SortedIndex:
+    """Values of a collection in ascending order, with their positions.
+
+    Built with a single sort, after which ranges, ranks and band counts are
+    answered with `bisect` in O(log n), and the k smallest or largest
+    values are a slice away. Values are held as doubles and positions as
+    64-bit integers in `array`s, so the index costs 16 bytes per item and
+    no Python objects.
+    """
+
+    __slots__ = ("values", "positions")
+
+    def __init__(self, values: array, positions: array) -> None:
+        self.values = values
+        self.positions = positions
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @classmethod
+    def build(
+        cls, items: Iterable[Any], key: Callable[[Any], float]
+    ) -> "SortedIndex":
+        """Index the value of `key` for each item, by item position.
+
+        Args:
+            items (Iterable): The items to index.
+            key (Callable): Function returning the (numeric) value of an
+                item.
+
+        Returns:
+            SortedIndex: The index. Equal values keep their original order.
+        """
+        unsorted = array("d", map(key, items))
+        order = sorted(range(len(unsorted)), key=unsorted.__getitem__)
+        return cls(
+            array("d", map(unsorted.__getitem__, order)), array("q", order)
+        )
+
+    def span(self, lo: float, hi: float) -> Tuple[int, int]:
+        """Return the slice of the index holding values in [lo, hi]."""
+        return bisect_left(self.values, lo), bisect_right(self.values, hi)
+
+    def count_at_most(self, value: float) -> int:
+        """Return the number of values less than or equal to `value`."""
+        return bisect_right(self.values, value)
+
+    def band_counts(self, edges: Sequence[float]) -> List[int]:
+        """Count the values in each band between consecutive `edges`.
+
+        Bands are closed below and open above, and the first and last
+        counts are of the values below the first edge and from the last
+        edge upwards.
+        """
+        cuts = [0, *(bisect_left(self.values, e) for e in edges), len(self)]
+        return [hi - lo for lo, hi in zip(cuts, cuts[1:])]
+
+    def select(
+        self, start: int, stop: int, reverse: bool = False
+    ) -> "SortedIndex":
+        """Return the index of the items in a slice of this index.
+
+        The positions of the new index refer to a collection holding the
+        sliced items in ascending order, or descending if `reverse`.
+        """
+        values = self.values[start:stop]
+        positions = array("q", range(len(values)))
+        if reverse:
+            positions.reverse()
+        return SortedIndex(values, positions)
+
+    def restrict(self, positions: Sequence[int], size: int) -> "SortedIndex":
+        """Return the index of a subset of the indexed items.
+
+        Reuses this index's order rather than sorting again.
+
+        Args:
+            positions (Sequence[int]): Positions, in the indexed collection,
+                of the items in the subset, in the subset's order.
+            size (int): The size of the indexed collection.
+
+        Returns:
+            SortedIndex: An index whose positions refer to the subset.
+        """
+        relative = array("q", [-1]) * size
+        for i, p in enumerate(positions):
+            relative[p] = i
+        values, kept = array("d"), array("q")
+        for value, p in zip(self.values, self.positions):
+            r = relative[p]
+            if r >= 0:
+                values.append(value)
+                kept.append(r)
+        return SortedIndex(values, kept)
+
+
+def has_callable(*specs: Hashable) -> bool:
+    """Whether any of the specs is, or holds, a callable.
+
+    Callables passed as `by` or `bins` are usually lambdas, new objects on
+    every call, so indexes stored against them would never be reused and
+    would only pile up. Such indexes are built every time instead.
+    """
+    for spec in specs:
+        if callable(spec):
+            return True
+        if isinstance(spec, tuple) and any(map(callable, spec)):
+            return True
+    return False
+
+
+def read_only_groups(
+    groups: Dict[Any, List[Any]],
+) -> Mapping[Any, Tuple[Any, ...]]:
+    """Return a read-only view of a grouping, so a cached grouping cannot
+    be changed by the callers it is handed to."""
+    return MappingProxyType({k: tuple(v) for k, v in groups.items()})
+
+
+def normalise_by(by: Any) -> Hashable:
+    """Convert a `by` argument into a hashable grouping spec.
+
+    Callables and single keys are returned unchanged, any other non-string
+    iterable of keys is converted into a tuple.
+
+    Args:
+        by (Any): A key, an iterable of keys or a callable.
+
+    Returns:
+        Hashable: The normalised spec.
+    """
+    if callable(by):
+        return by
+    if isinstance(by, Iterable) and not isinstance(by, (str, bytes)):
+        return tuple(by)
+    return by
+
+
+def key_getter(by: Hashable) -> Callable[[Any], Any]:
+    """Build a function that extracts a grouping key from an item.
+
+    Args:
+        by (Hashable): A normalised grouping spec (see `normalise_by`).
+
+    Returns:
+        Callable: A function returning the grouping key of an item. Tuple
+            specs produce tuple keys, in the order of the spec.
+    """
+    if callable(by):
+        return by
+    if isinstance(by, tuple):
+        if len(by) == 1:
+            (field,) = by
+            return lambda item: (item[field],)
+        return itemgetter(*by)
+    return itemgetter(by)
+
+
+def group_items(
+    items: Iterable[Any], key: Callable[[Any], Any]
+) -> Dict[Any, List[Any]]:
+    """Group items into lists by the result of `key`.
+
+    Args:
+        items (Iterable): The items to group.
+        key (Callable): Function returning the group of an item.
+
+    Returns:
+        Dict[Any, List[Any]]: Mapping of group key to items, in first seen
+            order.
+    """
+    groups: Dict[Any, List[Any]] = {}
+    for item in items:
+        k = key(item)
+        try:
+            groups[k].append(item)
+        except KeyError:
+            groups[k] = [item]
+    return groups
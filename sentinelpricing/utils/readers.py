@@ -0,0 +1,256 @@
+"""Readers
+
+Streaming readers for test case files: CSV, JSON Lines and XML.
+
+Each reader yields one dictionary per record and never holds more than a
+record (and, for XML, the element being parsed) in memory, so files much
+larger than memory can be quoted in chunks.
+
+Column types are declared once per file, as a mapping of column name to
+converter. Converters are resolved before the first record is read, so the
+per record work is a single call per declared column.
+"""
+
+import csv
+import json
+import xml.etree.ElementTree as ElementTree
+from itertools import islice
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+Converter = Callable[[Any], Any]
+Types = Optional[Mapping[str, Union[str, Converter]]]
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ("true", "t", "yes", "y", "1"):
+            return True
+        if lowered in ("false", "f", "no", "n", "0"):
+            return False
+        raise ValueError(f"Cannot interpret {value!r} as a boolean.")
+    return bool(value)
+
+
+CONVERTERS: Dict[str, Converter] = {
+    "str": str,
+    "int": int,
+    "float": float,
+    "bool": _to_bool,
+}
+
+
+def _type_name(converter: Union[str, Converter]) -> str:
+    return getattr(converter, "__name__", str(converter))
+
+
+def compile_types(types: Types) -> Dict[str, Converter]:
+    """
+    Resolve a mapping of column names to converters.
+
+    Args:
+        types (Mapping, optional): Column name to a converter: a callable
+            or one of "str", "int", "float" or "bool".
+
+    Returns:
+        Dict[str, Converter]: Column name to callable converter.
+
+    Raises:
+        ValueError: If a converter name is not recognised.
+    """
+    compiled: Dict[str, Converter] = {}
+    for column, converter in (types or {}).items():
+        if isinstance(converter, str):
+            try:
+                converter = CONVERTERS[converter]
+            except KeyError:
+                raise ValueError(
+                    f"Unknown type {converter!r} for column {column!r}, "
+                    f"expected a callable or one of {sorted(CONVERTERS)}."
+                ) from None
+        compiled[column] = converter
+    return compiled
+
+
+def _convert_record(
+    record: Dict[str, Any], converters: Iterable[Tuple[str, Converter]]
+) -> Dict[str, Any]:
+    # Empty values are missing values, not zero/False/"".
+    for column, convert in converters:
+        if column in record:
+            value = record[column]
+            record[column] = (
+                None if value is None or value == "" else convert(value)
+            )
+    return record
+
+
+def read_csv(
+    path: str,
+    types: Types = None,
+    encoding: str = "utf-8",
+    **kwargs: Any,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield each row of a CSV file as a dictionary.
+
+    Args:
+        path (str): The file to read. The first row holds the column names.
+        types (Mapping, optional): Column converters, see `compile_types`.
+            Undeclared columns are left as strings, and empty values become
+            None.
+        encoding (str): The file encoding.
+        **kwargs: Passed on to `csv.reader` (e.g. delimiter).
+
+    Yields:
+        Dict[str, Any]: One dictionary per row. Blank lines are skipped.
+
+    Raises:
+        ValueError: If a type is given for a column not in the file, or a
+            row has more or fewer fields than the header.
+    """
+    converters = compile_types(types)
+    with open(path, newline="", encoding=encoding) as f:
+        reader = csv.reader(f, **kwargs)
+        header = next(reader, None)
+        if header is None:
+            return
+        unknown = [name for name in converters if name not in header]
+        if unknown:
+            declared = dict(types or {})
+            given = ", ".join(
+                f"{name!r} as {_type_name(declared[name])}" for name in unknown
+            )
+            raise ValueError(
+                f"{path}: types given for columns not in file: {given}"
+            )
+        # Converters by column position, resolved once for the whole file.
+        plan = [converters.get(name) for name in header]
+        width = len(header)
+
+        def check(row: List[str]) -> bool:
+            """Whether to read a row: False for a blank line."""
+            if len(row) == width:
+                return True
+            if not row:
+                return False
+            raise ValueError(
+                f"{path}, line {reader.line_num}: expected {width} fields, "
+                f"got {len(row)}"
+            )
+
+        if not converters:
+            for row in reader:
+                if len(row) == width or check(row):
+                    yield dict(zip(header, row))
+            return
+        for row in reader:
+            if len(row) != width and not check(row):
+                continue
+            yield {
+                name: (
+                    value
+                    if convert is None
+                    else None if value == "" else convert(value)
+                )
+                for name, value, convert in zip(header, row, plan)
+            }
+
+
+def read_jsonl(
+    path: str, types: Types = None, encoding: str = "utf-8"
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield each record of a JSON Lines file.
+
+    Args:
+        path (str): The file to read, one JSON object per line. Blank lines
+            are skipped.
+        types (Mapping, optional): Column converters, see `compile_types`.
+        encoding (str): The file encoding.
+
+    Yields:
+        Dict[str, Any]: One dictionary per line.
+    """
+    converters = list(compile_types(types).items())
+    loads = json.loads
+    with open(path, encoding=encoding) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(
+                    f"Expected a JSON object per line, got {record!r}"
+                )
+            yield _convert_record(record, converters) if converters else record
+
+
+def read_xml(
+    path: str, record_tag: str = "testcase", types: Types = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield each record element of an XML file as a dictionary.
+
+    The file is parsed incrementally with `iterparse`, and each record is
+    cleared from the tree once it has been read. A record's attributes and
+    the text of its child elements become its fields:
+
+        <testcases>
+            <testcase id="1"><age>30</age><region>A</region></testcase>
+        </testcases>
+
+    gives {"id": "1", "age": "30", "region": "A"}.
+
+    Args:
+        path (str): The file to read.
+        record_tag (str): The tag of the elements holding each record.
+        types (Mapping, optional): Column converters, see `compile_types`.
+
+    Yields:
+        Dict[str, Any]: One dictionary per record element.
+    """
+    converters = list(compile_types(types).items())
+    events = ElementTree.iterparse(path, events=("start", "end"))
+    _, root = next(events)
+    for event, element in events:
+        if event != "end" or element.tag != record_tag:
+            continue
+        record = dict(element.attrib)
+        for child in element:
+            record[child.tag] = child.text
+        yield _convert_record(record, converters) if converters else record
+        element.clear()
+        root.clear()
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """
+    Split an iterable into lists of at most `size` items.
+
+    Args:
+        items (Iterable): The items to split.
+        size (int): The maximum chunk size.
+
+    Yields:
+        List[Any]: The chunks, in order.
+    """
+    if size < 1:
+        raise ValueError("Chunk size must be at least 1.")
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
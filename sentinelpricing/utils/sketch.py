@@ -0,0 +1,234 @@
+"""Sketch
+
+Approximate quantiles over streams of numbers in bounded memory.
+
+`QuantileSketch` is a KLL sketch (Karnin, Lang and Liberty, 2016). Values
+are held in a stack of "compactors"; when a compactor fills up it is sorted
+and every other value is promoted to the level above with double the
+weight. The memory used grows only with the logarithm of the number of
+values seen, sketches can be merged in any order, and the rank error of any
+quantile is bounded with high probability.
+"""
+
+import random
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from math import ceil
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+# Ratio between the capacities of successive compactors.
+_CAPACITY_RATIO = 2 / 3
+
+
+class QuantileSketch:
+    """
+    A mergeable KLL quantile sketch.
+
+    With the default `k` of 200 the normalised rank error of a quantile is
+    around 1.65% (99% confidence), and it shrinks in proportion to `k`.
+    While fewer than `k` values have been added the sketch is exact.
+
+    Example:
+        >>> sketch = QuantileSketch()
+        >>> sketch.update_many(prices)
+        >>> sketch.quantiles([0.5, 0.95])
+        [812.4, 1610.0]
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None) -> None:
+        """
+        Initialise an empty sketch.
+
+        Args:
+            k (int): Size of the largest compactor; controls accuracy.
+            seed (int, optional): Seed for the compaction coin flips, for
+                reproducible results.
+        """
+        if k < 8:
+            raise ValueError("k must be at least 8.")
+        self.k = k
+        self.n = 0
+        self.minimum: Any = None
+        self.maximum: Any = None
+        self.compactors: List[List[Any]] = []
+        self._random = random.Random(seed)
+        self._capacities: List[int] = []
+        self._size = 0
+        self._max_size = 0
+        self._grow()
+
+    def __len__(self) -> int:
+        """Return the number of values added to the sketch."""
+        return self.n
+
+    def __repr__(self) -> str:
+        return f"QuantileSketch(k={self.k}, n={self.n})"
+
+    def _grow(self) -> None:
+        self.compactors.append([])
+        height = len(self.compactors)
+        self._capacities = [
+            int(ceil(self.k * _CAPACITY_RATIO ** (height - h - 1))) + 1
+            for h in range(height)
+        ]
+        self._max_size = sum(self._capacities)
+
+    def _compress(self) -> None:
+        for height, level in enumerate(self.compactors):
+            if len(level) < self._capacities[height]:
+                continue
+            if height + 1 == len(self.compactors):
+                self._grow()
+            level.sort()
+            held = [level.pop()] if len(level) % 2 else []
+            offset = self._random.getrandbits(1)
+            promoted = level[offset::2]
+            self.compactors[height + 1].extend(promoted)
+            self.compactors[height] = held
+            self._size -= len(level) - len(promoted)
+            break
+
+    def _track_extremes(self, low: Any, high: Any) -> None:
+        if self.minimum is None or low < self.minimum:
+            self.minimum = low
+        if self.maximum is None or high > self.maximum:
+            self.maximum = high
+
+    def update(self, value: Any) -> None:
+        """
+        Add a single value to the sketch.
+
+        Args:
+            value: Any value that can be ordered against the others.
+        """
+        self._track_extremes(value, value)
+        self.compactors[0].append(value)
+        self.n += 1
+        self._size += 1
+        while self._size >= self._max_size:
+            self._compress()
+
+    def update_many(self, values: Iterable[Any]) -> "QuantileSketch":
+        """
+        Add many values to the sketch.
+
+        Much faster than repeated calls to `update`, as values are added to
+        the bottom compactor in slices.
+
+        Args:
+            values (Iterable): The values to add.
+
+        Returns:
+            QuantileSketch: This sketch, to allow chaining.
+        """
+        values = values if isinstance(values, list) else list(values)
+        if not values:
+            return self
+        self._track_extremes(min(values), max(values))
+        start = 0
+        while start < len(values):
+            stop = start + max(self._max_size - self._size, 1)
+            chunk = values[start:stop]
+            self.compactors[0].extend(chunk)
+            self.n += len(chunk)
+            self._size += len(chunk)
+            while self._size >= self._max_size:
+                self._compress()
+            start = stop
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Fold another sketch into this one.
+
+        Args:
+            other (QuantileSketch): The sketch to merge. It is not modified.
+
+        Returns:
+            QuantileSketch: This sketch, to allow chaining.
+        """
+        if not isinstance(other, QuantileSketch):
+            raise NotImplementedError(
+                "Merge only implemented for QuantileSketch"
+            )
+        if not other.n:
+            return self
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, theirs in zip(self.compactors, other.compactors):
+            level.extend(theirs)
+        self.n += other.n
+        self._size = sum(len(c) for c in self.compactors)
+        self._track_extremes(other.minimum, other.maximum)
+        while self._size >= self._max_size:
+            self._compress()
+        return self
+
+    def _weighted(self) -> Tuple[List[Any], List[int]]:
+        items = sorted(
+            (value, 1 << height)
+            for height, level in enumerate(self.compactors)
+            for value in level
+        )
+        values = [value for value, _ in items]
+        cumulative = list(accumulate(weight for _, weight in items))
+        return values, cumulative
+
+    def rank(self, value: Any) -> float:
+        """
+        Return the approximate fraction of values less than or equal to
+        `value`.
+
+        Args:
+            value: The value to rank.
+
+        Returns:
+            float: A number between 0 and 1.
+        """
+        if not self.n:
+            raise ValueError("Sketch is empty.")
+        values, cumulative = self._weighted()
+        idx = bisect_right(values, value)
+        return cumulative[idx - 1] / cumulative[-1] if idx else 0.0
+
+    def quantiles(self, q: Sequence[float]) -> List[Any]:
+        """
+        Return the approximate values at each of the quantiles `q`.
+
+        Args:
+            q (Sequence[float]): Quantiles between 0 and 1.
+
+        Returns:
+            List[Any]: The value at each quantile, in the order of `q`.
+
+        Raises:
+            ValueError: If the sketch is empty or a quantile is out of range.
+        """
+        if not self.n:
+            raise ValueError("Sketch is empty.")
+        if any(not 0 <= p <= 1 for p in q):
+            raise ValueError("Quantiles must be between 0 and 1.")
+        values, cumulative = self._weighted()
+        total = cumulative[-1]
+
+        result = []
+        for p in q:
+            if p == 0:
+                result.append(self.minimum)
+            elif p == 1:
+                result.append(self.maximum)
+            else:
+                idx = bisect_left(cumulative, p * total)
+                result.append(values[min(idx, len(values) - 1)])
+        return result
+
+    def quantile(self, q: float) -> Any:
+        """Return the approximate value at a single quantile `q`."""
+        return self.quantiles([q])[0]
+
+
+def sketch_values(
+    values: Iterable[Any], k: int = 200, seed: Optional[int] = None
+) -> QuantileSketch:
+    """Build a QuantileSketch containing `values`."""
+    return QuantileSketch(k=k, seed=seed).update_many(values)
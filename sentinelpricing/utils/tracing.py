@@ -0,0 +1,273 @@
+"""Tracing
+
+Recording which quote data keys a calculation reads.
+
+Frameworks only see their input through the quote data mapping (via
+`Quote.__getitem__`, `Quote.get`, `in` or `quote.quotedata` directly), so
+wrapping that mapping is enough to learn exactly which factors a rating
+depends on. A ReadTrie uses those reads to cache results on only the
+factors each branch of a calculation depends on.
+
+Lookup table rows are recorded the same way: while `row_hits` holds a
+RowHitRecorder, every LookupTable it knows adds each row it returns to it,
+packed into a single int by `pack_hit`.
+"""
+
+from collections.abc import Mapping
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Set, Tuple
+from typing import Union
+
+from .fingerprint import fingerprint
+
+
+class ReadTracer(Mapping):
+    """
+    A read-only mapping that records the keys read from another mapping.
+
+    Lookups and membership tests record the key, whether or not it is
+    present, as both can change the path a calculation takes. Iterating
+    over the mapping or taking its length depends on every key, and sets
+    `read_all`.
+
+    Example:
+        >>> tracer = ReadTracer({"age": 30, "name": "A"})
+        >>> tracer["age"], "lic" in tracer
+        (30, False)
+        >>> list(tracer.reads)
+        ['age', 'lic']
+    """
+
+    __slots__ = ("data", "reads", "read_all")
+
+    def __init__(self, data: Mapping) -> None:
+        self.data = data
+        # A dict rather than a set, to keep the keys in the order read.
+        self.reads: Dict[Any, None] = {}
+        self.read_all = False
+
+    def __getitem__(self, key: Any) -> Any:
+        self.reads[key] = None
+        return self.data[key]
+
+    def __contains__(self, key: Any) -> bool:
+        self.reads[key] = None
+        return key in self.data
+
+    def __iter__(self) -> Iterator[Any]:
+        self.read_all = True
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        self.read_all = True
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"ReadTracer({self.data!r})"
+
+
+class _Absent:
+    """Value read for a key that the data does not have."""
+
+    def __repr__(self) -> str:
+        return "<absent>"
+
+    def __reduce__(self):
+        return "ABSENT"
+
+
+ABSENT = _Absent()
+
+
+class _AllKeys:
+    """Trie key standing for "every key", used when the data was iterated."""
+
+    def __repr__(self) -> str:
+        return "<all keys>"
+
+    def __reduce__(self):
+        return "ALL_KEYS"
+
+
+ALL_KEYS = _AllKeys()
+
+
+def _read_value(data: Mapping, key: Any) -> Hashable:
+    if key is ALL_KEYS:
+        return fingerprint(data)
+    value = data.get(key, ABSENT)
+    try:
+        hash(value)
+    except TypeError:
+        return fingerprint(value)
+    return value
+
+
+class _Node:
+    __slots__ = ("key", "children")
+
+    def __init__(self, key: Any) -> None:
+        self.key = key
+        self.children: Dict[Hashable, Union["_Node", "_Leaf"]] = {}
+
+
+class _Leaf:
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+
+class ReadTrie:
+    """
+    A cache keyed on only the keys a calculation read, branch by branch.
+
+    Each stored value is filed under the sequence of (key, value) pairs
+    that were read to produce it, in the order they were first read. As a
+    deterministic calculation that has read the same values so far reads
+    the same key next, lookups walk the trie reading one key per level, and
+    different branches of a calculation can depend on different keys:
+
+        >>> # calculation reads "age", then "lic" only if age < 25
+        >>> trie.get({"age": 40, "name": "A"})   # one read: age
+        >>> trie.get({"age": 19, "lic": 1})      # two reads: age, lic
+
+    If a stored path contradicts a new one (a different key read after the
+    same values, or a value found where the calculation read further), the
+    calculation did not only depend on the keys it read, for example
+    because the framework changed. The whole trie is then invalidated.
+    """
+
+    def __init__(self) -> None:
+        self.root: Union[_Node, _Leaf, None] = None
+        self.keys: Dict[Any, None] = {}
+        self.invalidations = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of values stored."""
+        return self._size
+
+    def clear(self) -> None:
+        """Drop every stored value and learnt key."""
+        self.root = None
+        self.keys = {}
+        self._size = 0
+
+    def get(self, data: Mapping, default: Any = None) -> Any:
+        """
+        Return the value stored for data with the same values, for the keys
+        on its branch, as `data`.
+
+        Args:
+            data (Mapping): The quote data.
+            default: Returned if no value is stored.
+        """
+        node = self.root
+        while isinstance(node, _Node):
+            node = node.children.get(_read_value(data, node.key))
+        return default if node is None else node.value
+
+    def put(self, tracer: ReadTracer, value: Any) -> bool:
+        """
+        Store a value under the reads recorded by a tracer.
+
+        Args:
+            tracer (ReadTracer): The tracer wrapped around the data the
+                value was calculated from.
+            value: The value to store.
+
+        Returns:
+            bool: False if the reads contradicted the trie, which was then
+                invalidated before storing the value.
+        """
+        path = list(tracer.reads)
+        if tracer.read_all:
+            path.append(ALL_KEYS)
+        if self._insert(tracer.data, path, value):
+            return True
+        self.invalidations += 1
+        self.clear()
+        self._insert(tracer.data, path, value)
+        return False
+
+    def _insert(self, data: Mapping, path: List[Any], value: Any) -> bool:
+        if not path:
+            if isinstance(self.root, _Node):
+                return False
+            self._size += self.root is None
+            self.root = _Leaf(value)
+            return True
+
+        node = self.root
+        if node is None:
+            node = self.root = _Node(path[0])
+        elif isinstance(node, _Leaf) or node.key != path[0]:
+            return False
+
+        for depth, key in enumerate(path):
+            read = _read_value(data, key)
+            child = node.children.get(read)
+            if depth + 1 == len(path):
+                if isinstance(child, _Node):
+                    return False
+                self._size += child is None
+                node.children[read] = _Leaf(value)
+                break
+            following = path[depth + 1]
+            if child is None:
+                child = node.children[read] = _Node(following)
+            elif isinstance(child, _Leaf) or child.key != following:
+                return False
+            node = child
+
+        self.keys.update((k, None) for k in path if k is not ALL_KEYS)
+        return True
+
+
+class RowHitRecorder:
+    """
+    Collects the lookup table rows hit while rating a quote.
+
+    Tables are numbered by the framework holding them rather than carrying
+    an id themselves, as one table object may be shared between frameworks
+    (see `sentinelpricing.models.tablecache`).
+
+    Attributes:
+        table_ids (Dict[int, int]): The `id()` of each table recorded, to
+            its table_id.
+        hits (Set[int]): The packed (table_id, row_id) pairs hit.
+    """
+
+    __slots__ = ("table_ids", "hits")
+
+    def __init__(self, table_ids: Dict[int, int]) -> None:
+        self.table_ids = table_ids
+        self.hits: Set[int] = set()
+
+    def record(self, table: Any, row: int) -> None:
+        """Record a row of a table, if the table is numbered."""
+        table_id = self.table_ids.get(id(table))
+        if table_id is not None:
+            self.hits.add(pack_hit(table_id, row))
+
+    def child(self) -> "RowHitRecorder":
+        """Return an empty recorder numbering tables the same way."""
+        return RowHitRecorder(self.table_ids)
+
+
+# The recorder of the quote being rated, if recording.
+row_hits: ContextVar[Optional[RowHitRecorder]] = ContextVar(
+    "row_hits", default=None
+)
+
+
+def pack_hit(table_id: int, row_id: int) -> int:
+    """Pack a (table_id, row_id) pair into one int, as recorded in
+    `row_hits`."""
+    return table_id << 32 | row_id
+
+
+def unpack_hit(hit: int) -> Tuple[int, int]:
+    """Return the (table_id, row_id) pair packed by `pack_hit`."""
+    return hit >> 32, hit & 0xFFFFFFFF
@@ -0,0 +1,90 @@
+import pickle
+from statistics import variance
+
+import pytest
+
+from sentinelpricing import Accumulator, Framework, Quote, QuoteSet
+
+
+def make_quotes(n=50):
+    return [
+        Quote({"age": 17 + i % 5, "lic": i % 3}, final_price=(i * 7) % 31)
+        for i in range(n)
+    ]
+
+
+def test_accumulator_matches_quoteset():
+    quotes = make_quotes()
+    qs = QuoteSet(quotes)
+    acc = Accumulator(by="age").consume(quotes)
+
+    assert acc.avg() == pytest.approx(qs.avg(by="age"))
+    assert acc.sum() == qs.sum(by="age")
+    assert acc.min() == qs.min(by="age")
+    assert acc.max() == qs.max(by="age")
+    assert acc.mix() == qs.mix(by="age")
+    assert acc.variance() == pytest.approx(
+        qs.apply(variance, by="age")
+    )
+
+
+def test_accumulator_ungrouped():
+    quotes = make_quotes()
+    qs = QuoteSet(quotes)
+    acc = Accumulator().consume(quotes)
+
+    assert acc.count() == len(qs)
+    assert acc.avg() == pytest.approx(qs.avg())
+    assert acc.variance() == pytest.approx(qs.apply(variance))
+
+
+def test_accumulator_merge():
+    quotes = make_quotes(101)
+    whole = Accumulator(by=("age", "lic")).consume(quotes)
+
+    parts = [
+        Accumulator(by=("age", "lic")).consume(quotes[i::3])
+        for i in range(3)
+    ]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(pickle.loads(pickle.dumps(part)))
+
+    assert merged.count() == whole.count()
+    assert merged.sum() == pytest.approx(whole.sum())
+    assert merged.avg() == pytest.approx(whole.avg())
+    assert merged.variance(sample=False) == pytest.approx(
+        whole.variance(sample=False)
+    )
+    assert merged.min() == whole.min()
+
+
+def test_accumulator_merge_mismatch():
+    with pytest.raises(ValueError):
+        Accumulator(by="age").merge(Accumulator(by="lic"))
+
+
+def test_accumulator_quote_iter():
+    class Motor(Framework):
+        def setup(self):
+            pass
+
+        def calculation(self, quote):
+            return quote + quote["age"]
+
+    tests = [{"age": i % 4} for i in range(20)]
+    acc = Accumulator(by="age").consume(Motor.quote_iter(tests))
+
+    assert acc.sum() == Motor.quote_many(tests).sum(by="age")
+
+
+def test_accumulator_quantiles():
+    quotes = make_quotes(60)
+    acc = Accumulator(by="age", sketch_k=50).consume(quotes[:30])
+    acc.merge(Accumulator(by="age", sketch_k=50).consume(quotes[30:]))
+
+    qs = QuoteSet(quotes)
+    assert acc.quantiles([0, 0.5, 1]) == qs.quantiles([0, 0.5, 1], by="age")
+
+    with pytest.raises(ValueError):
+        Accumulator().consume(quotes).quantiles([0.5])
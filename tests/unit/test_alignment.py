@@ -0,0 +1,70 @@
+from math import inf
+
+from sentinelpricing import Alignment, Framework, Quote, QuoteSet, TestSuite
+
+
+def test_align_by_identifier():
+    left = QuoteSet(
+        [Quote({"age": i}, final_price=100, identifier=i) for i in range(10)]
+    )
+    right = QuoteSet(
+        [
+            Quote({"age": i}, final_price=100 + (i - 5) * 5, identifier=i)
+            for i in reversed(range(2, 12))
+        ]
+    )
+
+    alignment = left.align(right)
+
+    assert len(alignment) == 8
+    assert alignment.keys == list(range(2, 10))
+    assert list(alignment.deltas()) == [(i - 5) * 5 for i in range(2, 10)]
+    assert alignment.winners() == 3
+    assert alignment.losers() == 4
+    assert alignment.dislocation(bands=[-0.1, 0, 0.1]) == {
+        (-inf, -0.1): 1,
+        (-0.1, 0): 2,
+        (0, 0.1): 2,
+        (0.1, inf): 3,
+    }
+
+    summary = alignment.summary()
+    assert summary["unchanged"] == 1
+    assert summary["unmatched_left"] == 2
+    assert summary["unmatched_right"] == 2
+
+
+def test_align_on_keys_in_chunks():
+    left = [Quote({"id": i, "x": 1}, final_price=10) for i in range(6)]
+    right = [Quote({"id": i, "x": 1}, final_price=20) for i in range(6)]
+
+    alignment = Alignment(on=["id", "x"])
+    alignment.add(left=left[:3], right=right[3:])
+    assert len(alignment) == 0
+
+    other = Alignment(on=["id", "x"]).add(left=left[3:], right=right[:3])
+    alignment.merge(other)
+
+    assert len(alignment) == 6
+    assert set(alignment.ratios()) == {2.0}
+    assert alignment.unmatched() == ([], [])
+
+
+def test_align_framework_versions():
+    class MotorV1(Framework):
+        def setup(self):
+            self.base = 100
+
+        def calculation(self, quote):
+            return quote + self.base
+
+    class MotorV2(MotorV1):
+        def setup(self):
+            self.base = 110
+
+    suite = TestSuite([{"age": i} for i in range(20)])
+
+    alignment = MotorV1.quote_many(suite).align(MotorV2.quote_many(suite))
+
+    assert len(alignment) == 20
+    assert alignment.losers() == 20
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from sentinelpricing import Framework, QuoteCoalescer
+
+
+def coalesced_motor(calls, started=None, release=None):
+    class Motor(Framework):
+        def setup(self):
+            self.base = 100
+
+        def calculation(self, quote):
+            calls.append(quote["age"])
+            if quote.get("block"):
+                started.set()
+                release.wait()
+            if quote["age"] < 0:
+                raise ValueError("age")
+            quote += self.base
+            return quote
+
+    return Motor
+
+
+class Echo(Framework):
+    def setup(self):
+        self.base = 100
+
+    def calculation(self, quote):
+        quote += self.base
+        quote *= 2 if isinstance(quote["x"], bool) else 1
+        quote += 0.5 if isinstance(quote["x"], float) else 0
+        return quote
+
+
+def test_coalesce_in_flight():
+    calls = []
+    started, release = threading.Event(), threading.Event()
+    coalescer = QuoteCoalescer(coalesced_motor(calls, started, release))
+
+    # Identical requests in flight share the one calculation.
+    results = []
+
+    def request():
+        results.append(coalescer.quote({"age": 30, "block": 1}))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    while coalescer.info().requests < 8:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [30]
+    assert [q.final_price for q in results] == [100] * 8
+    assert len({id(q) for q in results}) == 8
+    assert len({q.identifier for q in results}) == 8
+    assert all(q.breakdown is results[0].breakdown for q in results)
+    assert results[0].breakdown.frozen
+    assert coalescer.info()[:4] == (8, 1, 7, 0)
+
+
+def test_coalesce_ttl():
+    calls = []
+    coalescer = QuoteCoalescer(coalesced_motor(calls), ttl=0.05)
+    coalescer.quote({"age": 30, "region": "N"})
+    # Results answer identical requests until they expire.
+    assert coalescer.quote({"region": "N", "age": 30}).final_price == 100
+    assert coalescer.info().cached == 1 and calls == [30]
+    time.sleep(0.06)
+    coalescer.quote({"age": 30, "region": "N"})
+    assert calls == [30, 30]
+
+
+def test_coalesce_errors_not_kept():
+    calls = []
+    coalescer = QuoteCoalescer(coalesced_motor(calls), ttl=10)
+    # Errors reach the requests waiting on them, but are not kept.
+    with pytest.raises(ValueError):
+        coalescer.quote({"age": -1})
+    with pytest.raises(ValueError):
+        coalescer.quote({"age": -1})
+    assert calls.count(-1) == 2
+
+
+def test_coalesce_asyncio():
+    calls = []
+    coalescer = QuoteCoalescer(coalesced_motor(calls))
+
+    async def main():
+        return await asyncio.gather(
+            *(coalescer.aquote({"age": 40}) for _ in range(5))
+        )
+
+    quotes = asyncio.run(main())
+    assert [q.final_price for q in quotes] == [100] * 5
+    assert calls.count(40) == 1
+    assert coalescer.info().ratio == pytest.approx(0.8)
+
+
+def test_coalesce_equal_values_of_different_types():
+    coalescer = QuoteCoalescer(Echo, ttl=10)
+    prices = [coalescer.quote({"x": x}).final_price for x in (1, 1.0, True, 1)]
+    assert prices == [100, 100.5, 200, 100]
+    assert coalescer.info()[:4] == (4, 3, 0, 1)
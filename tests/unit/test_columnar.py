@@ -0,0 +1,147 @@
+from array import array
+
+import pytest
+
+from sentinelpricing import (
+    ColumnarTestSuite,
+    Quote,
+    QuoteSet,
+    TestCase,
+    TestSuite,
+)
+from sentinelpricing.models.columnar import CategoricalColumn
+
+
+def records(n=10):
+    return [
+        {
+            "policy": f"P{i}",
+            "age": 17 + i,
+            "value": 1000.0 * i,
+            "region": "ABC"[i % 3],
+        }
+        for i in range(n)
+    ]
+
+
+def test_columnar_storage():
+    ts = ColumnarTestSuite.from_records(records(), id_column="policy")
+
+    assert len(ts) == 10
+    assert ts.columns == ["policy", "age", "value", "region"]
+    assert isinstance(ts.column("age"), array)
+    assert ts.column("age").typecode == "q"
+    assert ts.column("value").typecode == "d"
+    region = ts.column("region")
+    assert isinstance(region, CategoricalColumn)
+    assert region.categories == ["A", "B", "C"]
+    assert region.codes.typecode == "B"
+    assert list(region)[:4] == ["A", "B", "C", "A"]
+
+    row = ts[3]
+    assert isinstance(row, TestCase)
+    assert row.identifier == "P3"
+    assert row["age"] == 20
+    assert "region" in row
+    assert "lic" not in row
+    assert dict(row.data) == records()[3]
+    assert ts[-1]["policy"] == "P9"
+
+    assert ts.mix(by="region") == {"A": 4, "B": 3, "C": 3}
+    assert ts.mix(by=("region", "age"))[("A", 17)] == 1
+    assert len(ts.subset(lambda t: t["age"] > 20)) == 6
+
+    with pytest.raises(AttributeError):
+        ts.testcases = []
+
+
+def test_columnar_conversions():
+    rows = records(5)
+    rows[1]["age"] = "unknown"
+    rows[2]["lic"] = 3
+    rows[3]["tags"] = ["a"]
+    del rows[4]["value"]
+
+    ts = ColumnarTestSuite(rows)
+
+    assert isinstance(ts.column("age"), CategoricalColumn)
+    assert ts[1]["age"] == "unknown"
+    assert ts[0]["age"] == 17
+    assert "lic" not in ts[0] and ts[2]["lic"] == 3
+    assert ts[3]["tags"] == ["a"]
+    assert "value" not in ts[4]
+    assert len(ts[4].data) == 3
+    assert ts.column("lic")[0] is ColumnarTestSuite.MISSING
+    with pytest.raises(KeyError):
+        ts[0]["lic"]
+    with pytest.raises(KeyError):
+        ts.mix(by="lic")
+
+    # Identifiers of TestCases are kept, dicts are identified by position.
+    mixed = ColumnarTestSuite(
+        [{"age": 1}, TestCase({"age": 2}, name="x"), {"age": 3}]
+    )
+    assert [t.identifier for t in mixed] == [0, "x", 2]
+    assert [t.identifier for t in ColumnarTestSuite(rows)] == list(range(5))
+
+    wide = CategoricalColumn(range(300))
+    assert wide.codes.typecode == "H"
+    assert wide[299] == 299
+
+
+def test_columnar_quotes_and_chunks(tmp_path):
+    ts = ColumnarTestSuite.from_records(records(), id_column="policy")
+
+    quotes = QuoteSet(
+        [Quote(t, final_price=t["age"] * 10) for t in ts], id_check="strict"
+    )
+    assert quotes.get("P2")["region"] == "C"
+    assert quotes.avg(by="region")["A"] == 215
+
+    plain = TestSuite(records())
+    assert {"policy": "P1", "age": 18, "value": 1000.0, "region": "B"} in ts
+    assert len(plain.intersection(ts, on="data")) == 10
+    assert len(ts + plain) == 20
+
+    path = tmp_path / "tests.csv"
+    path.write_text("policy,age\n" + "".join(f"P{i},{i}\n" for i in range(5)))
+    chunks = list(ColumnarTestSuite.iter_csv(path, 2, types={"age": int}))
+    assert all(isinstance(c, ColumnarTestSuite) for c in chunks)
+    assert [list(c.column("age")) for c in chunks] == [[0, 1], [2, 3], [4]]
+
+    # Chunks of one file are identified by their position in the file.
+    first, second = ColumnarTestSuite.iter_records(records(6), 3)
+    assert [t.identifier for t in second] == [3, 4, 5]
+    assert len(first | second) == 6
+    quotes = [QuoteSet([Quote(t, final_price=1) for t in c]) for c in chunks]
+    assert len(quotes[0] | quotes[1] | quotes[2]) == 5
+
+
+def test_columnar_blocks(monkeypatch):
+    from sentinelpricing.models import columnar
+
+    monkeypatch.setattr(columnar, "_BLOCK_SIZE", 2)
+    rows = [{"a": i} for i in range(5)] + [{"b": 1.5}, {"a": 9, "b": 2.5}]
+
+    ts = ColumnarTestSuite(rows)
+
+    assert [dict(t.data) for t in ts] == rows
+    assert ColumnarTestSuite.MISSING in ts.column("a").categories
+    assert list(ts.column("b"))[-2:] == [1.5, 2.5]
+
+
+def test_columnar_mixed_types_kept_apart(monkeypatch):
+    from sentinelpricing.models import columnar
+
+    monkeypatch.setattr(columnar, "_BLOCK_SIZE", 2)
+    rows = [{"v": i, "f": i} for i in range(4)]
+    rows += [{"v": 1.0, "f": True}, {"v": 2.5, "f": False}, {"v": 1}]
+
+    ts = ColumnarTestSuite(rows)
+
+    assert isinstance(ts.column("v"), CategoricalColumn)
+    values = [(t.data.get("v"), t.data.get("f")) for t in ts]
+    assert values == [(r.get("v"), r.get("f")) for r in rows]
+    assert [type(v) for v, _ in values[3:6]] == [int, float, float]
+    assert [type(f) for _, f in values[3:6]] == [int, bool, bool]
+    assert ts.mix(by="v")[1] == 3
@@ -0,0 +1,208 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from sentinelpricing import Framework, TestCase
+from sentinelpricing.models.dedup import QuoteCache, _RatingCache
+
+
+def young_motor(calls, **attributes):
+    def calculate(self, quote, load=1):
+        calls.append(quote.identifier)
+        quote += 100 * load
+        if quote["age"] < 20:
+            quote *= quote.get("young_load", 2)
+        return quote
+
+    attributes.update(setup=lambda x: x, calculation=calculate)
+    return type("Motor", (Framework,), attributes)
+
+
+def policies():
+    tests = [
+        TestCase({"policy": i, "age": 18 + i % 4}, name=f"P{i}")
+        for i in range(20)
+    ]
+    tests[-1].data["young_load"] = 3
+    return tests
+
+
+def test_quote_many_dedup():
+    calls = []
+    Motor = young_motor(calls)
+    tests = policies()
+    quotes = Motor.quote_many(tests, dedup=True)
+    # Only young rows read young_load, so P19 (age 21, the only row with a
+    # load) shares the result of the other 21 year olds.
+    assert len(calls) == 4
+    plain = Motor.quote_many(tests)
+    assert [q.final_price for q in quotes] == [q.final_price for q in plain]
+    assert [q.identifier for q in quotes] == [f"P{i}" for i in range(20)]
+
+
+def test_quote_many_dedup_report():
+    report = young_motor([]).quote_many(policies(), dedup=True).dedup_report
+    assert (report.rows, report.distinct) == (20, 4)
+    assert report.ratio == 5
+    assert report.factors == ("age", "young_load")
+
+
+def test_quote_many_dedup_copies_on_write():
+    quotes = young_motor([]).quote_many(policies(), dedup=True)
+    first, second = quotes[0], quotes[4]
+    assert first.breakdown is second.breakdown
+    second += 1
+    assert first.breakdown is not second.breakdown
+    assert second.final_price == first.final_price + 1
+
+
+def test_quote_many_dedup_declared_keys():
+    Motor = young_motor([])
+    with pytest.warns(UserWarning):
+        declared = Motor.quote_many(policies(), dedup=["policy"])
+    assert declared.dedup_report.distinct == 20
+    assert not hasattr(
+        Motor.quote_many(policies(), dedup=False), "dedup_report"
+    )
+
+
+def young_tests():
+    return [{"policy": i, "age": 18 + i % 4} for i in range(8)]
+
+
+def test_result_cache():
+    calls = []
+    Motor = young_motor(calls, cache_results=True)
+    tests = young_tests()
+    first = Motor.quote_many(tests)
+    assert len(calls) == 4
+    second = Motor.quote_many(tests)
+    assert len(calls) == 4
+    assert second.dedup_report.distinct == 0
+    assert [q.final_price for q in first] == [q.final_price for q in second]
+    cache = Motor.result_cache()
+    assert (cache.hits, cache.misses) == (12, 4)
+    assert cache.keys == ("age", "young_load")
+
+
+def test_result_cache_quote_and_quote_iter():
+    calls = []
+    Motor = young_motor(calls, cache_results=True)
+    tests = young_tests()
+    Motor.quote_many(tests)
+    assert Motor.quote({"age": 21, "name": "X"}).final_price == 100
+    assert Motor.quote({"age": 21}, load=2).final_price == 200
+    assert list(Motor.quote_iter(tests[:2])) and len(calls) == 5
+    assert len(Motor.result_cache()) == 5
+
+
+def test_result_cache_clear():
+    calls = []
+    Motor = young_motor(calls, cache_results=True)
+    tests = young_tests()
+    Motor.quote_many(tests)
+    cache = Motor.result_cache()
+    Motor.clear_cache()
+    assert len(cache) == 0
+    Motor.quote(tests[0])
+    assert len(calls) == 5
+    assert Framework.__dict__.get("_result_cache") is None
+
+
+def test_result_cache_warns_when_reads_change():
+    Motor = young_motor([], cache_results=True)
+    tests = young_tests()
+    Motor.quote(tests[0])
+    # Reading different keys for the same data means the framework changed.
+    Motor.calculation = lambda self, quote: quote + quote["policy"]
+    with pytest.warns(UserWarning):
+        assert Motor.quote(tests[1]).final_price == 1
+
+
+def test_rating_cache_is_abstract():
+    with pytest.raises(TypeError):
+        _RatingCache()
+
+
+def test_quote_cache_threads():
+    class Motor(Framework):
+        def setup(self):
+            pass
+
+        def calculation(self, quote):
+            quote += quote["age"]
+            if quote["age"] < 25:
+                quote += quote["lic"]
+            return quote
+
+    cache = QuoteCache()
+    instance = Motor()
+    errors = []
+
+    def rate(offset):
+        try:
+            for i in range(300):
+                age = 17 + (i * 7 + offset) % 40
+                test = {"age": age, "lic": i % 3, "name": i}
+                quote = cache.quote(Motor, test, instance=instance)
+                expected = age + (i % 3 if age < 25 else 0)
+                assert quote.final_price == expected
+        except Exception as error:
+            errors.append(error)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    threads = [threading.Thread(target=rate, args=(i,)) for i in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+    finally:
+        for thread in threads:
+            thread.join()
+        sys.setswitchinterval(interval)
+
+    assert errors == []
+    # Every distinct branch is stored once: 8 ages x 3 lic, then 32 ages.
+    assert len(cache) == 8 * 3 + 32
+    assert cache.hits + cache.misses == 8 * 300
+
+
+def test_result_cache_dropped_when_tables_change(tmp_path):
+    from sentinelpricing import LookupTable
+
+    path = tmp_path / "base.csv"
+    path.write_text("region,rate\nN,100\n")
+    loads = {"S": 250}
+
+    class Motor(Framework):
+        cache_results = True
+
+        def setup(self):
+            self.base = LookupTable.from_csv(path)
+            self.south = LookupTable(
+                [{"region": "S", "rate": loads["S"]}], name="south"
+            )
+
+        def calculation(self, quote):
+            table = self.south if quote["region"] == "S" else self.base
+            quote += table[quote["region"]]
+            return quote
+
+    assert Motor.quote({"region": "N"}).final_price == 100
+    assert Motor.quote({"region": "S"}).final_price == 250
+
+    # Setting up again with the same tables keeps the results.
+    Motor()
+    assert len(Motor.result_cache()) == 2
+
+    # A table built in set up with other rates drops them.
+    loads["S"] = 300
+    assert Motor.quote_many([{"region": "S"}])[0].final_price == 300
+
+    # As does a shared table reloaded from a changed file.
+    path.write_text("region,rate\nN,120\n")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert Motor.quote_many([{"region": "N"}])[0].final_price == 120
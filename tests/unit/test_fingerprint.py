@@ -0,0 +1,29 @@
+import pytest
+
+from sentinelpricing.utils.fingerprint import fingerprint
+
+
+def test_fingerprint_order_independent():
+    assert fingerprint({"a": 1, "b": 2}) == fingerprint({"b": 2, "a": 1})
+    assert fingerprint({"a": 1}) != fingerprint({"a": 2})
+
+
+def test_fingerprint_nested():
+    a = {"drivers": [{"age": 30}, {"age": 25}], "tags": {"x", "y"}}
+    b = {"tags": {"y", "x"}, "drivers": [{"age": 30}, {"age": 25}]}
+    assert fingerprint(a) == fingerprint(b)
+    hash(fingerprint(a))
+
+
+def test_fingerprint_unhashable():
+    with pytest.raises(TypeError):
+        fingerprint({"a": bytearray(b"x")})
+
+
+def test_fingerprint_typed():
+    values = [{"x": 1}, {"x": 1.0}, {"x": True}]
+    assert len({fingerprint(v) for v in values}) == 1
+    assert len({fingerprint(v, typed=True) for v in values}) == 3
+    assert fingerprint([{"a": 1, "b": (2,)}], typed=True) == fingerprint(
+        [{"b": (2,), "a": 1}], typed=True
+    )
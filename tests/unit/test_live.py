@@ -0,0 +1,127 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from sentinelpricing import Framework, LiveFramework, LookupTable, memoize
+
+
+def edit(path, text):
+    path.write_text(text)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def live_motor(path, started=None, release=None):
+    class Motor(Framework):
+        cache_results = True
+
+        def setup(self):
+            self.age = LookupTable.from_csv(path, types={"age": "int"})
+
+        @memoize(keys=["age"], maxsize=None)
+        def factor(self, quote):
+            return self.age[quote["age"]]
+
+        def calculation(self, quote):
+            if quote.get("block"):
+                started.set()
+                release.wait()
+            quote += 100
+            quote *= self.factor(quote)
+            return quote
+
+    return Motor
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "age.csv"
+    path.write_text("age,rate\n17,2.0\n25,1.0\n")
+    return path
+
+
+def test_live_reload(path):
+    started, release = threading.Event(), threading.Event()
+    Motor = live_motor(path, started, release)
+    live = LiveFramework(Motor, interval=None)
+    assert live.quote({"age": 18}).final_price == 200
+
+    # A quote in flight finishes on the version it started with.
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(live.quote({"age": 18, "block": 1}))
+    )
+    thread.start()
+    started.wait()
+    edit(path, "age,rate\n17,3.0\n25,1.0\n")
+    assert not live.check()  # waits for the file to settle
+    assert live.check() and live.version == 1
+    new = live.quote({"age": 18})
+    assert new.final_price == 300 and issubclass(new.framework, Motor)
+    assert len(Motor.result_cache()) == 1
+    release.set()
+    thread.join()
+    assert results[0].final_price == 200
+    # The old version's caches are cleared once its quotes are done.
+    assert len(Motor.result_cache()) == 0
+    assert Motor.factor.cache_info().currsize == 1
+    assert [q.final_price for q in live.quote_many([{"age": 30}])] == [100]
+
+
+def test_live_failed_reload(path):
+    live = LiveFramework(live_motor(path), interval=None)
+    edit(path, "age,rate\n17,3.0\n25,1.0\n")
+    assert live.reload() and live.version == 1
+    # A failed reload keeps the current version.
+    edit(path, "age,price\n17,4.0\n")
+    with pytest.warns(UserWarning, match="keeping version 1"):
+        assert not live.reload()
+    assert live.version == 1 and isinstance(live.last_error, KeyError)
+    assert not live.check() and not live.check()
+    assert live.quote({"age": 18}).final_price == 300
+
+
+def test_live_watching_thread(path):
+    # The watching thread picks up changes by itself.
+    with LiveFramework(live_motor(path), interval=0.01) as watched:
+        edit(path, "age,rate\n17,6.0\n25,1.0\n")
+        deadline = time.time() + 5
+        while watched.version == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert watched.quote({"age": 18}).final_price == 600
+
+
+def test_live_reload_threads(path):
+    path.write_text("age,rate\n17,2.0\n")
+    live = LiveFramework(live_motor(path), interval=None)
+    errors = []
+    done = threading.Event()
+
+    def rate(offset):
+        age = offset
+        try:
+            while not done.is_set():
+                age += 4
+                live.quote({"age": 17 + age % 5000})
+        except Exception as error:
+            errors.append(error)
+
+    # Retired versions' memoized results are cleared while the current
+    # version's quotes add to the same method cache.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    threads = [threading.Thread(target=rate, args=(i,)) for i in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        for _ in range(200):
+            live.reload()
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
+        sys.setswitchinterval(interval)
+    assert errors == [] and live.version == 200
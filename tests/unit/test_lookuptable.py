@@ -28,3 +28,105 @@ def test_lookuptable_rate_col():
     lookuptable = LookupTable(rates)
 
     assert isinstance(lookuptable.rates, list)
+
+
+def test_lookuptable_from_csv_shared(tmp_path):
+    import os
+
+    import pytest
+
+    from sentinelpricing import Framework, TableCache
+
+    path = tmp_path / "age.csv"
+    path.write_text("age,rate\n17,2.0\n25,1.0\n")
+    cache = TableCache()
+
+    class MotorV1(Framework):
+        def setup(self):
+            self.age = LookupTable.from_csv(
+                path, name="age", types={"age": "int"}, shared=cache
+            )
+            self.region = LookupTable([{"region": "N", "rate": 100}])
+
+        def calculation(self, quote):
+            return quote
+
+    class MotorV2(MotorV1):
+        def setup(self):
+            self.region = LookupTable([{"region": "N", "rate": 120}])
+
+    v1, v2 = MotorV1(), MotorV2()
+    assert v1.age is v2.age and v1.age.frozen
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+    assert v1.age.lookup(18) == 2.0
+    with pytest.raises(TypeError):
+        v1.age.rates[0] = 3.0
+
+    # Other options build another table.
+    other = LookupTable.from_csv(path, types={"age": "int"}, shared=cache)
+    assert other is not v1.age and len(cache) == 2
+
+    # A changed file is read again, and the stale tables are dropped.
+    path.write_text("age,rate\n17,3.0\n25,1.0\n")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert MotorV1().age.lookup(18) == 3.0
+    assert len(cache) == 1
+
+    table = LookupTable.from_csv(path, types={"age": "int"}, shared=False)
+    assert not table.frozen
+    table.rates[0] = 4.0
+    assert (
+        LookupTable.from_csv(path, types={"age": "int"}, shared=cache)[17]
+        == 3.0
+    )
+
+
+def test_lookuptable_lazy(tmp_path, capsys):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from sentinelpricing import Framework
+
+    path = tmp_path / "convictions.csv"
+    path.write_text("convictions,rate\n0,1.0\n1,1.5\n")
+    loads = []
+
+    def load_age():
+        loads.append("age")
+        return LookupTable([{"age": a, "rate": a / 10} for a in (17, 25)])
+
+    class MotorV1(Framework):
+        def setup(self):
+            self.age = LookupTable.lazy(load_age, name="age")
+            self.convictions = LookupTable.lazy(
+                path, name="convictions", types={"convictions": "int"}
+            )
+
+        def calculation(self, quote):
+            quote += self.age[quote["age"]]
+            if quote["convictions"]:
+                quote *= self.convictions[quote["convictions"]]
+            return quote
+
+    class MotorV2(MotorV1):
+        def setup(self):
+            self.age = LookupTable([{"age": 17, "rate": 1}])
+
+    # Replaced by a subclass: never loaded.
+    assert MotorV2.quote({"age": 17, "convictions": 0}).final_price == 1
+    assert loads == []
+
+    framework = MotorV1()
+    assert not framework.age.loaded and not framework.convictions.loaded
+    with ThreadPoolExecutor(8) as pool:
+        prices = list(pool.map(lambda _: framework.age[30], range(32)))
+    assert loads == ["age"] and all(p == 2.5 for p in prices)
+    assert framework.age.name == "age" and len(framework.age) == 2
+
+    framework.describe()
+    out = capsys.readouterr().out
+    assert "age: loaded" in out and "convictions: not loaded" in out
+
+    quote = framework._calculate_wrapper({"age": 17, "convictions": 1})
+    assert framework.convictions.loaded
+    assert quote.final_price == 1.7 * 1.5
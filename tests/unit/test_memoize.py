@@ -0,0 +1,120 @@
+import pytest
+
+from sentinelpricing import Framework, LookupTable, Note, Quote, Rate, memoize
+
+
+def regional_motor(calls):
+    class Motor(Framework):
+        def setup(self):
+            self.base = {"N": 100, "S": 200}
+
+        @memoize(keys=["region"], maxsize=2)
+        def base_premium(self, quote, load=1):
+            calls.append(quote["region"])
+            quote += Rate("base", self.base[quote["region"]] * load)
+            quote.note("base applied")
+            return quote
+
+        @memoize(keys="age")
+        def age_factor(self, quote):
+            calls.append(quote["age"])
+            return 1.5 if quote["age"] < 25 else 1.0
+
+        def calculation(self, quote):
+            quote += 10
+            self.base_premium(quote)
+            return quote * self.age_factor(quote)
+
+    return Motor
+
+
+TESTS = [{"region": "NS"[i % 2], "age": 20 + i % 10} for i in range(20)]
+
+
+def test_memoize():
+    calls = []
+    Motor = regional_motor(calls)
+    quotes = Motor.quote_many(TESTS)
+    assert len(calls) == 2 + 10
+    assert [q.final_price for q in quotes[:2]] == [165, 315]
+    assert Motor.base_premium.cache_info() == (18, 2, 2, 2)
+    assert Motor.memo_info()["age_factor"].hits == 10
+
+
+def test_memoize_replays_steps():
+    replayed = regional_motor([]).quote_many(TESTS)[2].breakdown
+    # Replayed steps are recomputed from the quote's own price.
+    assert [s.result for s in replayed if not isinstance(s, Note)] == [
+        0,
+        10,
+        110,
+        165,
+    ]
+    assert isinstance(replayed[3], Note)
+
+
+def test_memoize_key_and_eviction():
+    calls = []
+    Motor = regional_motor(calls)
+    Motor.quote_many(TESTS)
+    # Other arguments are part of the key; the oldest entry is evicted.
+    Motor.base_premium(Motor(), Quote({"region": "N"}), load=2)
+    assert calls[-1] == "N" and Motor.base_premium.cache_info().currsize == 2
+
+
+def test_memoize_subclass_cleared_alone():
+    Motor = regional_motor([])
+    Motor.quote_many(TESTS)
+
+    class Motor2(Motor):
+        def setup(self):
+            self.base = {"N": 1, "S": 2}
+
+    assert Motor2.quote({"region": "N", "age": 30}).final_price == 11
+    # Motor2's result evicted one of Motor's, and is then cleared alone.
+    Motor2.clear_cache()
+    assert Motor.base_premium.cache_info().currsize == 1
+    Motor.clear_cache()
+    assert Motor.base_premium.cache_info().currsize == 0
+
+
+def test_memoize_warns_on_undeclared_reads():
+    class Leaky(Framework):
+        def setup(self):
+            pass
+
+        @memoize(keys=["region"])
+        def helper(self, quote):
+            return quote.get("age", 0)
+
+        def calculation(self, quote):
+            return quote + self.helper(quote)
+
+    with pytest.warns(UserWarning):
+        assert Leaky.quote({"region": "N", "age": 3}).final_price == 3
+    assert Leaky.quote({"region": "N", "age": 4}).final_price == 4
+    assert Leaky.helper.cache_info().currsize == 0
+
+
+def test_memoize_dropped_when_tables_change():
+    rates = {"N": 100}
+
+    class Motor(Framework):
+        def setup(self):
+            self.base = LookupTable([{"region": "N", "rate": rates["N"]}])
+
+        @memoize(keys=["region"])
+        def base_premium(self, quote):
+            quote += self.base[quote["region"]]
+
+        def calculation(self, quote):
+            self.base_premium(quote)
+            return quote
+
+    assert Motor.quote({"region": "N"}).final_price == 100
+    assert Motor.quote_many([{"region": "N"}])[0].final_price == 100
+    assert Motor.base_premium.cache_info().hits == 1
+
+    rates["N"] = 120
+    assert Motor.quote_many([{"region": "N"}])[0].final_price == 120
+    assert Motor.base_premium.cache_info().currsize == 1
@@ -1,4 +1,6 @@
-from sentinelpricing import Quote, QuoteSet
+import pytest
+
+from sentinelpricing import Bins, Quote, QuoteSet
 
 
 def test_quoteset_init():
@@ -91,3 +93,243 @@ def test_quoteset_max_by_where():
     max_where = qs.max(by="age", where=lambda x: x['age'] < 20)
     expected = {k+17: k * 5 for k in range(0, 20 - 17)}
     assert max_where == expected
+
+def test_quoteset_groupby_cached():
+    quotes = [Quote({"age": i % 3, "lic": i % 2}) for i in range(12)]
+
+    qs = QuoteSet(quotes)
+
+    assert qs._groupby(by="age") is qs._groupby(by="age")
+    assert qs.mix(by=["age", "lic"]) == {
+        (a, b): 2 for a in range(3) for b in range(2)
+    }
+
+
+def test_quoteset_groupby_invalidated_on_change():
+    quotes = [Quote({"age": i % 3}) for i in range(12)]
+
+    qs = QuoteSet(quotes)
+
+    assert qs.mix(by="age") == {0: 4, 1: 4, 2: 4}
+    qs.quotes.append(Quote({"age": 5}))
+    assert qs.mix(by="age") == {0: 4, 1: 4, 2: 4, 5: 1}
+
+
+def test_quoteset_register_key():
+    quotes = [
+        Quote({"age": i + 17}, final_price=i) for i in range(20)
+    ]
+
+    qs = QuoteSet(quotes)
+    qs.register_key("band", lambda q: q["age"] // 10 * 10)
+
+    assert qs.mix(by="band") == {10: 3, 20: 10, 30: 7}
+    assert qs._groupby(by="band") is qs._groupby(by="band")
+
+
+def test_quoteset_quantiles():
+    quotes = [
+        Quote({"age": 17 + i % 2}, final_price=i) for i in range(1, 101)
+    ]
+
+    qs = QuoteSet(quotes)
+
+    assert qs.quantiles(0.5) == 50
+    assert qs.quantiles([0, 1]) == [1, 100]
+    assert qs.quantiles([0, 1], by="age") == {17: [2, 100], 18: [1, 99]}
+    assert qs.sketch(by="age")[17].n == 50
+
+
+def test_quoteset_bins():
+
+    quotes = [
+        Quote({"age": i + 17, "lic": i % 2}, final_price=i) for i in range(40)
+    ]
+
+    qs = QuoteSet(quotes)
+
+    by_width = qs.mix(by="age", bins=10)
+    assert by_width == {10: 3, 20: 10, 30: 10, 40: 10, 50: 7}
+    assert qs.mix(by="age", bins=Bins(width=10)) == by_width
+    assert qs.mix(by="age", bins=lambda x: x // 10 * 10) == by_width
+
+    assert qs.mix(by="age", bins=[17, 25, 50]) == {17: 8, 25: 25, 50: 7}
+    assert qs.max(by="age", bins=[25]) == {25: 39}
+
+    assert qs.mix(by=("age", "lic"), bins={"age": [17, 37]}) == {
+        (17, 0): 10,
+        (17, 1): 10,
+        (37, 0): 10,
+        (37, 1): 10,
+    }
+
+    quartiles = qs.mix(by="age", bins=Bins(quantiles=4))
+    assert list(quartiles.values()) == [10, 10, 10, 10]
+
+    assert qs._groupby(by="age", bins=[17, 25]) is qs._groupby(
+        by="age", bins=Bins(edges=[25, 17])
+    )
+
+
+def test_quoteset_contains():
+    quotes = [Quote({"age": i, "lic": i % 3}) for i in range(10)]
+
+    qs = QuoteSet(quotes)
+
+    assert {"lic": 1, "age": 4} in qs
+    assert Quote({"age": 4, "lic": 1}) in qs
+    assert {"age": 4} not in qs
+    assert qs.get(quotes[3].identifier) is quotes[3]
+
+
+def test_quoteset_set_operations():
+    quotes = [Quote({"age": i}) for i in range(10)]
+
+    a = QuoteSet(quotes[:6])
+    b = QuoteSet(quotes[4:])
+
+    assert [q["age"] for q in a - b] == [0, 1, 2, 3]
+    assert [q["age"] for q in a & b] == [4, 5]
+    assert [q["age"] for q in a | b] == list(range(10))
+
+    copies = QuoteSet([Quote({"age": i}) for i in range(3)])
+    assert len(a & copies) == 0
+    assert len(a.intersection(copies, on="quotedata")) == 3
+    assert len(a.subtract(copies, on="quotedata")) == 3
+
+
+def test_quoteset_duplicate_ids():
+    import warnings
+
+    import pytest
+
+    quotes = [Quote({"age": i}, identifier=i % 5) for i in range(10)]
+
+    with pytest.warns(UserWarning):
+        QuoteSet(quotes)
+
+    with pytest.raises(ValueError):
+        QuoteSet(quotes, id_check="strict")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        qs = QuoteSet(quotes, id_check="off")
+    assert not qs.unique_ids
+
+
+def test_quoteset_unique_ids_inherited():
+    import pytest
+
+    quotes = [Quote({"age": i}, identifier=i) for i in range(10)]
+
+    qs = QuoteSet(quotes, id_check="strict")
+    assert qs.unique_ids
+
+    subset = qs.subset(lambda q: q["age"] < 5)
+    assert subset._proven_unique()
+    assert subset.id_check == "strict"
+
+    rest = qs.subset(lambda q: q["age"] >= 5)
+    assert (subset + rest)._proven_unique()
+
+    with pytest.raises(ValueError):
+        subset + qs
+
+    qs.quotes.append(Quote({"age": 0}, identifier=0))
+    assert not qs.unique_ids
+
+
+def test_quoteset_subset_view():
+    import pytest
+
+    from sentinelpricing import QuoteSetView
+
+    quotes = [
+        Quote({"age": i + 17, "lic": i % 3}, final_price=i) for i in range(30)
+    ]
+
+    qs = QuoteSet(quotes)
+    young = qs.subset(lambda q: q["age"] < 30)
+    young_lic = young.subset(lambda q: q["lic"] == 0)
+
+    assert isinstance(young_lic, QuoteSetView)
+    assert young_lic._source is qs.quotes
+    assert [q["age"] for q in young_lic] == [17, 20, 23, 26, 29]
+    assert young_lic[1] is quotes[3]
+    assert young_lic.max() == 12
+    assert young_lic.mix(by="lic") == {0: 5}
+    assert young._proven_unique()
+
+    materialized = young_lic.materialize()
+    assert type(materialized) is QuoteSet
+    assert list(materialized) == list(young_lic)
+
+    with pytest.raises(AttributeError):
+        young.quotes = []
+
+    qs.quotes.pop()
+    with pytest.raises(RuntimeError):
+        len(young_lic.quotes)
+    assert len(materialized) == 5
+
+
+def test_quoteset_sorted_index():
+    prices = [50, 10, 40, 30, 20, 30, 60, 0]
+    quotes = [
+        Quote({"age": 20 + i}, final_price=p, identifier=i)
+        for i, p in enumerate(prices)
+    ]
+    qs = QuoteSet(quotes)
+
+    assert [q.final_price for q in qs.top(3)] == [60, 50, 40]
+    assert [q.final_price for q in qs.top(2, largest=False)] == [0, 10]
+    assert len(qs.top(100)) == len(qs)
+    assert [q.identifier for q in qs.between(20, 30)] == [4, 3, 5]
+    assert len(qs.between(31, 39)) == 0
+    assert qs.rank(30) == 5 / 8
+    assert qs.rank(quotes[6]) == 1.0
+    assert qs.histogram([10, 30, 60]) == {
+        (float("-inf"), 10): 1,
+        (10, 30): 2,
+        (30, 60): 4,
+        (60, float("inf")): 1,
+    }
+    assert [q["age"] for q in qs.top(2, on="age")] == [27, 26]
+
+    # Views returned by top/between carry their own slice of the index.
+    middle = qs.between(10, 50)
+    assert ("sorted", "final_price") in middle._indexes
+    assert [q.final_price for q in middle.top(2)] == [50, 40]
+
+    # Subsets filter the parent's index rather than sorting again.
+    odd = qs.subset(lambda q: q.identifier % 2)
+    assert [q.final_price for q in odd.top(4)] == [30, 30, 10, 0]
+    assert odd.rank(10) == 0.5
+
+    qs.quotes.append(Quote({"age": 99}, final_price=99, identifier=8))
+    assert qs.top(1)[0].final_price == 99
+
+
+def test_quoteset_groupby_callables_not_cached():
+    quotes = [Quote({"age": i + 17}, final_price=i) for i in range(20)]
+
+    qs = QuoteSet(quotes)
+    qs.mix(by="age")
+    cached = len(qs._indexes)
+    for _ in range(50):
+        assert qs.mix(by=lambda q: q["age"] // 10) == {1: 3, 2: 10, 3: 7}
+        assert qs.mix(by="age", bins=lambda x: x // 10)[2] == 10
+        assert qs.top(3, on=lambda q: -q.final_price)[0].final_price == 0
+    assert len(qs._indexes) == cached
+
+
+def test_quoteset_groupby_read_only():
+    quotes = [Quote({"age": i % 3}) for i in range(12)]
+
+    qs = QuoteSet(quotes)
+    grouped = qs._groupby(by="age")
+    with pytest.raises(TypeError):
+        grouped[0] = []
+    with pytest.raises(AttributeError):
+        grouped[0].append(Quote({"age": 0}))
+    assert qs.mix(by="age") == {0: 4, 1: 4, 2: 4}
@@ -0,0 +1,148 @@
+import pytest
+
+from sentinelpricing import Framework, LookupTable, memoize
+from sentinelpricing.utils.tracing import unpack_hit
+
+AGES = [{"age": a, "rate": 2.0 if a < 21 else 1.0} for a in range(17, 80)]
+REGIONS = [{"region": r, "rate": 100 * (i + 1)} for i, r in enumerate("NS")]
+TESTS = [{"region": "NS"[i % 2], "age": 17 + i % 60} for i in range(120)]
+
+
+def versions(calls):
+    class MotorV1(Framework):
+        def setup(self):
+            self.age = LookupTable(AGES, name="age")
+            self.tables = {"region": LookupTable(REGIONS, name="region")}
+
+        @memoize(keys=["region"])
+        def base(self, quote):
+            return self.tables["region"][quote["region"]]
+
+        def calculation(self, quote):
+            calls.append(quote.identifier)
+            quote += self.base(quote)
+            quote *= self.age[quote["age"]]
+            return quote
+
+    class MotorV2(MotorV1):
+        def setup(self):
+            self.age.rates[self.age.index.index((18.0,))] = 3.0
+
+    return MotorV1, MotorV2
+
+
+def test_record_hits():
+    MotorV1, _ = versions([])
+    current = MotorV1.quote_many(TESTS, record_hits=True)
+    hits = [unpack_hit(h) for h in current[1].row_hits]
+    assert hits == [(0, 1), (1, 1)]
+    assert [unpack_hit(h) for h in current[3].row_hits] == [(0, 3), (1, 1)]
+
+
+def test_rerate():
+    calls = []
+    MotorV1, MotorV2 = versions(calls)
+    current = MotorV1.quote_many(TESTS, record_hits=True)
+    del calls[:]
+    proposed = MotorV2.rerate(current)
+    assert list(proposed.rerated) == [1, 61] and len(calls) == 2
+    assert proposed[1].final_price == 600 and current[1].final_price == 400
+    assert proposed[1].identifier == current[1].identifier
+    full = MotorV2.quote_many(TESTS)
+    assert [q.final_price for q in proposed] == [q.final_price for q in full]
+
+
+def test_rerate_copies_unaffected_quotes():
+    MotorV1, MotorV2 = versions([])
+    current = MotorV1.quote_many(TESTS, record_hits=True)
+    proposed = MotorV2.rerate(current)
+    # Unaffected quotes share the recorded breakdown, frozen, but are
+    # quotes of the new version that can be edited on their own.
+    assert proposed[0] is not current[0]
+    assert proposed[0].breakdown is current[0].breakdown
+    assert proposed[0].framework is MotorV2
+    assert current[0].framework is MotorV1
+    edited = proposed[0]
+    edited += 1
+    assert edited.final_price == current[0].final_price + 1
+
+
+def test_rerate_changed_index():
+    MotorV1, MotorV2 = versions([])
+    current = MotorV1.quote_many(TESTS, record_hits=True)
+    proposed = MotorV2.rerate(current)
+
+    # Changing a table's index rates every quote that used it.
+    class MotorV3(MotorV1):
+        def setup(self):
+            self.tables["region"] = LookupTable(REGIONS[:1], name="region")
+
+    assert len(MotorV3.rerate(proposed).rerated) == 120
+
+
+def test_rerate_needs_same_calculation_and_hits():
+    MotorV1, MotorV2 = versions([])
+    current = MotorV1.quote_many(TESTS, record_hits=True)
+
+    class Changed(MotorV1):
+        def calculation(self, quote):
+            return super().calculation(quote) + 1
+
+    with pytest.raises(ValueError):
+        Changed.rerate(current)
+    with pytest.raises(ValueError):
+        MotorV2.rerate(MotorV1.quote_many(TESTS))
+
+
+def compared(calls):
+    class MotorV1(Framework):
+        def setup(self):
+            self.age = LookupTable(AGES, name="age")
+
+        def calculation(self, quote):
+            calls.append(type(self).__name__)
+            quote += 100
+            quote *= self.age[quote["age"]]
+            return quote
+
+    class MotorV2(MotorV1):
+        def setup(self):
+            self.age.rates[0] = 3.0
+
+    class MotorV3(MotorV1):
+        def calculation(self, quote):
+            return super().calculation(quote) + 5
+
+    return MotorV1, MotorV2, MotorV3
+
+
+AGE_TESTS = [{"age": 17 + i % 60} for i in range(120)]
+
+
+def test_compare_many():
+    calls = []
+    v1, v2, v3 = Framework.compare_many(compared(calls), AGE_TESTS)
+    assert calls.count("MotorV2") == 2 and calls.count("MotorV3") == 120
+    assert list(v2.rerated) == [0, 60] and len(v1.rerated) == 120
+
+
+def test_compare_many_matches_quote_many():
+    frameworks = compared([])
+    runs = Framework.compare_many(frameworks, AGE_TESTS)
+    for run, framework in zip(runs, frameworks):
+        expected = framework.quote_many(AGE_TESTS)
+        assert [q.final_price for q in run] == [
+            q.final_price for q in expected
+        ]
+        assert all(q.framework is framework for q in run)
+    assert [q.identifier for q in runs[0]] == [q.identifier for q in runs[2]]
+
+
+def test_compare_many_copies_on_write():
+    v1, v2, _ = Framework.compare_many(compared([]), AGE_TESTS)
+    # Shared results are copied on write.
+    shared = v2[1]
+    shared += 1
+    assert v2[1].final_price == v1[1].final_price + 1
+    summary = v1.align(v2).summary()
+    assert summary["pairs"] == 120 and summary["unchanged"] == 117
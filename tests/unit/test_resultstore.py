@@ -0,0 +1,163 @@
+from sentinelpricing import (
+    ColumnarTestSuite,
+    Framework,
+    LookupTable,
+    ResultStore,
+    TestSuite,
+)
+from sentinelpricing.utils.digest import digest_rows
+
+
+def stored_motor(path, calls, setups):
+    class Motor(Framework):
+        result_store = ResultStore(path)
+
+        def setup(self):
+            setups.append(1)
+            self.base = LookupTable(
+                [{"region": "N", "rate": 100}, {"region": "S", "rate": 250}]
+            )
+
+        def calculation(self, quote):
+            calls.append(quote.identifier)
+            quote += self.base[quote["region"]]
+            quote.note("young" if quote["age"] < 25 else "old")
+            return quote * 1.5
+
+    return Motor
+
+
+ROWS = [{"region": "NS"[i % 2], "age": 20 + i} for i in range(10)]
+
+
+def test_result_store(tmp_path):
+    calls, setups = [], []
+    Motor = stored_motor(tmp_path, calls, setups)
+    first = Motor.quote_many(TestSuite(ROWS))
+    again = Motor.quote_many(TestSuite(ROWS))
+
+    assert len(calls) == 10 and Motor.result_store.hits == 1
+    assert [q.final_price for q in again] == [q.final_price for q in first]
+    assert [q.identifier for q in again] != [q.identifier for q in first]
+    assert again[0].breakdown.summary() == first[0].breakdown.summary()
+    assert again[0].breakdown is again[2].breakdown
+    assert isinstance(again[0].breakdown[0].result, int)
+    assert len(list(tmp_path.iterdir())) == 1
+    # The digest is taken from the instance rating, not a new one.
+    assert len(setups) == 2
+
+
+def test_result_store_one_shot_iterators(tmp_path):
+    calls = []
+    Motor = stored_motor(tmp_path, calls, [])
+    # One-shot iterators are rated in full, and loaded the next time.
+    assert len(Motor.quote_many(row for row in ROWS)) == 10
+    generated = Motor.quote_many(row for row in ROWS)
+    assert len(generated) == 10 and Motor.result_store.hits == 1
+    assert len(calls) == 10
+
+
+def test_result_store_rewrites_corrupt_files(tmp_path):
+    calls = []
+    Motor = stored_motor(tmp_path, calls, [])
+    Motor.quote_many(TestSuite(ROWS))
+    # Corrupt or truncated files are misses, and are written again.
+    (path,) = tmp_path.iterdir()
+    blob = path.read_bytes()
+    for corrupt in (blob[:-3], blob[:40], blob[:4] + b"\xff" * 60):
+        path.write_bytes(corrupt)
+        assert len(Motor.quote_many(TestSuite(ROWS))) == 10
+    assert len(calls) == 40 and path.read_bytes() == blob
+
+
+def test_result_store_key(tmp_path):
+    calls = []
+    Motor = stored_motor(tmp_path, calls, [])
+    tests = TestSuite(ROWS)
+    Motor.quote_many(tests)
+    # Arguments, tests and table contents are all part of the key.
+    Motor.quote_many(tests, store=False)
+    Motor.quote_many(ROWS[:5])
+    Motor.quote_many(ColumnarTestSuite(ROWS))
+    assert len(calls) == 35
+    Motor.quote_many(ColumnarTestSuite(ROWS))
+    assert len(calls) == 35
+
+
+def test_result_store_digest(tmp_path):
+    Motor = stored_motor(tmp_path, [], [])
+    digest = Motor.digest()
+    assert digest == Motor.digest() and len(digest) == 40
+
+    class Motor2(Motor):
+        def setup(self):
+            self.base.rates[0] = 50
+
+    assert Motor2.digest() != digest
+    assert Motor2.quote_many(TestSuite(ROWS))[0].final_price == 75
+
+
+def test_result_store_evicts(tmp_path):
+    Motor = stored_motor(tmp_path, [], [])
+    for tests in (ROWS, ROWS[:5], ROWS[5:]):
+        Motor.quote_many(tests)
+    # The least recently used runs are evicted past the size limit.
+    size = Motor.result_store.size
+    Motor.result_store.max_bytes = size
+    Motor.quote_many(ROWS[:3])
+    assert Motor.result_store.size <= size
+    assert len(list(tmp_path.iterdir())) < 4
+    Motor.result_store.clear()
+    assert Motor.result_store.size == 0
+
+
+def test_result_store_skips_unencodable_runs(tmp_path):
+    Motor = stored_motor(tmp_path, [], [])
+
+    # Runs that cannot be encoded are calculated every time.
+    class Custom(Motor):
+        def calculation(self, quote):
+            quote.extra = 1
+            return super().calculation(quote)
+
+    Custom.quote_many(TestSuite(ROWS))
+    assert Motor.result_store.size == 0
+
+
+class Truncated:
+    """A value whose repr, like a large array's, leaves out its data."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        return "Truncated(...)"
+
+
+def test_digest_rows_needs_stable_reprs():
+    rows = [{"age": 17, "value": 1.5, "name": None}, {"tags": ("a", 1)}]
+    assert digest_rows(rows) == digest_rows(list(rows))
+    assert digest_rows(rows) != digest_rows(rows[:1])
+    assert digest_rows(rows + [{"x": object()}]) is None
+    assert digest_rows([{"x": Truncated(1)}]) is None
+    assert TestSuite([{"x": Truncated(1)}]).digest() is None
+    assert ColumnarTestSuite([{"x": Truncated(1)}]).digest() is None
+
+
+def test_result_store_skips_unstable_rows(tmp_path):
+    calls = []
+
+    class Motor(Framework):
+        result_store = ResultStore(tmp_path)
+
+        def setup(self):
+            pass
+
+        def calculation(self, quote):
+            calls.append(1)
+            return quote + quote["x"].value
+
+    first = Motor.quote_many([{"x": Truncated(1)}])
+    second = Motor.quote_many([{"x": Truncated(2)}])
+    assert [first[0].final_price, second[0].final_price] == [1, 2]
+    assert len(calls) == 2 and not list(tmp_path.iterdir())
@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+
+from sentinelpricing import Framework, FrameworkRouter
+
+
+def routed(setups):
+    class MotorV1(Framework):
+        effective_date = "2024-01-01"
+        expiry_date = "2024-07-01"
+
+        def setup(self):
+            setups.append(type(self).__name__)
+            self.base = 100
+
+        def calculation(self, quote):
+            quote += self.base
+            return quote
+
+    class MotorV2(MotorV1):
+        effective_date = "2024-07-01"
+        expiry_date = None
+
+        def setup(self):
+            self.base = 120
+
+    router = FrameworkRouter("inception", [MotorV1])
+    router.register(MotorV2)
+    return router, MotorV1, MotorV2
+
+
+TESTS = [{"inception": f"2024-{1 + i % 12:02d}-15", "n": i} for i in range(24)]
+
+
+def test_router_framework_for():
+    router, MotorV1, MotorV2 = routed([])
+    assert router.framework_for(datetime.date(2024, 6, 30)) is MotorV1
+    assert router.framework_for("2024-07-01T09:00:00") is MotorV2
+    with pytest.raises(LookupError):
+        router.framework_for("2023-12-31")
+
+
+def test_router_register_overlap():
+    router, _, MotorV2 = routed([])
+    with pytest.raises(ValueError, match="overlaps"):
+        router.register(MotorV2, "2024-03-01", "2024-04-01")
+
+
+def test_router_quote_many():
+    router, MotorV1, MotorV2 = routed([])
+    quotes = router.quote_many(TESTS)
+    assert [q["n"] for q in quotes] == list(range(24))
+    assert [q.final_price for q in quotes[:12]] == [100] * 6 + [120] * 6
+    assert {f: len(q) for f, q in quotes.versions.items()} == {
+        MotorV1: 12,
+        MotorV2: 12,
+    }
+    assert router.quote(TESTS[7]).framework is MotorV2
+
+
+def test_router_sets_up_once():
+    setups = []
+    router, _, _ = routed(setups)
+    # Each version is set up once and kept warm.
+    router.quote_many(TESTS)
+    router.quote_many(TESTS)
+    router.quote(TESTS[7])
+    assert setups == ["MotorV1", "MotorV2"]
@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+from sentinelpricing import Framework, LookupTable
+from sentinelpricing.serve import RatingService, load_test
+
+
+class Motor(Framework):
+    def setup(self):
+        self.age = LookupTable(
+            [{"age": a, "rate": 2.0 if a < 25 else 1.0} for a in (17, 25)],
+            name="Age",
+        )
+
+    def calculation(self, quote):
+        quote += 100
+        quote *= self.age[quote["age"]]
+        quote.note("done")
+        return quote
+
+
+async def request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = b"" if payload is None else json.dumps(payload).encode()
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nConnection: close\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def test_serve():
+    async def main():
+        service = RatingService({"motor": Motor}, window=0.02)
+        await service.start()
+        port = service.port
+        try:
+            status, quote = await request(
+                port, "POST", "/quote/motor", {"age": 18}
+            )
+            assert status == 200 and quote["final_price"] == 200
+            assert quote["framework"] == "Motor"
+            assert quote["breakdown"][2] == {
+                "name": "Age",
+                "operation": "mul",
+                "other": 2.0,
+                "result": 200.0,
+            }
+            assert quote["breakdown"][3] == {"note": "done"}
+
+            # Concurrent requests are rated in one batch.
+            batches = service.batches
+            results = await asyncio.gather(
+                *(
+                    request(port, "POST", "/quote", {"age": 17 + i})
+                    for i in range(20)
+                )
+            )
+            assert [q["final_price"] for _, q in results[7:9]] == [200, 100]
+            assert service.batches - batches < 5
+
+            # Bulk requests, isolating failures.
+            status, bulk = await request(
+                port, "POST", "/quote/motor", [{"age": 30}, {"region": "N"}]
+            )
+            assert status == 200 and bulk["quotes"][0]["final_price"] == 100
+            assert "KeyError" in bulk["quotes"][1]["error"]
+
+            assert (await request(port, "POST", "/quote/home", {}))[0] == 404
+            assert (await request(port, "GET", "/quote/motor"))[0] == 405
+            assert (await request(port, "GET", "/health"))[1]["rated"] == 23
+            status, error = await request(port, "POST", "/quote", "[")
+            assert status == 400
+
+            report = await load_test(
+                [{"age": 18}, {"age": 40}],
+                port=port,
+                path="/quote/motor",
+                requests=200,
+                concurrency=8,
+            )
+            assert report.requests == 200 and report.errors == 0
+            assert 0 < report.p50 <= report.p99 <= report.max
+        finally:
+            await service.close()
+
+    asyncio.run(main())
+
+
+def test_serve_bad_content_length():
+    async def main():
+        service = RatingService({"motor": Motor})
+        await service.start()
+        try:
+            for length in ("ten", "-5"):
+                reader, writer = await asyncio.open_connection(
+                    "127.0.0.1", service.port
+                )
+                writer.write(
+                    "POST /quote HTTP/1.1\r\n"
+                    f"Content-Length: {length}\r\n\r\n".encode()
+                )
+                response = await asyncio.wait_for(reader.read(), 5)
+                writer.close()
+                assert response.split()[1] == b"400"
+        finally:
+            await service.close()
+
+    asyncio.run(main())
+
+
+def test_serve_missing_results_fail():
+    async def main():
+        service = RatingService({"motor": Motor}, window=0.02)
+        await service.start()
+        target = service.targets["motor"]
+        rate = target.rate
+        # A batch rated with one result short.
+        target.rate = lambda tests: rate(tests)[:-1]
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(
+                    *(
+                        request(service.port, "POST", "/quote", {"age": 17})
+                        for _ in range(3)
+                    )
+                ),
+                5,
+            )
+            statuses = sorted(status for status, _ in results)
+            assert statuses[0] == 200 and statuses[-1] == 422
+            assert any(
+                "RuntimeError" in r.get("error", "") for _, r in results
+            )
+        finally:
+            await service.close()
+
+    asyncio.run(main())
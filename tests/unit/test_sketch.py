@@ -0,0 +1,48 @@
+import pickle
+import random
+
+import pytest
+
+from sentinelpricing.utils.sketch import QuantileSketch
+
+
+def test_sketch_exact_when_small():
+    sketch = QuantileSketch(k=200).update_many(range(1, 101))
+
+    assert sketch.quantiles([0, 0.5, 1]) == [1, 50, 100]
+    assert sketch.rank(50) == 0.5
+
+
+def test_sketch_error_bounded():
+    rng = random.Random(1)
+    values = [rng.random() for _ in range(100_000)]
+    sketch = QuantileSketch(k=200, seed=1).update_many(values)
+
+    ordered = sorted(values)
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        estimate = sketch.quantile(q)
+        true_rank = ordered.index(estimate) / len(ordered)
+        assert abs(true_rank - q) < 0.02
+
+    assert sum(len(c) for c in sketch.compactors) < 2_000
+
+
+def test_sketch_merge():
+    rng = random.Random(2)
+    values = [rng.gauss(0, 1) for _ in range(30_000)]
+
+    parts = [
+        QuantileSketch(seed=i).update_many(values[i::3]) for i in range(3)
+    ]
+    merged = QuantileSketch(seed=3)
+    for part in parts:
+        merged.merge(pickle.loads(pickle.dumps(part)))
+
+    assert len(merged) == len(values)
+    assert merged.quantile(0.5) == pytest.approx(0, abs=0.05)
+    assert merged.quantiles([0, 1]) == [min(values), max(values)]
+
+
+def test_sketch_empty():
+    with pytest.raises(ValueError):
+        QuantileSketch().quantile(0.5)
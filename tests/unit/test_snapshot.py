@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from sentinelpricing import Framework, LookupTable, Rate
+
+
+def snapshot_motor(path, setups):
+    class Motor(Framework):
+        def setup(self):
+            setups.append(1)
+            self.age = LookupTable.from_csv(path, name="age", shared=False)
+            self.regions = {
+                "N": LookupTable([{"area": a, "rate": a} for a in (1, 2)]),
+                "S": LookupTable([{"area": "x", "rate": 3}], name="S"),
+            }
+            self.fee = Rate("Fee", 10)
+            self.bands = (17, 25, None, "x")
+
+        def calculation(self, quote):
+            quote += self.fee
+            quote *= self.age[quote["age"]]
+            quote *= self.regions[quote["region"]][quote["area"]]
+            return quote
+
+    return Motor
+
+
+TESTS = [{"age": 17 + i, "region": "N", "area": 1 + i % 2} for i in range(10)]
+
+
+@pytest.fixture
+def snapshotted(tmp_path):
+    path = tmp_path / "age.csv"
+    path.write_text("age,rate\n17,2.0\n25,1.0\n")
+    setups = []
+    Motor = snapshot_motor(path, setups)
+    snapshot = tmp_path / "motor.snapshot"
+    Motor.snapshot(snapshot)
+    return Motor, snapshot, setups
+
+
+def test_snapshot(snapshotted):
+    Motor, snapshot, setups = snapshotted
+    expected = [q.final_price for q in Motor.quote_many(TESTS)]
+    del setups[:]
+
+    motor = Motor.from_snapshot(snapshot)
+    assert setups == [] and not motor.age.loaded
+    assert motor.bands == (17, 25, None, "x") and motor.fee.name == "Fee"
+    assert [q.final_price for q in Motor.quote_many(TESTS)] == expected
+    assert setups == [] and motor.age.loaded
+    assert not motor.regions["S"].loaded
+    assert motor.regions["S"]["x"] == 3 and motor.regions["S"].name == "S"
+
+
+def test_snapshot_tables_stay_modifiable(snapshotted):
+    Motor, snapshot, _ = snapshotted
+    motor = Motor.from_snapshot(snapshot)
+    motor.age.rates[0] = 4.0
+    assert Motor().age.rates[0] == 4.0
+
+
+def test_snapshot_stale(snapshotted, tmp_path):
+    Motor, snapshot, _ = snapshotted
+    # A changed table file makes the snapshot stale.
+    path = tmp_path / "age.csv"
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    with pytest.raises(ValueError, match="stale"):
+        Motor.from_snapshot(snapshot)
+    Motor.from_snapshot(snapshot, check=False)
+
+
+def test_snapshot_of_other_framework(snapshotted):
+    Motor, snapshot, _ = snapshotted
+
+    class Other(Motor):
+        pass
+
+    with pytest.raises(ValueError, match="not"):
+        Other.from_snapshot(snapshot)
+
+
+def test_snapshot_unpicklable_attribute(snapshotted, tmp_path):
+    Motor, _, _ = snapshotted
+
+    class Model(Motor):
+        def setup(self):
+            self.model = object()
+
+    with pytest.raises(TypeError, match="model"):
+        Model.snapshot(tmp_path / "model.snapshot")
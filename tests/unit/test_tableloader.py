@@ -0,0 +1,76 @@
+import pickle
+import time
+
+import pytest
+
+from sentinelpricing import Framework, LookupTable, TableLoadError
+
+
+def slow():
+    time.sleep(0.2)
+    return LookupTable([{"vehicle": "car", "rate": 3}], name="vehicle")
+
+
+@pytest.fixture
+def tables(tmp_path):
+    for name in ("age", "region"):
+        (tmp_path / f"{name}.csv").write_text(f"{name},rate\n1,1.5\n2,2.5\n")
+    return tmp_path
+
+
+def loading_motor(path):
+    class Motor(Framework):
+        def setup(self):
+            self.report = self.load_tables(
+                {
+                    "age": path / "age.csv",
+                    "region": str(path / "region.csv"),
+                    "vehicle": slow,
+                }
+            )
+
+        def calculation(self, quote):
+            return quote
+
+    return Motor
+
+
+def test_load_tables(tables):
+    motor = loading_motor(tables)()
+    assert motor.age[2] == 2.5 and motor.age.name == "age"
+    assert motor.region.name == "region" and motor.vehicle["car"] == 3
+    report = motor.report
+    assert report.critical_path[-1] == "vehicle"
+    assert report.elapsed < 0.2 + min(report.durations.values()) + 0.1
+    assert "Critical path: " in str(report)
+
+
+def test_load_tables_errors(tables):
+    class Broken(Framework):
+        def setup(self):
+            self.load_tables(
+                {
+                    "age": tables / "age.csv",
+                    "missing": tables / "missing.csv",
+                    "bad": lambda: 1 / 0,
+                }
+            )
+
+        def calculation(self, quote):
+            return quote
+
+    broken = Broken.__new__(Broken)
+    with pytest.raises(TableLoadError) as info:
+        broken.setup()
+    assert set(info.value.errors) == {"missing", "bad"}
+    assert not hasattr(broken, "age")
+
+
+def test_loaded_tables_pickle(tables):
+    # Tables pickle, e.g. back from a process pool.
+    motor = loading_motor(tables)()
+    table = pickle.loads(pickle.dumps(motor.age))
+    assert table[2] == 2.5 and table.index == motor.age.index
+    assert table.frozen and table.source == motor.age.source
+    lazy = pickle.loads(pickle.dumps(LookupTable.lazy(slow)))
+    assert lazy.loaded and lazy["car"] == 3
@@ -37,3 +37,105 @@ def test_testsuite_add():
     assert "age" not in combined[5]
     assert "lic" not in combined[0]
     assert "lic" in combined[5]
+
+
+def test_testsuite_mix():
+    testcases = [TestCase({"age": i % 3, "lic": 1}) for i in range(12)]
+
+    ts = TestSuite(testcases)
+
+    assert ts.mix(by="age") == {0: 4, 1: 4, 2: 4}
+    assert ts.mix(by=("age", "lic")) == {(0, 1): 4, (1, 1): 4, (2, 1): 4}
+
+    ts.testcases.pop()
+    assert ts.mix(by="age") == {0: 4, 1: 4, 2: 3}
+
+
+def test_testsuite_set_operations():
+    testcases = [TestCase({"age": i}) for i in range(10)]
+
+    a = TestSuite(testcases[:6])
+    b = TestSuite(testcases[4:])
+
+    assert [t["age"] for t in a - b] == [0, 1, 2, 3]
+    assert [t["age"] for t in a & b] == [4, 5]
+    assert len(a | b) == 10
+    assert len(b - b) == 0
+
+    assert {"age": 3} in a
+    assert {"age": 3} not in b
+    assert len(a.intersection(TestSuite([{"age": 1}]), on="data")) == 1
+
+
+def test_testsuite_loaders(tmp_path):
+    import json
+
+    import pytest
+
+    rows = [
+        {"policy": f"P{i}", "age": 17 + i, "region": "AB"[i % 2]}
+        for i in range(7)
+    ]
+
+    csv_path = tmp_path / "tests.csv"
+    csv_path.write_text(
+        "policy,age,region,ncd\n"
+        + "".join(
+            f"{r['policy']},{r['age']},{r['region']},{'yes' if i else ''}\n"
+            for i, r in enumerate(rows)
+        )
+    )
+    ts = TestSuite.from_csv(
+        csv_path, types={"age": int, "ncd": "bool"}, id_column="policy"
+    )
+    assert len(ts) == 7
+    assert ts[0].identifier == "P0"
+    assert ts[0].data == {
+        "policy": "P0",
+        "age": 17,
+        "region": "A",
+        "ncd": None,
+    }
+    assert ts[1]["ncd"] is True
+    assert ts.mix(by="region") == {"A": 4, "B": 3}
+
+    chunks = list(TestSuite.iter_csv(csv_path, chunk_size=3))
+    assert [len(c) for c in chunks] == [3, 3, 1]
+    assert chunks[2][0]["age"] == "23"
+
+    with pytest.raises(ValueError, match="'missing' as int"):
+        TestSuite.from_csv(csv_path, types={"missing": int})
+    with pytest.raises(ValueError):
+        TestSuite.from_csv(csv_path, types={"age": "decimal"})
+
+    # Blank lines are skipped, and short or long rows are errors.
+    ragged_path = tmp_path / "ragged.csv"
+    ragged_path.write_text("policy,age,region\nP0,17,A\n\nP1,18\n")
+    with pytest.raises(ValueError, match="line 4: expected 3 fields, got 2"):
+        TestSuite.from_csv(ragged_path)
+    with pytest.raises(ValueError, match="line 4"):
+        TestSuite.from_csv(ragged_path, types={"age": int})
+    ragged_path.write_text("policy,age,region\nP0,17,A\n\n")
+    assert len(TestSuite.from_csv(ragged_path)) == 1
+
+    jsonl_path = tmp_path / "tests.jsonl"
+    jsonl_path.write_text("\n".join(json.dumps(r) for r in rows) + "\n\n")
+    ts = TestSuite.from_jsonl(jsonl_path, types={"age": float})
+    assert [t["age"] for t in ts][:2] == [17.0, 18.0]
+    assert [len(c) for c in TestSuite.iter_jsonl(jsonl_path, 4)] == [4, 3]
+
+    xml_path = tmp_path / "tests.xml"
+    xml_path.write_text(
+        "<testcases>"
+        + "".join(
+            f'<testcase policy="{r["policy"]}">'
+            f"<age>{r['age']}</age><region>{r['region']}</region>"
+            "</testcase>"
+            for r in rows
+        )
+        + "</testcases>"
+    )
+    ts = TestSuite.from_xml(xml_path, types={"age": int}, id_column="policy")
+    assert ts[6].identifier == "P6"
+    assert ts[6].data == {"policy": "P6", "age": 23, "region": "A"}
+    assert [len(c) for c in TestSuite.iter_xml(xml_path, 5)] == [5, 2]
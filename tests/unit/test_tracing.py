@@ -0,0 +1,28 @@
+from sentinelpricing.utils.tracing import ReadTracer, ReadTrie
+
+
+def traced(data, *keys):
+    tracer = ReadTracer(data)
+    for key in keys:
+        tracer[key]
+    return tracer
+
+
+def test_read_trie_get():
+    trie = ReadTrie()
+    young = traced({"age": 19, "lic": 1, "name": "A"}, "age", "lic")
+    old = traced({"age": 40, "name": "B"}, "age")
+    assert trie.put(young, "young") and trie.put(old, "old")
+    assert trie.get({"age": 40, "lic": 9}) == "old"
+    assert trie.get({"age": 19, "lic": 1, "name": "C"}) == "young"
+    assert trie.get({"age": 19, "lic": 2}) is None
+    assert list(trie.keys) == ["age", "lic"] and len(trie) == 2
+
+
+def test_read_trie_invalidated_by_other_key():
+    trie = ReadTrie()
+    trie.put(traced({"age": 19, "lic": 1}, "age", "lic"), "young")
+    trie.put(traced({"age": 40, "name": "B"}, "age"), "old")
+    # A different key read after the same values invalidates the trie.
+    assert not trie.put(traced({"age": 40, "name": "B"}, "name"), "other")
+    assert (len(trie), trie.invalidations) == (1, 1)